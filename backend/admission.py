@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Admission control for CPU-heavy endpoints.
+
+``AdmissionController.limit`` wraps a Flask view with:
+
+- a request body limit: larger bodies are answered with 413 before any
+  parsing happens (chunked bodies are cut off while reading);
+- a bounded number of concurrently running requests per endpoint;
+- a bounded wait queue: when all slots are busy a request waits up to
+  ``wait_timeout`` seconds for one. A full queue answers 429, a timeout 503,
+  both with a ``Retry-After`` estimated from recent service times.
+
+Besides its endpoint slot, an admitted request also takes one of
+``workers`` run slots shared by all endpoints (within the same
+``wait_timeout``) and runs on its own request thread while holding it.
+This caps how many heavy computations compete for the interpreter at once,
+so static files, listings and other light requests keep their latency while
+a large paste is being processed.
+
+Limits default to ``BRICKMOVE_HEAVY_*`` environment variables (see
+``settings_from_env``).
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from metrics import REGISTRY
+
+__all__ = ["DEFAULT_LIMITS", "AdmissionController", "AdmissionRejected", "EndpointLimit", "settings_from_env"]
+
+REGISTRY.counter("brickmove_admission_rejections_total", "Requests rejected by admission control.")
+REGISTRY.histogram("brickmove_admission_wait_seconds", "Time spent waiting for a heavy-endpoint slot.",
+                   (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+
+DEFAULT_LIMITS = {"max_body": 8 * 1024 * 1024, "max_concurrent": 2, "max_queue": 16, "wait_timeout": 10.0}
+
+
+class AdmissionRejected(Exception):
+    """A request that cannot be admitted now; carries the HTTP status to answer with."""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class EndpointLimit:
+    """Concurrency slots plus a bounded, timed wait queue for one endpoint."""
+
+    def __init__(self, name: str, max_body: int, max_concurrent: int, max_queue: int, wait_timeout: float):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.name = name
+        self.max_body = max_body
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition(threading.Lock())
+        self._active = 0
+        self._waiting = 0
+        # Exponentially weighted mean service time, for Retry-After.
+        self._service_time = 1.0
+
+    def retry_after(self) -> int:
+        backlog = self._waiting + self._active + 1
+        return max(1, math.ceil(self._service_time * backlog / self.max_concurrent))
+
+    def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed; raise ``AdmissionRejected`` otherwise."""
+        with self._cond:
+            if self._active < self.max_concurrent and not self._waiting:
+                self._active += 1
+                return
+            if self._waiting >= self.max_queue:
+                raise AdmissionRejected(429, f"Too many queued requests for {self.name}", self.retry_after())
+            self._waiting += 1
+            try:
+                deadline = time.monotonic() + self.wait_timeout
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise AdmissionRejected(503, f"Timed out waiting for a {self.name} worker",
+                                                self.retry_after())
+                    self._cond.wait(remaining)
+                self._active += 1
+            finally:
+                self._waiting -= 1
+
+    def release(self, elapsed: Optional[float]) -> None:
+        """Free the slot; ``elapsed`` (``None`` if the request never ran) updates the service time."""
+        with self._cond:
+            self._active -= 1
+            if elapsed is not None:
+                self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+            self._cond.notify()
+
+
+def settings_from_env(environ: Mapping[str, str] = os.environ) -> Dict[str, Any]:
+    """
+    Default limits, overridable through the environment:
+    ``BRICKMOVE_HEAVY_WORKERS`` (run slots shared by all endpoints, 2),
+    ``BRICKMOVE_HEAVY_MAX_BODY_MB`` (8), ``BRICKMOVE_HEAVY_CONCURRENCY``
+    (slots per endpoint, = workers), ``BRICKMOVE_HEAVY_QUEUE`` (16) and
+    ``BRICKMOVE_HEAVY_TIMEOUT`` (seconds, 10).
+    """
+    workers = int(environ.get("BRICKMOVE_HEAVY_WORKERS", DEFAULT_LIMITS["max_concurrent"]))
+    max_body_mb = environ.get("BRICKMOVE_HEAVY_MAX_BODY_MB")
+    return {
+        "workers": workers,
+        "max_body": int(float(max_body_mb) * 1024 * 1024) if max_body_mb else DEFAULT_LIMITS["max_body"],
+        "max_concurrent": int(environ.get("BRICKMOVE_HEAVY_CONCURRENCY", workers)),
+        "max_queue": int(environ.get("BRICKMOVE_HEAVY_QUEUE", DEFAULT_LIMITS["max_queue"])),
+        "wait_timeout": float(environ.get("BRICKMOVE_HEAVY_TIMEOUT", DEFAULT_LIMITS["wait_timeout"])),
+    }
+
+
+class AdmissionController:
+    """Per-endpoint limits for Flask views plus the run slots they share."""
+
+    def __init__(self, workers: int = 2, **defaults: Any):
+        self.workers = workers
+        self.defaults = defaults
+        self.limits: Dict[str, EndpointLimit] = {}
+        # Heavy computations running at once, across all endpoints.
+        self._run_slots = threading.BoundedSemaphore(workers)
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "AdmissionController":
+        settings = settings_from_env(environ)
+        return cls(settings.pop("workers"), **settings)
+
+    def limit(self, name: str, **overrides: Any) -> Callable:
+        """
+        Decorator for a Flask view. Keyword arguments (``max_body``,
+        ``max_concurrent``, ``max_queue``, ``wait_timeout``) override the
+        controller defaults for this endpoint.
+        """
+        settings = dict(DEFAULT_LIMITS, max_concurrent=self.workers)
+        settings.update(self.defaults)
+        settings.update(overrides)
+        endpoint = self.limits[name] = EndpointLimit(name, **settings)
+
+        def decorator(view: Callable) -> Callable:
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                from flask import request
+                from werkzeug.exceptions import RequestEntityTooLarge
+
+                too_large = AdmissionRejected(413, f"Request body exceeds {endpoint.max_body} bytes")
+                if request.content_length is not None and request.content_length > endpoint.max_body:
+                    return self._reject(endpoint, too_large)
+                # Read the body now, capped, so oversized chunked uploads fail here too
+                # (the per-request setter needs Flask >= 3.1).
+                request.max_content_length = endpoint.max_body
+                try:
+                    request.get_data(cache=True)
+                except RequestEntityTooLarge:
+                    return self._reject(endpoint, too_large)
+
+                queued_at = time.monotonic()
+                try:
+                    endpoint.acquire()
+                except AdmissionRejected as exc:
+                    return self._reject(endpoint, exc)
+                remaining = endpoint.wait_timeout - (time.monotonic() - queued_at)
+                if not self._run_slots.acquire(timeout=max(0.0, remaining)):
+                    endpoint.release(None)
+                    return self._reject(endpoint, AdmissionRejected(
+                        503, f"Timed out waiting for a {name} worker", endpoint.retry_after()))
+                start = time.monotonic()
+                REGISTRY.observe("brickmove_admission_wait_seconds", start - queued_at, endpoint=name)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    self._run_slots.release()
+                    endpoint.release(time.monotonic() - start)
+
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def _reject(endpoint: EndpointLimit, exc: AdmissionRejected):
+        from flask import jsonify
+
+        REGISTRY.inc("brickmove_admission_rejections_total", endpoint=endpoint.name, status=str(exc.status))
+        response = jsonify({"error": str(exc)})
+        response.status_code = exc.status
+        if exc.retry_after is not None:
+            response.headers["Retry-After"] = str(exc.retry_after)
+        return response
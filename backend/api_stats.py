@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+API frequency, api2/api1 ratio and co-occurrence statistics over saved proofs.
+
+Every saved file (three-column CSV export, tree JSON, legacy proof JSON or
+proof Markdown) is reduced to *units* — one CSV row, tree node or proof
+step — each holding the vocabulary ids of its ``api2`` and ``api1`` lists.
+A file's contribution to the corpus totals (per-API counts and the sparse
+co-occurrence counts of API pairs inside a unit) is kept next to it, so when
+a file changes only its old contribution is subtracted and the new one
+added; untouched files are never re-read.
+
+Usage:
+    python3 api_stats.py data_save/csv_save --top 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import sys
+import threading
+from array import array
+from collections import Counter
+from itertools import chain, combinations
+from pathlib import Path
+from stat import S_ISREG
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from api_vocab import ApiVocabulary, default_vocabulary, unique_ids
+
+__all__ = ["ApiStats", "ApiStatsIndex", "extract_units"]
+
+STATS_SUFFIXES = (".csv", ".json", ".md")
+
+# (api2 ids, api1 ids), each sorted and de-duplicated.
+Unit = Tuple[array, array]
+
+
+def _split_names(value: object) -> List[str]:
+    """Normalise an ``api2``/``api1``/``apis`` value (list or joined string) into names."""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        names = [str(entry).strip(" `") for entry in value]
+    else:
+        text = str(value)
+        names = re.findall(r"`([^`]+)`", text) or re.split(r"[\n,]", text)
+        names = [name.strip(" `") for name in names]
+    return [name for name in names if name]
+
+
+def _unit(vocabulary: ApiVocabulary, api2: object, api1: object) -> Optional[Unit]:
+    ids2 = unique_ids(vocabulary.encode(_split_names(api2)))
+    ids1 = unique_ids(vocabulary.encode(_split_names(api1)))
+    if not ids2 and not ids1:
+        return None
+    return ids2, ids1
+
+
+def _tree_units(node: Mapping, vocabulary: ApiVocabulary) -> Iterator[Unit]:
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if not isinstance(current, Mapping):
+            continue
+        unit = _unit(vocabulary, current.get("api2"), current.get("api1"))
+        if unit is not None:
+            yield unit
+        children = current.get("children")
+        if isinstance(children, list):
+            stack.extend(children)
+
+
+def _proof_units(proof: Mapping, vocabulary: ApiVocabulary) -> Iterator[Unit]:
+    steps = proof.get("steps")
+    if not isinstance(steps, list):
+        return
+    for step in steps:
+        if not isinstance(step, Mapping):
+            continue
+        unit = _unit(vocabulary, step.get("apis") or step.get("api"), None)
+        if unit is not None:
+            yield unit
+        substeps = step.get("substeps")
+        for substep in substeps if isinstance(substeps, list) else []:
+            if isinstance(substep, Mapping):
+                unit = _unit(vocabulary, substep.get("api2"), substep.get("api1"))
+                if unit is not None:
+                    yield unit
+
+
+def extract_units(path: Path, vocabulary: Optional[ApiVocabulary] = None) -> List[Unit]:
+    """Read ``path`` and return its API units; unreadable formats yield no units."""
+    if vocabulary is None:
+        vocabulary = default_vocabulary()
+    text = path.read_text(encoding="utf-8")
+    suffix = path.suffix.lower()
+    units: List[Unit] = []
+
+    if suffix == ".csv":
+        from columnar import parse_dataset_csv
+
+        for _, api2, api1 in parse_dataset_csv(text):
+            unit = _unit(vocabulary, api2, api1)
+            if unit is not None:
+                units.append(unit)
+        return units
+
+    if suffix == ".md":
+        from markdown_to_json import MarkdownParseError, markdown_to_json
+
+        try:
+            return list(_proof_units(markdown_to_json(text), vocabulary))
+        except MarkdownParseError:
+            return units
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return units
+    if isinstance(data, Mapping) and isinstance(data.get("root"), Mapping):
+        return list(_tree_units(data["root"], vocabulary))
+    if isinstance(data, Mapping):
+        return list(_proof_units(data, vocabulary))
+    return units
+
+
+def _pair_key(a: int, b: int) -> int:
+    return (a << 32) | b if a < b else (b << 32) | a
+
+
+class _Contribution:
+    """Counts one file adds to the corpus totals."""
+
+    __slots__ = ("stamp", "units", "api2", "api1", "units_with", "pairs")
+
+    def __init__(self, stamp: Tuple[int, int], units: Iterable[Unit]):
+        self.stamp = stamp
+        units = list(units)
+        self.units = len(units)
+        # Each counter is filled by one C-level pass over a flat id stream.
+        merged = [unique_ids(ids2 + ids1) for ids2, ids1 in units]
+        self.api2: Counter = Counter(chain.from_iterable(ids2 for ids2, _ in units))
+        self.api1: Counter = Counter(chain.from_iterable(ids1 for _, ids1 in units))
+        self.units_with: Counter = Counter(chain.from_iterable(merged))
+        # ``merged`` is sorted, so every pair comes out as (smaller, larger).
+        self.pairs: Counter = Counter(
+            (a << 32) | b for ids in merged if len(ids) > 1 for a, b in combinations(ids, 2))
+
+
+class ApiStats:
+    """Immutable snapshot of the corpus totals with derived statistics."""
+
+    def __init__(self, vocabulary: ApiVocabulary, files: int, units: int,
+                 api2: Counter, api1: Counter, units_with: Counter, pairs: Counter):
+        self.vocabulary = vocabulary
+        self.files = files
+        self.units = units
+        self.api2 = api2
+        self.api1 = api1
+        self.units_with = units_with
+        self.pairs = pairs
+
+    def pmi(self, a: int, b: int) -> Optional[float]:
+        """Pointwise mutual information of two ids co-occurring inside a unit."""
+        joint = self.pairs.get(_pair_key(a, b), 0)
+        if not joint or not self.units:
+            return None
+        return math.log(joint * self.units / (self.units_with[a] * self.units_with[b]))
+
+    def api_summary(self, api_id: int) -> Dict[str, object]:
+        count2, count1 = self.api2.get(api_id, 0), self.api1.get(api_id, 0)
+        total = count2 + count1
+        return {
+            "api": self.vocabulary.name(api_id),
+            "api2": count2,
+            "api1": count1,
+            "total": total,
+            "api2_ratio": count2 / total if total else None,
+            "units": self.units_with.get(api_id, 0),
+        }
+
+    def top_apis(self, limit: int = 50) -> List[Dict[str, object]]:
+        ranked = sorted(self.units_with, key=lambda i: (-(self.api2[i] + self.api1[i]), self.vocabulary.name(i)))
+        return [self.api_summary(i) for i in ranked[:limit]]
+
+    def top_pairs(self, limit: int = 50, min_count: int = 2, by: str = "pmi") -> List[Dict[str, object]]:
+        """Most associated API pairs; ``by`` is ``"pmi"`` or ``"count"``."""
+        mask = (1 << 32) - 1
+        candidates = [(key >> 32, key & mask, n) for key, n in self.pairs.items() if n >= min_count]
+        if by == "count":
+            candidates.sort(key=lambda c: -c[2])
+        else:
+            candidates.sort(key=lambda c: -self.pmi(c[0], c[1]))
+        return [self._pair_entry(a, b, n) for a, b, n in candidates[:limit]]
+
+    def neighbours(self, name: str, limit: int = 50, min_count: int = 1) -> Optional[List[Dict[str, object]]]:
+        """APIs co-occurring with ``name``, strongest PMI first; ``None`` if it never occurs."""
+        api_id = self.vocabulary.lookup(name)
+        if api_id is None or not self.units_with.get(api_id):
+            return None
+        mask = (1 << 32) - 1
+        found = []
+        for key, n in self.pairs.items():
+            if n < min_count:
+                continue
+            a, b = key >> 32, key & mask
+            if a == api_id or b == api_id:
+                found.append((a, b, n))
+        found.sort(key=lambda c: (-self.pmi(c[0], c[1]), -c[2]))
+        return [self._pair_entry(a, b, n) for a, b, n in found[:limit]]
+
+    def _pair_entry(self, a: int, b: int, count: int) -> Dict[str, object]:
+        return {
+            "apis": [self.vocabulary.name(a), self.vocabulary.name(b)],
+            "count": count,
+            "pmi": self.pmi(a, b),
+        }
+
+    def to_dict(self, top: int = 50, min_count: int = 2) -> Dict[str, object]:
+        return {
+            "files": self.files,
+            "units": self.units,
+            "distinct_apis": len(self.units_with),
+            "apis": self.top_apis(top),
+            "pairs": self.top_pairs(top, min_count),
+        }
+
+
+class ApiStatsIndex:
+    """
+    Incrementally maintained statistics for the files of one or more directories.
+
+    ``stats(directory)`` stats the directory, re-reads only files whose
+    ``(mtime_ns, size)`` changed, and adjusts the running totals by the
+    difference. ``invalidate(path)`` forces a file to be re-read on the next
+    call, for writers that may keep the same mtime.
+
+    Scans are serialized by their own lock; ``invalidate`` only marks the
+    path under a short-lived lock, so saves never wait for a scan.
+    """
+
+    def __init__(self, vocabulary: Optional[ApiVocabulary] = None):
+        self.vocabulary = vocabulary if vocabulary is not None else default_vocabulary()
+        self._scan_lock = threading.Lock()
+        self._stale_lock = threading.Lock()
+        self._stale: Set[Path] = set()
+        self._directories: Dict[Path, Dict[Path, _Contribution]] = {}
+        self._totals: Dict[Path, List] = {}
+        self._snapshots: Dict[Path, ApiStats] = {}
+
+    def invalidate(self, path: Path) -> None:
+        path = Path(path).resolve()
+        with self._stale_lock:
+            self._stale.add(path)
+
+    def stats(self, directory: Path) -> ApiStats:
+        directory = Path(directory).resolve()
+        with self._scan_lock:
+            # Taken before the scan: a save invalidated after this point is
+            # picked up by the next call.
+            with self._stale_lock:
+                stale = {p for p in self._stale if p.parent == directory}
+                self._stale -= stale
+            contributions = self._directories.setdefault(directory, {})
+            totals = self._totals.setdefault(directory, [0, Counter(), Counter(), Counter(), Counter()])
+            changed = False
+
+            current = {}
+            if directory.is_dir():
+                for p in directory.iterdir():
+                    if p.suffix.lower() not in STATS_SUFFIXES:
+                        continue
+                    try:
+                        stat = p.stat()
+                    except FileNotFoundError:
+                        continue  # deleted while listing
+                    if S_ISREG(stat.st_mode):
+                        current[p] = (stat.st_mtime_ns, stat.st_size)
+
+            for p in list(contributions):
+                if p not in current:
+                    self._apply(totals, contributions.pop(p), -1)
+                    changed = True
+            for p, stamp in current.items():
+                old = contributions.get(p)
+                if old is not None and old.stamp == stamp and p not in stale:
+                    continue
+                try:
+                    units = extract_units(p, self.vocabulary)
+                except (OSError, UnicodeDecodeError):
+                    units = []
+                new = _Contribution(stamp, units)
+                if old is not None:
+                    self._apply(totals, old, -1)
+                self._apply(totals, new, 1)
+                contributions[p] = new
+                changed = True
+
+            snapshot = self._snapshots.get(directory)
+            if snapshot is None or changed:
+                units, api2, api1, units_with, pairs = totals
+                snapshot = ApiStats(self.vocabulary, len(contributions), units,
+                                    +api2, +api1, +units_with, +pairs)
+                self._snapshots[directory] = snapshot
+            return snapshot
+
+    @staticmethod
+    def _apply(totals: List, contribution: _Contribution, sign: int) -> None:
+        totals[0] += sign * contribution.units
+        for total, part in zip(totals[1:], (contribution.api2, contribution.api1,
+                                            contribution.units_with, contribution.pairs)):
+            if sign > 0:
+                total.update(part)
+            else:
+                total.subtract(part)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API frequency and co-occurrence statistics")
+    parser.add_argument("directory", help="Directory with saved CSV/JSON/Markdown proofs")
+    parser.add_argument("--top", type=int, default=20, help="Number of APIs and pairs to show")
+    parser.add_argument("--min-count", type=int, default=2, help="Minimum co-occurrence count for pairs")
+    parser.add_argument("--api", help="Show the co-occurring APIs of this API instead")
+    args = parser.parse_args()
+
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        print(f"Error: Directory '{args.directory}' not found", file=sys.stderr)
+        sys.exit(1)
+
+    stats = ApiStatsIndex(ApiVocabulary()).stats(directory)
+    if args.api:
+        result = stats.neighbours(args.api, args.top, args.min_count)
+        if result is None:
+            print(f"Error: API '{args.api}' does not occur in {args.directory}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        result = stats.to_dict(args.top, args.min_count)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    from cli_daemon import run_via_daemon
+
+    status = run_via_daemon("api_stats")
+    if status is not None:
+        sys.exit(status)
+    main()
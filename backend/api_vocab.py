@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Shared API vocabulary: dense integer ids for Lean API names.
+
+Parsed proofs, extraction results and dataset rows all repeat the same few
+thousand names (``Ideal.IsPrime.comap``, ...). ``ApiVocabulary`` interns each
+name once and hands out a dense id, so bulk work (dedup, counting, set
+algebra) runs on ``array('I')`` integer arrays and every decoded list shares
+the same string objects.
+
+Ids are only meaningful within one process: nothing persists them, and
+files that store ids (``columnar``) carry their own vocabulary.
+"""
+
+from __future__ import annotations
+
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+__all__ = [
+    "ApiVocabulary",
+    "count_ids",
+    "default_vocabulary",
+    "difference_ids",
+    "intersect_ids",
+    "union_ids",
+    "unique_ids",
+]
+
+
+class ApiVocabulary:
+    """Bidirectional ``name <-> id`` mapping."""
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._ids
+
+    def intern(self, name: str) -> int:
+        """Return the id of ``name``, assigning the next free id if it is new."""
+        api_id = self._ids.get(name)
+        if api_id is not None:
+            return api_id
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"Invalid API name: {name!r}")
+        with self._lock:
+            api_id = self._ids.get(name)
+            if api_id is None:
+                api_id = len(self._names)
+                self._names.append(name)
+                self._ids[name] = api_id
+            return api_id
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Return the id of ``name`` without interning it."""
+        return self._ids.get(name)
+
+    def name(self, api_id: int) -> str:
+        return self._names[api_id]
+
+    def encode(self, names: Iterable[str]) -> array:
+        """Intern ``names`` and return their ids (order and duplicates kept)."""
+        intern = self.intern
+        return array("I", [intern(name) for name in names])
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        names = self._names
+        return [names[i] for i in ids]
+
+    def canonical(self, name: str) -> str:
+        """Return the vocabulary's shared string object for ``name``."""
+        return self._names[self.intern(name)]
+
+
+def unique_ids(ids: Iterable[int]) -> array:
+    """Sorted, de-duplicated copy of ``ids``."""
+    return array("I", sorted(set(ids)))
+
+
+def count_ids(ids: Iterable[int], size: int) -> array:
+    """Frequency of every id in ``range(size)`` (like ``numpy.bincount``)."""
+    counts = array("I", bytes(4 * size))
+    for api_id in ids:
+        counts[api_id] += 1
+    return counts
+
+
+def union_ids(a: Iterable[int], b: Iterable[int]) -> array:
+    return array("I", sorted(set(a).union(b)))
+
+
+def intersect_ids(a: Iterable[int], b: Iterable[int]) -> array:
+    return array("I", sorted(set(a).intersection(b)))
+
+
+def difference_ids(a: Iterable[int], b: Iterable[int]) -> array:
+    return array("I", sorted(set(a).difference(b)))
+
+
+_DEFAULT = ApiVocabulary()
+
+
+def default_vocabulary() -> ApiVocabulary:
+    """The process-wide vocabulary used by the parsers and extraction."""
+    return _DEFAULT
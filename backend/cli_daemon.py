@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Warm daemon for the conversion CLIs.
+
+Starting Python and importing the conversion modules costs far more than
+converting one small proof, which dominates shell pipelines that call the
+CLIs thousands of times. ``serve`` imports every registered CLI once and
+listens on a Unix socket; each request is handled in a forked child that
+inherits the warm modules.
+
+A CLI started with ``BRICKMOVE_DAEMON_SOCKET`` set hands its arguments,
+working directory and its stdin/stdout/stderr file descriptors to the
+daemon (``SCM_RIGHTS``), so output goes straight to the caller's terminal or
+pipe, and exits with the status the daemon reports. If the daemon is not
+reachable the CLI simply runs in-process.
+
+Requests run as the daemon's user in a directory the client chooses, so the
+socket is created with mode 0600 and, where the platform reports peer
+credentials (``SO_PEERCRED``), connections from other users are refused.
+
+Usage:
+    python3 cli_daemon.py serve --socket "$XDG_RUNTIME_DIR/brickmove.sock" &
+    export BRICKMOVE_DAEMON_SOCKET="$XDG_RUNTIME_DIR/brickmove.sock"
+    python3 json_to_markdown.py proof.json -o proof.md
+"""
+
+import os
+import sys
+from array import array
+
+# The client side runs on every CLI start, so it avoids ``socket`` and
+# ``json`` (which pull in enum, selectors and re) and speaks a tiny
+# length-prefixed protocol over the C-level ``_socket`` module instead.
+import _socket
+
+__all__ = ["COMMANDS", "run_via_daemon", "serve"]
+
+SOCKET_ENV = "BRICKMOVE_DAEMON_SOCKET"
+
+# CLI name -> module whose ``main()`` implements it.
+COMMANDS = {
+    "json_to_markdown": "json_to_markdown",
+    "legacy_tree": "legacy_tree",
+    "columnar": "columnar",
+    "api_stats": "api_stats",
+    "near_dup": "near_dup",
+}
+
+_MAX_MESSAGE = 1 << 20
+
+
+def _encode_request(command, cwd, argv):
+    """``<length>\\n`` followed by NUL-separated command, cwd and arguments."""
+    body = b"\0".join(os.fsencode(part) for part in [command, cwd, *argv])
+    return b"%d\n" % len(body) + body
+
+
+def _recv_until(sock, data, size):
+    while len(data) < size:
+        chunk = sock.recv(65536)
+        if not chunk:
+            raise ValueError("truncated request")
+        data += chunk
+    return data
+
+
+def _decode_request(sock, first_chunk):
+    header, _, data = first_chunk.partition(b"\n")
+    size = int(header)
+    if size > _MAX_MESSAGE:
+        raise ValueError("request too large")
+    parts = [os.fsdecode(part) for part in _recv_until(sock, data, size)[:size].split(b"\0")]
+    if len(parts) < 2:
+        raise ValueError("malformed request")
+    return parts[0], parts[1], parts[2:]
+
+
+def run_via_daemon(command, argv=None):
+    """
+    Run ``command`` in the daemon named by ``$BRICKMOVE_DAEMON_SOCKET``.
+
+    Returns the exit status, or ``None`` if no daemon is configured or
+    reachable (the caller should then run the command itself).
+    """
+    path = os.environ.get(SOCKET_ENV)
+    if not path:
+        return None
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+
+    request = _encode_request(command, os.getcwd(), sys.argv[1:] if argv is None else list(argv))
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        fds = array("i", [0, 1, 2])
+        sent = sock.sendmsg([request], [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, fds)])
+        if sent < len(request):
+            sock.sendall(request[sent:])
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = sock.recv(64)
+            if not chunk:
+                break
+            reply += chunk
+    finally:
+        sock.close()
+    try:
+        return int(reply)
+    except ValueError:
+        print("Error: daemon closed the connection without a result", file=sys.stderr)
+        return 1
+
+
+def _run_command(module, argv):
+    """Run ``module.main()`` as if started from the shell; return its exit status."""
+    sys.argv = [f"{module.__name__}.py"] + argv
+    try:
+        module.main()
+        code = 0
+    except BrokenPipeError:
+        # The reader went away (``... | head``); exit like a process killed by SIGPIPE.
+        return 141
+    except SystemExit as exc:
+        if exc.code is None:
+            code = 0
+        elif isinstance(exc.code, int):
+            code = exc.code
+        else:
+            print(exc.code, file=sys.stderr)
+            code = 1
+    except Exception:
+        import traceback
+
+        traceback.print_exc()
+        code = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BrokenPipeError:
+        return 141
+    return code
+
+
+def serve(path):
+    """Import all CLIs and answer requests on the Unix socket at ``path`` until interrupted."""
+    import importlib
+    import signal
+    import socket
+    import socketserver
+    import struct
+
+    modules = {name: importlib.import_module(module) for name, module in COMMANDS.items()}
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            # Runs in a forked child: redirecting fds and chdir only affect this request.
+            message, fds, _, _ = socket.recv_fds(self.request, 65536, 3)
+            try:
+                command, cwd, argv = _decode_request(self.request, message)
+                module = modules[command]
+                for target, fd in enumerate(fds):
+                    os.dup2(fd, target)
+                    os.close(fd)
+                os.chdir(cwd)
+                code = _run_command(module, argv)
+            except (ValueError, KeyError, OSError) as exc:
+                print(f"cli_daemon: bad request: {exc!r}", file=sys.stderr)
+                code = 2
+            self.request.sendall(b"%d\n" % code)
+
+    class Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+        def verify_request(self, request, client_address):
+            if not hasattr(socket, "SO_PEERCRED"):
+                return True  # the socket's 0600 mode is the only check
+            creds = request.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+            _, uid, _ = struct.unpack("3i", creds)
+            if uid != os.getuid():
+                print(f"cli_daemon: refused a connection from uid {uid}", file=sys.stderr)
+                return False
+            return True
+
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)  # stale socket from a previous run
+        else:
+            probe.close()
+            raise RuntimeError(f"A daemon is already listening on {path}")
+
+    # Let ``kill`` shut down cleanly and remove the socket.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # Bind with a umask that leaves the socket accessible to its owner only.
+    umask = os.umask(0o177)
+    try:
+        server = Server(path, Handler)
+    finally:
+        os.umask(umask)
+    with server:
+        print(f"✅ CLI daemon listening on {path} ({', '.join(sorted(modules))})", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Warm daemon for the conversion CLIs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Listen for CLI requests on a Unix socket")
+    serve_parser.add_argument("--socket", default=os.environ.get(SOCKET_ENV),
+                              help=f"Socket path (default: ${SOCKET_ENV})")
+    args = parser.parse_args()
+
+    if not args.socket:
+        print(f"Error: pass --socket or set {SOCKET_ENV}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        serve(args.socket)
+    except RuntimeError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Server-push channel for collaborative editing of tree documents.
+
+Clients subscribe to a document over Server-Sent Events and push their own
+edits through ``/api/tree-sync``. Every applied change set is handed to the
+``CollabHub``, which batches rapid edits per document for a short interval,
+coalesces repeated field updates on the same node and fans the result out to
+all subscribers as a single small delta.
+"""
+
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Mapping, Optional
+
+__all__ = ["CollabHub", "Subscription", "sse_event"]
+
+
+class Subscription:
+    """One connected client listening to one document."""
+
+    def __init__(self, doc: str, client_id: Optional[str], max_events: int):
+        self.doc = doc
+        self.client_id = client_id
+        self.events: "queue.Queue[Dict]" = queue.Queue(maxsize=max_events)
+        self.overflowed = False
+
+
+def coalesce_changes(changes: List[Mapping]) -> List[Dict]:
+    """
+    Merge field updates to the same node that are not separated by a
+    structural change. A ``reset`` discards everything queued before it.
+    """
+    merged: List[Dict] = []
+    pending_updates: Dict[str, Dict] = {}
+    for change in changes:
+        op = change.get("op")
+        if op == "reset":
+            merged = [dict(change)]
+            pending_updates = {}
+            continue
+        if op == "update" and isinstance(change.get("id"), str):
+            previous = pending_updates.get(change["id"])
+            if previous is not None:
+                previous["fields"].update(change.get("fields") or {})
+                continue
+            entry = {"op": "update", "id": change["id"], "fields": dict(change.get("fields") or {})}
+            pending_updates[change["id"]] = entry
+            merged.append(entry)
+            continue
+        # Structural change: later updates must not jump ahead of it.
+        pending_updates = {}
+        merged.append(dict(change))
+    return merged
+
+
+class CollabHub:
+    """
+    Fan-out hub keyed by document path.
+
+    ``publish`` only queues work; a background thread flushes queued batches
+    every ``flush_interval`` seconds so that a burst of keystrokes turns into
+    one event per document. Consecutive batches from the same client are
+    merged when their versions chain (``a.version == b.base_version``).
+    """
+
+    def __init__(self, flush_interval: float = 0.05, max_events: int = 256):
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        self._pending: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def subscribe(self, doc: str, client_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(doc, client_id, self.max_events)
+        with self._lock:
+            self._subscribers.setdefault(doc, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.doc, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.doc, None)
+
+    def subscriber_count(self, doc: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(doc, []))
+
+    def publish(
+        self,
+        doc: str,
+        base_version: int,
+        version: int,
+        changes: List[Mapping],
+        origin: Optional[str] = None,
+    ) -> None:
+        """Queue an applied change set (``base_version`` -> ``version``)."""
+        with self._lock:
+            if doc not in self._subscribers:
+                return
+            batches = self._pending.setdefault(doc, [])
+            last = batches[-1] if batches else None
+            if (
+                last is not None
+                and last["type"] == "changes"
+                and last["origin"] == origin
+                and last["version"] == base_version
+            ):
+                last["changes"].extend(changes)
+                last["version"] = version
+            else:
+                batches.append({
+                    "type": "changes",
+                    "doc": doc,
+                    "origin": origin,
+                    "base_version": base_version,
+                    "version": version,
+                    "changes": list(changes),
+                })
+            self._ensure_flusher()
+        self._wakeup.set()
+
+    def publish_reload(self, doc: str, origin: Optional[str] = None) -> None:
+        """Tell subscribers the document was replaced wholesale and must be re-read."""
+        with self._lock:
+            if doc not in self._subscribers:
+                return
+            # Anything still queued for this document is superseded.
+            self._pending[doc] = [{"type": "reload", "doc": doc, "origin": origin}]
+            self._ensure_flusher()
+        self._wakeup.set()
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._run, name="collab-flusher", daemon=True)
+            self._flusher.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            # Let a burst of edits accumulate before fanning out.
+            time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            targets = {doc: list(self._subscribers.get(doc, [])) for doc in pending}
+
+        for doc, batches in pending.items():
+            for batch in batches:
+                if batch["type"] == "changes":
+                    batch["changes"] = coalesce_changes(batch["changes"])
+                for subscription in targets.get(doc, []):
+                    self._deliver(subscription, batch)
+
+    def _deliver(self, subscription: Subscription, event: Dict) -> None:
+        if subscription.overflowed:
+            return
+        try:
+            subscription.events.put_nowait(event)
+        except queue.Full:
+            # A client that stopped reading only needs to know it must resync.
+            subscription.overflowed = True
+            with subscription.events.mutex:
+                subscription.events.queue.clear()
+            subscription.events.put_nowait({"type": "reload", "doc": subscription.doc, "origin": None})
+
+    def stream(self, subscription: Subscription, heartbeat: float = 15.0) -> Iterator[str]:
+        """Yield Server-Sent Events for ``subscription`` until the client disconnects."""
+        try:
+            yield sse_event("hello", {"doc": subscription.doc})
+            while True:
+                try:
+                    event = subscription.events.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                subscription.overflowed = False
+                yield sse_event(event["type"], event)
+        finally:
+            self.unsubscribe(subscription)
+
+
+def sse_event(event: str, data: Mapping) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
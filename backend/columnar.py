@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Compact columnar storage for the three-column proof dataset.
+
+The CSV export (``informal statement``, ``score 2 api``, ``score 1 api``) keeps
+API lists as newline-joined backticked strings that every consumer has to
+re-parse. This module writes the same rows to a single ``.bmcol`` file:
+
+* statements as one UTF-8 blob plus a ``uint64`` offsets column;
+* ``api2`` / ``api1`` as list columns: ``uint32`` offsets into a ``uint32``
+  column of dictionary-encoded API ids;
+* the file's own API vocabulary (the names those ids refer to) as another
+  string column. Ids are dense per file; they are not the ids of the
+  process-wide ``api_vocab`` vocabulary.
+
+All columns are 8-byte aligned and described by a JSON header, so a reader
+can ``mmap`` the file and view every numeric column in place through
+``memoryview.cast`` (or ``numpy.frombuffer``, if NumPy is installed) without
+parsing anything.
+
+Usage:
+    python3 columnar.py export data_save/csv_save/*.csv -o dataset.bmcol
+    python3 columnar.py import dataset.bmcol -o dataset.csv
+    python3 columnar.py info dataset.bmcol
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from api_vocab import ApiVocabulary
+
+__all__ = [
+    "ColumnarDataset",
+    "ColumnarFormatError",
+    "parse_dataset_csv",
+    "split_api_field",
+    "write_columnar",
+]
+
+MAGIC = b"BMCOL\x00\x01\x00"
+CSV_HEADER = ["informal statement", "score 2 api", "score 1 api"]
+_TYPECODES = {"u4": "I", "u8": "Q"}
+
+Row = Tuple[str, List[str], List[str]]
+
+
+class ColumnarFormatError(ValueError):
+    """Raised when a ``.bmcol`` file is malformed."""
+
+
+def split_api_field(text: str) -> List[str]:
+    """Split a CSV API cell (backticked and newline/comma separated) into names."""
+    if not text:
+        return []
+    matches = [m.strip() for m in re.findall(r"`([^`]+)`", text)]
+    if matches:
+        return [m for m in matches if m]
+    return [part.strip() for part in re.split(r"[\n,]", text) if part.strip()]
+
+
+def parse_dataset_csv(text: str) -> Iterator[Row]:
+    """Yield ``(statement, api2, api1)`` rows from a three-column export."""
+    reader = csv.reader(io.StringIO(text))
+    header = next(reader, None)
+    if header is None:
+        return
+    for record in reader:
+        if not record:
+            continue
+        record = (record + ["", "", ""])[:3]
+        yield record[0], split_api_field(record[1]), split_api_field(record[2])
+
+
+def _check_itemsizes() -> None:
+    if array("I").itemsize != 4 or array("Q").itemsize != 8:
+        raise ColumnarFormatError("Platform array item sizes are not 4/8 bytes")
+
+
+class _StringColumnBuilder:
+    def __init__(self) -> None:
+        self.offsets = array("Q", [0])
+        self.data = bytearray()
+
+    def append(self, value: str) -> None:
+        self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+
+class _ListColumnBuilder:
+    def __init__(self) -> None:
+        self.offsets = array("I", [0])
+        self.values = array("I")
+
+    def append(self, ids: Iterable[int]) -> None:
+        self.values.extend(ids)
+        self.offsets.append(len(self.values))
+
+
+def write_columnar(rows: Iterable[Row], path: Path) -> Dict[str, int]:
+    """Write ``rows`` to ``path`` in the ``.bmcol`` layout and return basic counts."""
+    _check_itemsizes()
+    # A file-local vocabulary keeps the stored ids dense for this dataset.
+    vocabulary = ApiVocabulary()
+    statements = _StringColumnBuilder()
+    api2 = _ListColumnBuilder()
+    api1 = _ListColumnBuilder()
+
+    count = 0
+    for statement, api2_names, api1_names in rows:
+        statements.append(statement)
+        api2.append(vocabulary.encode(api2_names))
+        api1.append(vocabulary.encode(api1_names))
+        count += 1
+
+    vocab_column = _StringColumnBuilder()
+    for api_id in range(len(vocabulary)):
+        vocab_column.append(vocabulary.name(api_id))
+
+    columns = [
+        ("statement_offsets", "u8", statements.offsets.tobytes()),
+        ("statement_data", "bytes", bytes(statements.data)),
+        ("api2_offsets", "u4", api2.offsets.tobytes()),
+        ("api2_ids", "u4", api2.values.tobytes()),
+        ("api1_offsets", "u4", api1.offsets.tobytes()),
+        ("api1_ids", "u4", api1.values.tobytes()),
+        ("vocab_offsets", "u8", vocab_column.offsets.tobytes()),
+        ("vocab_data", "bytes", bytes(vocab_column.data)),
+    ]
+
+    # The header size depends on the offsets it records; lay out against a
+    # generously padded header and fix it in place.
+    header: Dict = {"rows": count, "vocab_size": len(vocabulary), "byteorder": sys.byteorder, "columns": {}}
+    header_capacity = _align(len(json.dumps(_layout(header, columns, 0))) + 256)
+    data_start = len(MAGIC) + 8 + header_capacity
+    header = _layout(header, columns, data_start)
+    header_bytes = json.dumps(header).encode("utf-8").ljust(header_capacity, b" ")
+
+    # A unique temporary name, so concurrent exports to one target never share it.
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", header_capacity))
+            f.write(header_bytes)
+            for _, _, payload in columns:
+                f.write(payload)
+                f.write(b"\x00" * (_align(len(payload)) - len(payload)))
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    return {"rows": count, "vocab_size": len(vocabulary), "api_entries": len(api2.values) + len(api1.values)}
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _layout(header: Dict, columns, start: int) -> Dict:
+    layout = dict(header, columns={})
+    offset = start
+    for name, dtype, payload in columns:
+        layout["columns"][name] = {"dtype": dtype, "offset": offset, "length": len(payload)}
+        offset += _align(len(payload))
+    return layout
+
+
+class ColumnarDataset:
+    """
+    Read-only, memory-mapped view of a ``.bmcol`` file.
+
+    Numeric columns are exposed as ``memoryview`` objects over the mapping,
+    so ``api2_ids`` / ``api2_offsets`` can be scanned without copying; use
+    ``column_array`` to get an owned ``array`` instead.
+    """
+
+    def __init__(self, path: Path):
+        _check_itemsizes()
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ColumnarFormatError("Empty file") from None
+        self._view = memoryview(self._mmap)
+        try:
+            try:
+                self._open_columns()
+            except ColumnarFormatError:
+                raise
+            except (struct.error, ValueError, KeyError, TypeError) as exc:
+                # Truncated or corrupt header (ValueError covers JSON and UTF-8 errors).
+                raise ColumnarFormatError(f"Corrupt header: {exc}") from None
+        except BaseException:
+            # Missing columns or a bad header: do not leak the mapping and the descriptor.
+            self.close()
+            raise
+
+    def _open_columns(self) -> None:
+        if bytes(self._view[:len(MAGIC)]) != MAGIC:
+            raise ColumnarFormatError("Not a .bmcol file")
+        (header_len,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(bytes(self._view[start:start + header_len]).decode("utf-8"))
+        if not isinstance(self.header, dict) or not isinstance(self.header.get("rows"), int):
+            raise ColumnarFormatError("Corrupt header")
+        if self.header.get("byteorder") != sys.byteorder:
+            raise ColumnarFormatError("File was written on a platform with a different byte order")
+
+        self.rows = self.header["rows"]
+        self.statement_offsets = self._column("statement_offsets")
+        self.statement_data = self._column("statement_data")
+        self.api2_offsets = self._column("api2_offsets")
+        self.api2_ids = self._column("api2_ids")
+        self.api1_offsets = self._column("api1_offsets")
+        self.api1_ids = self._column("api1_ids")
+        self._vocab_offsets = self._column("vocab_offsets")
+        self._vocab_data = self._column("vocab_data")
+        self._vocabulary: Optional[List[str]] = None
+
+    def _column(self, name: str) -> memoryview:
+        spec = self.header["columns"].get(name)
+        if spec is None:
+            raise ColumnarFormatError(f"Missing column: {name}")
+        end = spec["offset"] + spec["length"]
+        if spec["offset"] < 0 or end > len(self._view):
+            raise ColumnarFormatError(f"Column {name} extends past the end of the file (truncated?)")
+        raw = self._view[spec["offset"]:end]
+        typecode = _TYPECODES.get(spec["dtype"])
+        return raw.cast(typecode) if typecode else raw
+
+    def close(self) -> None:
+        for name in ("statement_offsets", "statement_data", "api2_offsets", "api2_ids",
+                     "api1_offsets", "api1_ids", "_vocab_offsets", "_vocab_data"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "ColumnarDataset":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def vocabulary(self) -> List[str]:
+        """API names indexed by id (decoded once, on first use)."""
+        if self._vocabulary is None:
+            data = bytes(self._vocab_data)
+            offsets = self._vocab_offsets
+            self._vocabulary = [
+                data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)
+            ]
+        return self._vocabulary
+
+    def statement(self, row: int) -> str:
+        start, end = self.statement_offsets[row], self.statement_offsets[row + 1]
+        return bytes(self.statement_data[start:end]).decode("utf-8")
+
+    def api2_row_ids(self, row: int) -> memoryview:
+        return self.api2_ids[self.api2_offsets[row]:self.api2_offsets[row + 1]]
+
+    def api1_row_ids(self, row: int) -> memoryview:
+        return self.api1_ids[self.api1_offsets[row]:self.api1_offsets[row + 1]]
+
+    def row(self, row: int) -> Row:
+        vocabulary = self.vocabulary
+        return (
+            self.statement(row),
+            [vocabulary[i] for i in self.api2_row_ids(row)],
+            [vocabulary[i] for i in self.api1_row_ids(row)],
+        )
+
+    def __iter__(self) -> Iterator[Row]:
+        for i in range(self.rows):
+            yield self.row(i)
+
+    def column_array(self, name: str) -> array:
+        """Copy a numeric column into an ``array`` that outlives the mapping."""
+        view = self._column(name)
+        return array(view.format, view)
+
+
+def rows_to_csv(rows: Iterable[Row]) -> str:
+    """Render rows back into the tree workspace's three-column CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_HEADER)
+    for statement, api2, api1 in rows:
+        writer.writerow([
+            statement,
+            "\n".join(f"`{name}`" for name in api2),
+            "\n".join(f"`{name}`" for name in api1),
+        ])
+    return buffer.getvalue()
+
+
+def _iter_csv_files(paths: Sequence[Path]) -> Iterator[Row]:
+    for path in paths:
+        yield from parse_dataset_csv(path.read_text(encoding="utf-8"))
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert proof dataset CSVs to and from the .bmcol format")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="CSV files -> one .bmcol file")
+    export_parser.add_argument("inputs", nargs="+", help="Three-column CSV exports")
+    export_parser.add_argument("-o", "--output", required=True, help="Output .bmcol file")
+
+    import_parser = subparsers.add_parser("import", help=".bmcol file -> CSV")
+    import_parser.add_argument("input", help="Input .bmcol file")
+    import_parser.add_argument("-o", "--output", help="Output CSV file (default: stdout)")
+
+    info_parser = subparsers.add_parser("info", help="Show header information")
+    info_parser.add_argument("input", help="Input .bmcol file")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            stats = write_columnar(_iter_csv_files([Path(p) for p in args.inputs]), Path(args.output))
+            print(f"✅ {stats['rows']} rows, {stats['vocab_size']} distinct APIs written to {args.output}")
+            return
+
+        with ColumnarDataset(Path(args.input)) as dataset:
+            if args.command == "info":
+                print(json.dumps(dataset.header, indent=2))
+                return
+            text = rows_to_csv(dataset)
+        if args.output:
+            Path(args.output).write_text(text, encoding="utf-8")
+            print(f"✅ {len(dataset)} rows written to {args.output}")
+        else:
+            sys.stdout.write(text)
+    except FileNotFoundError as exc:
+        print(f"Error: File '{exc.filename}' not found", file=sys.stderr)
+        sys.exit(1)
+    except ColumnarFormatError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    from cli_daemon import run_via_daemon
+
+    status = run_via_daemon("columnar")
+    if status is not None:
+        sys.exit(status)
+    main()
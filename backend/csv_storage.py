@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import os
+import uuid
 from pathlib import Path
+from typing import Callable, Optional
 
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
+from path_locks import atomic_write_bytes, default_locks
+
 
 class CsvStorageError(Exception):
     """Raised when a CSV upload cannot be processed."""
@@ -36,6 +41,7 @@ def save_csv_file(
     file_storage: FileStorage,
     base_dir: Path,
     requested_directory: str | None = None,
+    after_write: Optional[Callable[[Path, bytes], None]] = None,
 ) -> Path:
     """
     Persist an uploaded ``FileStorage`` CSV to disk.
@@ -48,6 +54,8 @@ def save_csv_file(
         Root directory for workspace-relative paths.
     requested_directory:
         Optional directory path supplied by the client.
+    after_write:
+        See ``_write_file``.
 
     Returns
     -------
@@ -62,17 +70,8 @@ def save_csv_file(
         raise CsvStorageError("Only CSV files are supported")
 
     target_dir = _resolve_directory(base_dir, requested_directory)
-    target_path = target_dir / filename
-
-    stem = target_path.stem
-    suffix = target_path.suffix or ".csv"
-    counter = 1
-    while target_path.exists():
-        target_path = target_dir / f"{stem}_{counter}{suffix}"
-        counter += 1
-
-    file_storage.save(target_path)
-    return target_path
+    data = file_storage.read()
+    return _write_file(target_dir / filename, False, data, after_write=after_write)
 
 
 def get_default_directory(base_dir: Path) -> Path:
@@ -80,6 +79,67 @@ def get_default_directory(base_dir: Path) -> Path:
     return (base_dir / DEFAULT_SUBDIR).resolve()
 
 
+def _write_file(
+    target_path: Path,
+    overwrite: bool,
+    data: bytes,
+    before_overwrite: Optional[Callable[[Path], None]] = None,
+    after_write: Optional[Callable[[Path, bytes], None]] = None,
+) -> Path:
+    """
+    Write ``data`` to ``target_path`` under the path's write lock and return
+    the path that was written.
+
+    With ``overwrite``, ``before_overwrite(path)`` is called first if the
+    file exists (e.g. to keep its current content in the version history);
+    if it raises, the file is left untouched. ``after_write(path, data)`` is
+    called once the file is written, with the bytes this call wrote, so a
+    concurrent save of the same path cannot substitute its own content. Both
+    hooks run outside the write lock, so they may lock other paths,
+    including this one for reading.
+
+    Without ``overwrite`` the content is written to a hidden temporary file
+    first and then published with ``os.link`` under the first free name
+    among ``target_path``, ``<stem>_1<suffix>``, ... ``os.link`` fails if the
+    name exists, so concurrent saves of the same name never pick the same
+    file, and a new name only ever appears with its full content (also to
+    readers that do not take the lock, such as the directory listing).
+    """
+    locks = default_locks()
+    if overwrite:
+        if before_overwrite is not None and target_path.exists():
+            before_overwrite(target_path)
+        with locks.write(target_path):
+            atomic_write_bytes(target_path, data)
+    else:
+        target_path = _publish_new(target_path, data)
+    if after_write is not None:
+        after_write(target_path, data)
+    return target_path
+
+
+def _publish_new(target_path: Path, data: bytes) -> Path:
+    """The non-overwriting branch of ``_write_file``."""
+    locks = default_locks()
+    staging = target_path.with_name(f".{target_path.name}.{uuid.uuid4().hex}.tmp")
+    atomic_write_bytes(staging, data)
+    try:
+        stem, suffix = target_path.stem, target_path.suffix
+        n = 0
+        while True:
+            with locks.write(target_path):
+                try:
+                    os.link(staging, target_path)
+                except FileExistsError:
+                    pass
+                else:
+                    return target_path
+            n += 1
+            target_path = target_path.with_name(f"{stem}_{n}{suffix}")
+    finally:
+        staging.unlink(missing_ok=True)
+
+
 def _sanitize_filename_with_ext(name: str | None, default_base: str, ext: str) -> str:
     safe = secure_filename((name or '').strip())
     if not safe:
@@ -95,6 +155,8 @@ def save_csv_content(
     filename: str | None = None,
     requested_directory: str | None = None,
     overwrite: bool = False,
+    before_overwrite: Optional[Callable[[Path], None]] = None,
+    after_write: Optional[Callable[[Path, bytes], None]] = None,
 ) -> Path:
     """Write raw CSV text to disk and return the saved path.
 
@@ -102,23 +164,16 @@ def save_csv_content(
     ``requested_directory`` is provided. ``filename`` is sanitized and given a
     ``.csv`` extension if missing. When ``overwrite`` is ``False`` and the
     target path exists, a numeric suffix is appended to avoid clobbering.
+    The file is replaced atomically under its write lock; see ``_write_file``
+    for ``before_overwrite`` and ``after_write``.
     """
     if not isinstance(content, str):
         raise CsvStorageError('CSV content must be a string')
 
     target_dir = _resolve_directory(base_dir, requested_directory)
     filename = _sanitize_filename_with_ext(filename, 'export', '.csv')
-    target_path = target_dir / filename
-
-    if not overwrite:
-        stem, suffix = target_path.stem, target_path.suffix or '.csv'
-        n = 1
-        while target_path.exists():
-            target_path = target_dir / f"{stem}_{n}{suffix}"
-            n += 1
-
-    target_path.write_text(content, encoding='utf-8')
-    return target_path
+    return _write_file(target_dir / filename, overwrite, content.encode('utf-8'),
+                       before_overwrite, after_write)
 
 
 def save_md_content(
@@ -127,20 +182,15 @@ def save_md_content(
     filename: str | None = None,
     requested_directory: str | None = None,
     overwrite: bool = False,
+    before_overwrite: Optional[Callable[[Path], None]] = None,
+    after_write: Optional[Callable[[Path, bytes], None]] = None,
 ) -> Path:
     if not isinstance(content, str):
         raise CsvStorageError('Markdown content must be a string')
     target_dir = _resolve_directory(base_dir, requested_directory)
     filename = _sanitize_filename_with_ext(filename, 'proof', '.md')
-    target_path = target_dir / filename
-    if not overwrite:
-        stem, suffix = target_path.stem, target_path.suffix or '.md'
-        n = 1
-        while target_path.exists():
-            target_path = target_dir / f"{stem}_{n}{suffix}"
-            n += 1
-    target_path.write_text(content, encoding='utf-8')
-    return target_path
+    return _write_file(target_dir / filename, overwrite, content.encode('utf-8'),
+                       before_overwrite, after_write)
 
 
 def save_json_content(
@@ -149,6 +199,8 @@ def save_json_content(
     filename: str | None = None,
     requested_directory: str | None = None,
     overwrite: bool = False,
+    before_overwrite: Optional[Callable[[Path], None]] = None,
+    after_write: Optional[Callable[[Path, bytes], None]] = None,
 ) -> Path:
     import json
 
@@ -161,14 +213,5 @@ def save_json_content(
 
     target_dir = _resolve_directory(base_dir, requested_directory)
     filename = _sanitize_filename_with_ext(filename, 'proof', '.json')
-    target_path = target_dir / filename
-
-    if not overwrite:
-        stem, suffix = target_path.stem, target_path.suffix or '.json'
-        n = 1
-        while target_path.exists():
-            target_path = target_dir / f"{stem}_{n}{suffix}"
-            n += 1
-
-    target_path.write_text(text, encoding='utf-8')
-    return target_path
+    return _write_file(target_dir / filename, overwrite, text.encode('utf-8'),
+                       before_overwrite, after_write)
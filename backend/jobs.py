@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+In-process background jobs for long-running corpus operations.
+
+Heavy work (bulk API extraction, Markdown ingestion, CSV merges) is submitted
+as a job, executed on a bounded worker pool off the request thread, and
+tracked through the states ``queued`` → ``running`` → ``done`` / ``failed`` /
+``cancelled``. Job state and results are persisted as JSON so they survive a
+server restart; jobs that were still queued or running at shutdown are marked
+as failed when the manager starts again.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+__all__ = ["Job", "JobCancelled", "JobError", "JobManager"]
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATES = (DONE, FAILED, CANCELLED)
+
+# Progress updates are frequent; only persist them this often.
+_PERSIST_INTERVAL = 0.5
+
+
+class JobError(Exception):
+    """Raised for invalid job submissions or lookups."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler once cancellation has been requested."""
+
+
+class Job:
+    """State of one background job. Handlers receive it to report progress."""
+
+    def __init__(self, manager: "JobManager", job_id: str, kind: str, params: Mapping):
+        self._manager = manager
+        self.id = job_id
+        self.kind = kind
+        self.params = dict(params)
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.has_result = False
+        self.cancel_requested = False
+        self.revision = 0
+
+    def set_progress(self, done: int, total: int, message: str = "") -> None:
+        """Report ``done`` out of ``total`` units of work."""
+        self.progress = min(1.0, done / total) if total else 1.0
+        if message:
+            self.message = message
+        self._manager._touch(self, persist=False)
+
+    def check_cancelled(self) -> None:
+        """Raise ``JobCancelled`` if the job should stop; call between work units."""
+        if self.cancel_requested:
+            raise JobCancelled()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "has_result": self.has_result,
+            "cancel_requested": self.cancel_requested,
+        }
+
+
+class JobManager:
+    """
+    Registry of job kinds plus a bounded worker pool.
+
+    ``max_workers`` limits concurrently running jobs and ``max_pending`` caps
+    the number of queued jobs; submissions beyond that raise ``JobError`` so
+    the caller can answer 503.
+    """
+
+    def __init__(self, state_dir: Path, max_workers: int = 2, max_pending: int = 32):
+        self.state_dir = Path(state_dir)
+        self.max_pending = max_pending
+        self._handlers: Dict[str, Callable[[Job, Mapping], Any]] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._last_persist: Dict[str, float] = {}
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._load_existing()
+
+    def register(self, kind: str, handler: Callable[[Job, Mapping], Any]) -> None:
+        """Register ``handler(job, params) -> result`` for jobs of ``kind``."""
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self) -> List[str]:
+        return sorted(self._handlers)
+
+    def submit(self, kind: str, params: Optional[Mapping] = None) -> Job:
+        handler = self._handlers.get(kind)
+        if handler is None:
+            raise JobError(f"Unknown job kind: '{kind}'")
+        if params is not None and not isinstance(params, Mapping):
+            raise JobError("Job params must be an object")
+
+        with self._condition:
+            pending = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if pending >= self.max_pending:
+                raise JobError("Job queue is full, try again later")
+            job = Job(self, uuid.uuid4().hex, kind, params or {})
+            self._jobs[job.id] = job
+        self._persist(job)
+        self._executor.submit(self._run, job, handler)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise JobError(f"Unknown job: '{job_id}'")
+        return job
+
+    def list(self) -> List[Job]:
+        return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a queued job immediately or ask a running one to stop."""
+        job = self.get(job_id)
+        with self._condition:
+            if job.status in TERMINAL_STATES:
+                return job
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+        self._touch(job, persist=True)
+        return job
+
+    def result(self, job_id: str) -> Any:
+        job = self.get(job_id)
+        if job.status != DONE or not job.has_result:
+            raise JobError(f"Job '{job_id}' has no result (status: {job.status})")
+        with open(self._result_path(job.id), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def wait_for_change(self, job_id: str, revision: int, timeout: float) -> Job:
+        """Block until the job's revision differs from ``revision`` or ``timeout`` passes."""
+        job = self.get(job_id)
+        with self._condition:
+            self._condition.wait_for(lambda: job.revision != revision, timeout=timeout)
+        return job
+
+    def _run(self, job: Job, handler: Callable[[Job, Mapping], Any]) -> None:
+        with self._condition:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        self._touch(job, persist=True)
+
+        try:
+            result = handler(job, job.params)
+            self._write_json(self._result_path(job.id), result)
+            job.has_result = True
+            job.status = DONE
+            job.progress = 1.0
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as exc:
+            job.status = FAILED
+            job.error = str(exc) or exc.__class__.__name__
+        job.finished_at = time.time()
+        self._touch(job, persist=True)
+
+    def _touch(self, job: Job, persist: bool) -> None:
+        with self._condition:
+            job.revision += 1
+            self._condition.notify_all()
+        now = time.monotonic()
+        if persist or now - self._last_persist.get(job.id, 0.0) >= _PERSIST_INTERVAL:
+            self._persist(job)
+
+    def _persist(self, job: Job) -> None:
+        self._last_persist[job.id] = time.monotonic()
+        self._write_json(self._state_path(job.id), job.to_dict())
+
+    def _load_existing(self) -> None:
+        for path in self.state_dir.glob("*.job.json"):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):  # also UnicodeDecodeError
+                continue
+            # A damaged record is skipped like an unreadable one, never fatal at startup.
+            if not isinstance(data, dict) or not isinstance(data.get("id"), str) or not data["id"]:
+                continue
+            params = data.get("params")
+            job = Job(self, data["id"], str(data.get("kind", "")), params if isinstance(params, dict) else {})
+            for key in ("status", "progress", "message", "error", "created_at",
+                        "started_at", "finished_at", "has_result", "cancel_requested"):
+                if key in data:
+                    setattr(job, key, data[key])
+            if not isinstance(job.status, str) or job.status not in TERMINAL_STATES:
+                job.status = FAILED
+                job.error = "Interrupted by server restart"
+                job.finished_at = time.time()
+                self._persist(job)
+            self._jobs[job.id] = job
+
+    def _state_path(self, job_id: str) -> Path:
+        return self.state_dir / f"{job_id}.job.json"
+
+    def _result_path(self, job_id: str) -> Path:
+        return self.state_dir / f"{job_id}.result.json"
+
+    def _write_json(self, path: Path, data: Any) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=str(self.state_dir), prefix=".job.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
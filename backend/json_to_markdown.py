@@ -8,14 +8,17 @@ Usage:
     python3 json_to_markdown.py input.json  # outputs to stdout
 """
 
-import argparse
-import json
 import sys
 
-from proof_markdown import build_markdown, validate_proof_json
-
 
 def main():
+    # Imported here so a CLI run that is handed off to the daemon
+    # (see cli_daemon.py) never pays for them.
+    import argparse
+    import json
+
+    from proof_markdown import build_markdown, validate_proof_json
+
     parser = argparse.ArgumentParser(
         description='Convert structured JSON proof to Markdown',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -76,4 +79,9 @@ Example JSON format:
 
 
 if __name__ == '__main__':
+    from cli_daemon import run_via_daemon
+
+    status = run_via_daemon('json_to_markdown')
+    if status is not None:
+        sys.exit(status)
     main()
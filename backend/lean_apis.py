@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+API name extraction from Lean source code.
+
+Kept free of Flask so the CLIs, background jobs and benchmarks can import the
+extractor without loading the web stack. The extraction itself is the
+scope-aware engine in ``lean_scope``; this module returns the file-wide union.
+"""
+
+from api_vocab import default_vocabulary, unique_ids
+from lean_scope import is_likely_api, scan
+
+__all__ = ["extract_api_ids", "extract_apis_from_code", "is_likely_api"]
+
+
+def extract_apis_from_code(code):
+    """Extract API names from Lean code."""
+    return sorted(default_vocabulary().decode(extract_api_ids(code)))
+
+
+def extract_api_ids(code, vocabulary=None):
+    """Extract APIs from Lean code as a sorted array of vocabulary ids."""
+    declarations, free_standing = scan(code, vocabulary)
+    ids = list(free_standing)
+    for declaration in declarations:
+        ids.extend(declaration["ids"])
+    return unique_ids(ids)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Incremental, per-declaration API extraction for Lean files.
+
+``split_blocks`` cuts a Lean source (a memory-mapped file or an in-memory
+buffer) into top-level blocks: one per declaration (``theorem``, ``lemma``,
+``def``, ... together with its doc comment and attributes) plus the command
+blocks between them (``namespace``, ``open``, ``variable``, ...).
+
+``LeanFileIndex`` memory-maps a file, hashes every block in place and feeds
+the blocks through the scope-aware ``lean_scope.ScopeEngine``. A block is
+only re-scanned if its hash or the scope it starts in (namespaces, opens,
+variables, earlier declarations) changed, so after editing one lemma's proof
+only that lemma is re-scanned. Results are reported per declaration and as
+the file-wide union.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from api_vocab import ApiVocabulary, default_vocabulary, unique_ids
+from lean_filter import default_filter
+from lean_scope import ROOT_STATE, ScopeEngine, resolve
+
+__all__ = ["LeanBlock", "LeanFileIndex", "split_blocks"]
+
+DECLARATION_KINDS = (
+    b"theorem", b"lemma", b"def", b"instance", b"abbrev", b"example",
+    b"structure", b"class", b"inductive",
+)
+
+_DECLARATION = re.compile(
+    rb"(?:@\[[^\n]*\]\s*)?"
+    rb"(?:(?:private|protected|noncomputable|nonrec|partial|unsafe|scoped|local)\s+)*"
+    rb"(?:" + b"|".join(DECLARATION_KINDS) + rb")\b"
+)
+# Lines that start a new top-level block.
+_BOUNDARY = re.compile(
+    rb"^(?:/--|/-!|@\[|#[a-z]+|"
+    rb"(?:private|protected|noncomputable|nonrec|partial|unsafe|scoped|local|"
+    rb"theorem|lemma|def|instance|abbrev|example|structure|class|inductive|"
+    rb"namespace|section|end|open|variable|universe|import|set_option|attribute|mutual)\b)",
+    re.MULTILINE,
+)
+_DOC_COMMENT_END = re.compile(rb"-/[ \t]*\n")
+_COMMENT_TOKEN = re.compile(rb"/-|-/|--[^\n]*")
+
+
+class LeanBlock:
+    """A top-level span ``[start, end)`` of a Lean source, in bytes."""
+
+    __slots__ = ("start", "end", "line", "digest")
+
+    def __init__(self, start: int, end: int, line: int, digest: bytes):
+        self.start = start
+        self.end = end
+        self.line = line
+        self.digest = digest
+
+
+def _block_comments(buffer) -> List[Tuple[int, int]]:
+    """Spans of (possibly nested) ``/- ... -/`` comments in ``buffer``."""
+    spans = []
+    depth = opened = 0
+    for match in _COMMENT_TOKEN.finditer(buffer):
+        token = match.group(0)
+        if token == b"/-":
+            if not depth:
+                opened = match.start()
+            depth += 1
+        elif token == b"-/" and depth:
+            depth -= 1
+            if not depth:
+                spans.append((opened, match.end()))
+    if depth:
+        spans.append((opened, len(buffer)))
+    return spans
+
+
+def split_blocks(buffer) -> List[LeanBlock]:
+    """Split ``buffer`` (bytes or an ``mmap``) into top-level blocks with content hashes."""
+    view = memoryview(buffer)
+    comments = _block_comments(buffer)
+    comment = 0
+    starts = [0]
+    for match in _BOUNDARY.finditer(buffer):
+        start = match.start()
+        if start <= starts[-1]:
+            continue
+        # Column-0 keywords inside a comment (e.g. a doc comment quoting a lemma) are not commands.
+        while comment < len(comments) and comments[comment][1] <= start:
+            comment += 1
+        if comment < len(comments) and comments[comment][0] < start:
+            continue
+        if match.group(0) in (b"/--", b"@["):
+            starts.append(start)
+            continue
+        # A declaration directly after its doc comment or attribute line stays in that block.
+        previous = buffer[starts[-1]:start]
+        if _DECLARATION.match(buffer, start) and (
+            previous.startswith(b"/--") and _DOC_COMMENT_END.fullmatch(previous[previous.rfind(b"-/"):])
+            or previous.startswith(b"@[") and previous.count(b"\n") == 1
+        ):
+            continue
+        starts.append(start)
+    starts.append(len(buffer))
+
+    blocks: List[LeanBlock] = []
+    line = 1
+    for start, end in zip(starts, starts[1:]):
+        if start == end:
+            continue
+        digest = hashlib.blake2b(view[start:end], digest_size=16).digest()
+        blocks.append(LeanBlock(start, end, line, digest))
+        line += buffer[start:end].count(b"\n")
+    view.release()
+    return blocks
+
+
+class LeanFileIndex:
+    """
+    Per-block extraction cache shared by all files.
+
+    Blocks are keyed by the hash of their bytes and the scope state they
+    start in, so identical declarations in the same scope of different files
+    share one entry. Names that depend on the file's other declarations are
+    resolved when the file's result is assembled. ``max_blocks`` bounds the
+    cache (least recently used blocks are dropped); a file whose
+    ``(mtime_ns, size)`` is unchanged is not even re-read. Both caches are
+    keyed by the identifier filter's fingerprint too, so loading different
+    filter rules invalidates them.
+    """
+
+    def __init__(self, vocabulary: Optional[ApiVocabulary] = None, max_blocks: int = 50000):
+        self.vocabulary = vocabulary if vocabulary is not None else default_vocabulary()
+        self.max_blocks = max_blocks
+        self._lock = threading.Lock()
+        self._blocks: "OrderedDict[Tuple[bytes, object, str], Tuple]" = OrderedDict()
+        self._files: Dict[Path, Tuple[Tuple[int, int, str], Dict]] = {}
+
+    def _scan_block(self, digest: bytes, raw: bytes, state) -> Tuple[Tuple, bool]:
+        """``(declaration records, free-standing record, state after)`` for one block, and whether it was cached."""
+        key = (digest, state, default_filter().fingerprint)
+        with self._lock:
+            entry = self._blocks.get(key)
+            if entry is not None:
+                self._blocks.move_to_end(key)
+                return entry, True
+        engine = ScopeEngine(self.vocabulary, state)
+        declarations, free_standing = engine.feed(raw.decode("utf-8", "replace"))
+        entry = (declarations, free_standing, engine.state)
+        with self._lock:
+            self._blocks[key] = entry
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return entry, False
+
+    def extract_buffer(self, buffer) -> Dict:
+        """Extract APIs from ``buffer`` block by block, reusing cached blocks."""
+        declarations = []
+        free_standing = []
+        declared = set()
+        union: List[int] = []
+        scanned = 0
+        state = ROOT_STATE
+        blocks = split_blocks(buffer)
+        for block in blocks:
+            (found, outside, state), cached = self._scan_block(
+                block.digest, buffer[block.start:block.end], state)
+            scanned += not cached
+            free_standing.append(outside)
+            for declaration in found:
+                declared.add(declaration["name"])
+                ids = resolve(declaration, declared, self.vocabulary)
+                union.extend(ids)
+                declarations.append({
+                    "kind": declaration["kind"],
+                    "name": declaration["name"],
+                    "namespace": declaration["namespace"],
+                    "line": block.line + declaration["line"] - 1,
+                    "apis": sorted(self.vocabulary.decode(ids)),
+                })
+        for outside in free_standing:
+            union.extend(resolve(outside, declared, self.vocabulary))
+        return {
+            "apis": sorted(self.vocabulary.decode(unique_ids(union))),
+            "declarations": declarations,
+            "blocks": len(blocks),
+            "scanned": scanned,
+        }
+
+    def extract_code(self, code: str) -> Dict:
+        return self.extract_buffer(code.encode("utf-8"))
+
+    def extract_file(self, path: Path) -> Dict:
+        """Extract APIs from the Lean file at ``path`` (memory-mapped)."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size, default_filter().fingerprint)
+        with self._lock:
+            cached = self._files.get(path)
+        if cached is not None and cached[0] == stamp:
+            return dict(cached[1], scanned=0)
+
+        if stat.st_size == 0:
+            result = self.extract_buffer(b"")
+        else:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                result = self.extract_buffer(mapped)
+        with self._lock:
+            self._files[path] = (stamp, result)
+        return result
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Configurable identifier filter for Lean API extraction.
+
+``lean_scope`` decides for every candidate identifier whether it is an API
+name (``Ideal.IsPrime.comap``, ``my_helper``) or noise: tactic names,
+docstring words, projections of local structures, hypothesis names. The
+word lists behind those rules used to be constants in the code; here they
+come from a JSON config so a site can adjust them without code changes::
+
+    {
+      "excluded_substrings": {"add": ["aesop"]},
+      "doc_words": {"remove": ["exists"]},
+      "tactics": ["push_neg", "rcases", "obtain"],
+      "common_fields": {"add": ["carrier"]}
+    }
+
+A list replaces the built-in list, an object with ``add`` / ``remove``
+edits it. Omitted keys keep the defaults (``DEFAULT_CONFIG``).
+
+``IdentifierFilter`` compiles a config once: the word lists become frozen
+sets, the excluded substrings one case-insensitive regex alternation
+(a single C-level scan instead of one ``in`` test per substring), and the
+projection suffix a set lookup. Verdicts are memoized per identifier, so
+the names that repeat across a file or a corpus are classified once.
+``fingerprint`` identifies the effective rules; caches of extraction
+results include it so that changing the config invalidates them.
+
+Usage:
+    python3 lean_filter.py dump > ../data_save/lean_filter.json
+    python3 lean_filter.py check Ideal.IsPrime.comap hx_foo my_helper [--config FILE]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple, Union
+
+__all__ = [
+    "DEFAULT_CONFIG",
+    "IdentifierFilter",
+    "LeanFilterError",
+    "default_filter",
+    "load_default_filter",
+    "refresh_default_filter",
+]
+
+DEFAULT_CONFIG: Dict[str, List[str]] = {
+    # Names containing any of these (case-insensitive) are not APIs.
+    "excluded_substrings": [
+        "intro", "apply", "exact", "rw", "simp", "ring", "field_simp",
+        "have", "let", "by", "sorry", "theorem", "lemma", "def", "Mathlib",
+    ],
+    # Docstring / comment words that look like custom lemma names.
+    "doc_words": [
+        "any", "all", "some", "hence", "thus", "then", "also",
+        "helper", "note", "from", "this", "that", "will", "must",
+        "can", "may", "should", "would", "could", "the", "and",
+        "but", "for", "not", "are", "was", "were", "been", "being",
+        "there", "exists",
+    ],
+    "tactics": [
+        "set_option", "push_neg", "rcases", "obtain", "refine",
+        "show", "change", "use", "constructor", "left", "right",
+    ],
+    # ``x.field`` with a lowercase (local) head is a projection, not an API.
+    "common_fields": [
+        "FG", "IsPrime", "isPrime", "asIdeal", "toFun",
+        "toRingHom", "toAlgHom", "val", "property",
+    ],
+}
+
+ConfigValue = Union[List[str], Mapping[str, List[str]]]
+
+_LOCAL_HYPOTHESIS = re.compile(r"(?:h[a-z]?|[a-z])_")
+_PROJECTIONS = frozenset({"mp", "mpr"})
+
+
+class LeanFilterError(ValueError):
+    """Raised for malformed filter configs."""
+
+
+def _words(key: str, value: object) -> List[str]:
+    # A bare string would otherwise be taken apart letter by letter.
+    if not isinstance(value, list) or not all(isinstance(word, str) and word for word in value):
+        raise LeanFilterError(f"{key}: expected a list of non-empty strings")
+    return value
+
+
+def _merge(key: str, default: List[str], value: ConfigValue) -> List[str]:
+    if isinstance(value, list):
+        words = _words(key, value)
+    elif isinstance(value, Mapping) and set(value) <= {"add", "remove"}:
+        removed = set(_words(f"{key}.remove", value.get("remove", [])))
+        words = [word for word in default if word not in removed] + _words(f"{key}.add", value.get("add", []))
+    else:
+        raise LeanFilterError(f"{key}: expected a list or an object with 'add'/'remove'")
+    return sorted(set(words))
+
+
+class IdentifierFilter:
+    """Compiled identifier rules with memoized per-identifier verdicts."""
+
+    def __init__(self, config: Optional[Mapping[str, ConfigValue]] = None,
+                 source: Optional[Path] = None, cache_size: int = 1 << 16):
+        config = dict(config or {})
+        unknown = set(config) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise LeanFilterError(f"Unknown filter keys: {', '.join(sorted(unknown))}")
+        self.source = source
+        self.config: Dict[str, List[str]] = {
+            key: _merge(key, default, config[key]) if key in config else sorted(set(default))
+            for key, default in DEFAULT_CONFIG.items()
+        }
+        canonical = json.dumps(self.config, sort_keys=True, separators=(",", ":"))
+        self.fingerprint = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+        excluded = sorted(self.config["excluded_substrings"], key=len, reverse=True)
+        self._excluded = re.compile("|".join(map(re.escape, excluded)), re.IGNORECASE) if excluded else None
+        # Compared against ``name.lower()``.
+        self._stop_words: FrozenSet[str] = frozenset(
+            word.lower() for word in self.config["doc_words"] + self.config["tactics"])
+        self._common_fields: FrozenSet[str] = frozenset(self.config["common_fields"])
+        self.is_likely_api = lru_cache(maxsize=cache_size)(self._is_likely_api)
+        self.clean_api = lru_cache(maxsize=cache_size)(self._clean_api)
+
+    @classmethod
+    def from_file(cls, path: Path, **kwargs) -> "IdentifierFilter":
+        """
+        Filter configured by the JSON file at ``path``. Raises ``OSError`` if
+        it cannot be read and ``LeanFilterError`` for any invalid content.
+        """
+        path = Path(path)
+        try:
+            config = json.loads(path.read_text(encoding="utf-8"))
+        except (ValueError, RecursionError) as exc:
+            # JSONDecodeError, UnicodeDecodeError, or nesting too deep to parse.
+            raise LeanFilterError(f"{path}: {exc}") from None
+        if not isinstance(config, dict):
+            raise LeanFilterError(f"{path}: expected a JSON object")
+        return cls(config, source=path, **kwargs)
+
+    def _is_likely_api(self, name: str) -> bool:
+        """Filter to identify likely API names."""
+        if self._excluded is not None and self._excluded.search(name):
+            return False
+
+        # Must have namespace (dot) OR be custom lemma (lowercase with underscore)
+        if "." in name:
+            return name[0].isupper()
+
+        # Unqualified: only allow lowercase_with_underscore (custom lemmas)
+        if name[0].islower():
+            return "_" in name and len(name) >= 5
+
+        # Reject standalone uppercase words
+        return False
+
+    def _clean_api(self, api: str) -> Optional[str]:
+        """Apply the API rules to a resolved name; ``None`` rejects it."""
+        parts = api.split(".")
+        if len(parts) == 1:
+            # Standalone uppercase words are types (Field, Finite); lowercase
+            # names must look like custom lemmas.
+            if not api[0].islower() or "_" not in api or len(api) < 5:
+                return None
+        elif len(parts) == 2 and parts[1] in self._common_fields and parts[0][0].islower():
+            return None
+
+        if api.lower() in self._stop_words:
+            return None
+        if _LOCAL_HYPOTHESIS.match(api):
+            return None
+        if "_" not in api and not any(part[:1].isupper() for part in parts):
+            return None
+        if not self._is_likely_api(api):
+            return None
+        # Remove Lean projection suffixes (.mp, .mpr, .1, .2, etc.)
+        last = parts[-1]
+        if len(parts) > 1 and (last in _PROJECTIONS or last.isdecimal()):
+            return api[:-len(last) - 1]
+        return api
+
+    def cache_info(self) -> Dict[str, object]:
+        return {"is_likely_api": self.is_likely_api.cache_info()._asdict(),
+                "clean_api": self.clean_api.cache_info()._asdict()}
+
+
+_DEFAULT = IdentifierFilter()
+_DEFAULT_PATH: Optional[Path] = None
+_DEFAULT_STAMP: Optional[Tuple[int, int]] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_filter() -> IdentifierFilter:
+    """The process-wide filter used by ``lean_scope``."""
+    return _DEFAULT
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_default_filter(path: Path) -> IdentifierFilter:
+    """
+    Configure the process-wide filter from ``path`` (built-in rules if the
+    file does not exist). The new filter replaces the old one as a whole, so
+    concurrent extractions see either set of rules, never a mix. If the file
+    is invalid, ``LeanFilterError`` is raised and the current rules stay.
+    """
+    global _DEFAULT, _DEFAULT_PATH, _DEFAULT_STAMP
+    path = Path(path)
+    with _DEFAULT_LOCK:
+        # Remembered even if loading fails, so a broken file is reported once per edit.
+        _DEFAULT_PATH, _DEFAULT_STAMP = path, _stamp(path)
+        _DEFAULT = IdentifierFilter.from_file(path) if _DEFAULT_STAMP is not None else IdentifierFilter()
+    return _DEFAULT
+
+
+def refresh_default_filter() -> IdentifierFilter:
+    """
+    Reload the file given to ``load_default_filter`` if it was created,
+    edited or removed since (one ``stat`` otherwise).
+    """
+    path = _DEFAULT_PATH
+    if path is not None and _stamp(path) != _DEFAULT_STAMP:
+        return load_default_filter(path)
+    return _DEFAULT
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Inspect the Lean identifier filter")
+    parser.add_argument("--config", help="Filter config (JSON); default: built-in rules")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("dump", help="Print the effective config")
+    check = sub.add_parser("check", help="Show the verdict for each identifier")
+    check.add_argument("names", nargs="+")
+    args = parser.parse_args(argv)
+
+    try:
+        rules = IdentifierFilter.from_file(Path(args.config)) if args.config else IdentifierFilter()
+    except (OSError, LeanFilterError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    if args.command == "dump":
+        print(json.dumps(rules.config, indent=2, ensure_ascii=False))
+        return 0
+    for name in args.names:
+        cleaned = rules.clean_api(name)
+        print(f"✅ {name} -> {cleaned}" if cleaned else f"❌ {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Scope-aware, per-declaration API extraction for Lean source.
+
+``ScopeEngine`` makes one pass over a token stream and tracks the scope
+structure of the file: ``namespace … end`` and ``section … end`` frames,
+``open`` (``open … in`` only applies to the next declaration) and
+``variable`` binders. Every identifier is attributed to the declaration it
+occurs in and is checked against that declaration's own binders only.
+
+An unqualified custom lemma (``my_helper``) is resolved the way Lean would
+look it up, as far as the file tells us: a declaration of that name in the
+current namespace or an enclosing one, else in a namespace that is open
+there (most recent ``open`` first). Names the file does not declare are
+reported as written; no namespace is guessed for them.
+
+The engine can be fed a file in chunks that start at top-level commands.
+Its scope state is an immutable, hashable value, so ``lean_file.LeanFileIndex``
+can cache the result of a chunk under (chunk hash, state before it). Names
+whose resolution depends on what the file declares are reported separately
+and resolved by ``resolve`` once the declarations before them are known, so
+renaming one lemma does not invalidate the chunks after it.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from api_vocab import ApiVocabulary, default_vocabulary, unique_ids
+from lean_filter import default_filter
+
+__all__ = ["ROOT_STATE", "ScopeEngine", "clean_api", "is_likely_api", "resolve", "scan"]
+
+_TOKEN = re.compile(r"""
+    (?P<nl>\n)
+  | (?P<ws>[ \t\r]+)
+  | (?P<line_comment>--[^\n]*)
+  | (?P<comment_open>/-)
+  | (?P<comment_close>-/)
+  | (?P<string>"(?:[^"\\\n]|\\.)*")
+  | (?P<number>\d[\w.]*)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_']*(?:\.[A-Za-z_][A-Za-z0-9_']*)*)
+  | (?P<symbol>:=|=>|.)
+""", re.VERBOSE)
+
+DECLARATION_KINDS = frozenset({
+    "theorem", "lemma", "def", "instance", "abbrev", "example", "structure", "class", "inductive",
+})
+MODIFIERS = frozenset({
+    "private", "protected", "noncomputable", "nonrec", "partial", "unsafe", "scoped", "local",
+})
+# Other top-level commands: they end the current declaration and are skipped.
+OTHER_COMMANDS = frozenset({
+    "import", "set_option", "universe", "attribute", "mutual", "deriving", "macro", "macro_rules",
+    "syntax", "notation", "infix", "infixl", "infixr", "prefix", "postfix", "elab", "initialize",
+})
+# Names following these (up to ``:``, ``:=``, ``=>``, ``,`` ...) are bound locally.
+BINDER_KEYWORDS = frozenset({
+    "fun", "intro", "intros", "rintro", "let", "have", "obtain", "set", "choose", "with",
+    "by_contra", "by_cases", "rcases",
+})
+BINDER_SYMBOLS = frozenset({"∀", "∃", "λ"})
+_OPENERS = frozenset({"(", "{", "[", "⦃", "⟨"})
+_CLOSERS = frozenset({")", "}", "]", "⦄", "⟩"})
+_SIGNATURE_END = frozenset({":", ":=", "|", "where"})
+
+
+def is_likely_api(name):
+    """Filter to identify likely API names (rules from ``lean_filter``)."""
+    return default_filter().is_likely_api(name)
+
+
+def clean_api(api: str) -> Optional[str]:
+    """Apply the API heuristics to a resolved name; ``None`` rejects it."""
+    return default_filter().clean_api(api)
+
+
+# A scope frame is (kind, name, opened namespaces, ``variable`` binders); the
+# state is (frames, namespaces of a pending ``open … in``).
+Frame = Tuple[str, str, Tuple[str, ...], FrozenSet[str]]
+State = Tuple[Tuple[Frame, ...], Tuple[str, ...]]
+
+ROOT_STATE: State = ((("root", "", (), frozenset()),), ())
+
+
+class _Binders:
+    """Collects the names bound by a signature or by one binder keyword."""
+
+    __slots__ = ("signature", "depth", "typed_at", "active")
+
+    def __init__(self, signature: bool):
+        # In a signature only bracketed names are binders (``(x y : T)``);
+        # after ``intro``/``fun``/``∀`` bare names are too.
+        self.signature = signature
+        self.depth = 0
+        self.typed_at: List[int] = []
+        self.active = True
+
+    def feed(self, kind: str, token: str, bound: Set[str]) -> None:
+        if kind == "ident":
+            if not self.typed_at and "." not in token and (self.depth or not self.signature):
+                bound.add(token)
+        elif token in _OPENERS:
+            self.depth += 1
+        elif token in _CLOSERS:
+            if self.typed_at and self.typed_at[-1] == self.depth:
+                self.typed_at.pop()
+            self.depth = max(self.depth - 1, 0)
+        elif token == ":" and self.depth:
+            self.typed_at.append(self.depth)
+        elif not self.depth and not self.signature:
+            # ``:``, ``:=``, ``=>``, ``,`` ... at the top level end the binder list.
+            self.active = False
+
+
+class _Declaration:
+    """Accumulates one declaration (or the free-standing code of a chunk)."""
+
+    __slots__ = ("kind", "name", "line", "namespaces", "opens", "locals", "candidates",
+                 "signature", "binders", "expect_name")
+
+    def __init__(self, kind: Optional[str], line: int, state: State):
+        frames, pending = state
+        self.kind = kind
+        self.name = ""
+        self.line = line
+        self.namespaces = [frame[1] for frame in frames if frame[0] == "namespace"]
+        self.opens = [name for frame in frames for name in frame[2]]
+        self.opens.extend(pending)
+        self.locals: Set[str] = set()
+        for frame in frames:
+            self.locals.update(frame[3])
+        self.candidates: List[str] = []
+        self.signature = _Binders(signature=True) if kind is not None else None
+        self.binders: Optional[_Binders] = None
+        self.expect_name = kind is not None and kind != "example"
+
+    @property
+    def full_name(self) -> str:
+        if self.name.startswith("_root_."):
+            return self.name[len("_root_."):]
+        return ".".join(self.namespaces + [self.name]) if self.name else ""
+
+    def record(self, vocabulary: ApiVocabulary) -> Dict[str, object]:
+        """The declaration's result; ``unqualified`` names still need ``resolve``."""
+        ids = set()
+        unqualified = set()
+        clean = default_filter().clean_api
+        for api in self.candidates:
+            if api.split(".", 1)[0] in self.locals:
+                continue
+            if "." not in api and api[0].islower() and "_" in api:
+                unqualified.add(api)
+                continue
+            cleaned = clean(api)
+            if cleaned:
+                ids.add(vocabulary.intern(cleaned))
+        return {
+            "kind": self.kind,
+            "name": self.full_name,
+            "namespace": ".".join(self.namespaces),
+            "line": self.line,
+            "ids": unique_ids(ids),
+            "unqualified": tuple(sorted(unqualified)),
+            "opens": tuple(self.opens),
+        }
+
+
+def _qualify(api: str, namespace: str, declared: AbstractSet[str], opens: Tuple[str, ...]) -> str:
+    parts = namespace.split(".") if namespace else []
+    for depth in range(len(parts), 0, -1):
+        name = ".".join(parts[:depth] + [api])
+        if name in declared:
+            return name
+    if api not in declared:
+        for opened in reversed(opens):
+            name = f"{opened}.{api}"
+            if name in declared:
+                return name
+    return api
+
+
+def resolve(record: Dict[str, object], declared: AbstractSet[str],
+            vocabulary: Optional[ApiVocabulary] = None) -> array:
+    """
+    All API ids of a ``ScopeEngine`` record, given the full names declared
+    before it (and its own name).
+    """
+    if not record["unqualified"]:
+        return record["ids"]
+    if vocabulary is None:
+        vocabulary = default_vocabulary()
+    ids = list(record["ids"])
+    clean = default_filter().clean_api
+    for api in record["unqualified"]:
+        cleaned = clean(_qualify(api, record["namespace"], declared, record["opens"]))
+        if cleaned:
+            ids.append(vocabulary.intern(cleaned))
+    return unique_ids(ids)
+
+
+class ScopeEngine:
+    """
+    Single-pass scope tracker and extractor.
+
+    ``feed`` consumes a chunk of source starting at a top-level command and
+    returns a record per declaration it contains plus one for the code
+    outside any declaration, e.g. a pasted tactic proof. ``state`` carries
+    over to the next chunk.
+    """
+
+    def __init__(self, vocabulary: Optional[ApiVocabulary] = None, state: State = ROOT_STATE):
+        self.vocabulary = vocabulary if vocabulary is not None else default_vocabulary()
+        self.state: State = state
+
+    # -- scope state -------------------------------------------------------
+
+    def _replace_top(self, name: Optional[str] = None, opens: Iterable[str] = (),
+                     variables: Iterable[str] = ()) -> None:
+        frames, pending = self.state
+        kind, old_name, old_opens, old_variables = frames[-1]
+        top = (kind, old_name if name is None else name, old_opens + tuple(opens),
+               old_variables | frozenset(variables))
+        self.state = (frames[:-1] + (top,), pending)
+
+    def _push(self, kind: str, name: str) -> None:
+        frames, pending = self.state
+        self.state = (frames + ((kind, name, (), frozenset()),), pending)
+
+    def _pop(self, count: int = 1) -> None:
+        frames, pending = self.state
+        self.state = (frames[:max(len(frames) - count, 1)], pending)
+
+    def _set_pending(self, names: Tuple[str, ...]) -> None:
+        self.state = (self.state[0], names)
+
+    # -- token stream ------------------------------------------------------
+
+    def feed(self, text: str, first_line: int = 1) -> Tuple[List[Dict[str, object]], Dict[str, object]]:
+        declarations: List[Dict[str, object]] = []
+        anonymous = _Declaration(None, first_line, self.state)
+        current = anonymous
+        line = first_line
+        comment_depth = 0
+        after_prefix = False       # only modifiers / attributes so far in this command
+        attribute_depth = 0
+        command: Optional[str] = None
+        open_names: List[str] = []
+        open_skip = 0
+        variables = _Binders(signature=True)
+
+        def close() -> None:
+            nonlocal current
+            if current is not anonymous:
+                declarations.append(current.record(self.vocabulary))
+            current = anonymous
+
+        for match in _TOKEN.finditer(text):
+            kind = match.lastgroup
+            token = match.group()
+
+            if comment_depth:
+                if kind == "comment_open":
+                    comment_depth += 1
+                elif kind == "comment_close":
+                    comment_depth -= 1
+                elif kind == "nl":
+                    line += 1
+                continue
+            if kind == "comment_open":
+                comment_depth = 1
+                continue
+            if kind == "nl":
+                line += 1
+                after_prefix = after_prefix and command == "attribute"
+                if command == "open" and open_names:
+                    self._replace_top(opens=open_names)
+                elif command == "end":
+                    self._pop()
+                if command in ("open", "end", "namespace", "section", "skip"):
+                    command = None
+                if current.binders is not None and not current.binders.depth:
+                    current.binders = None
+                continue
+            if kind in ("ws", "line_comment", "comment_close"):
+                continue
+
+            if attribute_depth:
+                if token == "[":
+                    attribute_depth += 1
+                elif token == "]":
+                    attribute_depth -= 1
+                continue
+            if command == "attribute" and token == "[":
+                attribute_depth = 1
+                continue
+
+            # -- top-level commands -------------------------------------------
+            start = match.start()
+            at_column_zero = start == 0 or text[start - 1] == "\n"
+            if at_column_zero or after_prefix:
+                if token == "@" and text.startswith("@[", start):
+                    if at_column_zero:
+                        close()
+                    after_prefix = True
+                    command = "attribute"
+                    continue
+                if kind == "ident" and token in MODIFIERS:
+                    if at_column_zero:
+                        close()
+                    after_prefix = True
+                    continue
+                if kind == "ident" and token in DECLARATION_KINDS:
+                    close()
+                    after_prefix = False
+                    command = None
+                    current = _Declaration(token, line, self.state)
+                    self._set_pending(())
+                    continue
+                if kind == "ident" and token == "section":
+                    close()
+                    after_prefix = False
+                    command = "section"
+                    self._push("section", "")
+                    continue
+                after_prefix = False
+                if at_column_zero and kind == "ident" and token in ("namespace", "end", "open", "variable"):
+                    close()
+                    command = token
+                    open_names = []
+                    open_skip = 0
+                    variables = _Binders(signature=True)
+                    continue
+                if at_column_zero and (kind == "ident" and token in OTHER_COMMANDS or token == "#"):
+                    close()
+                    command = "skip"
+                    continue
+                if at_column_zero and command in ("variable", "attribute"):
+                    command = None
+
+            if command in ("attribute", "skip"):
+                continue
+            if command == "namespace":
+                if kind == "ident":
+                    for part in token.split("."):
+                        self._push("namespace", part)
+                    command = "skip"
+                continue
+            if command == "section":
+                if kind == "ident":
+                    self._replace_top(name=token)
+                    command = "skip"
+                continue
+            if command == "end":
+                if kind == "ident":
+                    self._pop(token.count(".") + 1)
+                    command = "skip"
+                continue
+            if command == "open":
+                if token == "(":
+                    open_skip += 1
+                elif token == ")":
+                    open_skip = max(open_skip - 1, 0)
+                elif kind == "ident" and not open_skip:
+                    if token == "in":
+                        self._set_pending(self.state[1] + tuple(open_names))
+                        open_names = []
+                        command = "skip"
+                    elif token in ("hiding", "renaming"):
+                        # What follows are members of the namespace, not namespaces.
+                        self._replace_top(opens=open_names)
+                        open_names = []
+                        command = "skip"
+                    elif token != "scoped" and token[0].isupper():
+                        open_names.append(token)
+                continue
+            if command == "variable":
+                bound: Set[str] = set()
+                variables.feed(kind, token, bound)
+                if bound:
+                    self._replace_top(variables=bound)
+                continue
+
+            # -- inside a declaration, or free-standing code ------------------
+            if current.expect_name:
+                current.expect_name = False
+                if kind == "ident":
+                    current.name = token
+                    continue
+            if current.signature is not None:
+                if not current.signature.depth and token in _SIGNATURE_END:
+                    current.signature = None
+                else:
+                    current.signature.feed(kind, token, current.locals)
+                    if kind == "ident":
+                        current.candidates.append(token)
+                    continue
+
+            if current.binders is not None:
+                current.binders.feed(kind, token, current.locals)
+                if not current.binders.active:
+                    current.binders = None
+            if kind == "ident":
+                if token in BINDER_KEYWORDS:
+                    current.binders = _Binders(signature=False)
+                else:
+                    current.candidates.append(token)
+            elif token in BINDER_SYMBOLS:
+                current.binders = _Binders(signature=False)
+
+        if command == "open" and open_names:
+            self._replace_top(opens=open_names)
+        elif command == "end":
+            self._pop()
+        close()
+        return declarations, anonymous.record(self.vocabulary)
+
+
+def scan(code: str, vocabulary: Optional[ApiVocabulary] = None) -> Tuple[List[Dict[str, object]], array]:
+    """
+    Extract ``code`` in one pass. Returns the declarations (with fully
+    resolved ``ids``) and the ids used outside any declaration.
+    """
+    if vocabulary is None:
+        vocabulary = default_vocabulary()
+    declarations, free_standing = ScopeEngine(vocabulary).feed(code)
+    declared: Set[str] = set()
+    for declaration in declarations:
+        declared.add(declaration["name"])
+        declaration["ids"] = resolve(declaration, declared, vocabulary)
+    return declarations, resolve(free_standing, declared, vocabulary)
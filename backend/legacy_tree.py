@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Convert legacy proof JSON/Markdown into the tree workspace format.
+
+Legacy proofs (``theorem_id`` / ``statement`` / ``steps`` / ``substeps``, as
+produced by ``build_markdown`` and ``markdown_to_json``) become a ``{"root": ...}``
+document: the theorem is the root node, each step a child and each substep a
+grandchild. ``symbols`` are kept on the level where they were declared so the
+tree workspace inherits them down the path exactly as the browser import does.
+
+Usage:
+    python3 legacy_tree.py convert proof.json -o proof_tree.json
+    python3 legacy_tree.py migrate legacy_dir/ tree_dir/ --workers 8 --report failures.json
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+__all__ = ["LegacyConversionError", "convert_file", "legacy_proof_to_tree"]
+
+LEGACY_SUFFIXES = (".json", ".md")
+
+
+class LegacyConversionError(ValueError):
+    """Raised when a file is not a convertible legacy proof."""
+
+
+def _join_list(value: object) -> str:
+    if not value:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(entry) for entry in value)
+    return str(value)
+
+
+def _plain_node(
+    node_id: str,
+    name: str = "",
+    symbols: object = "",
+    problem: str = "",
+    description: str = "",
+    math_proof: str = "",
+    api2: object = "",
+    api1: object = "",
+) -> Dict:
+    return {
+        "id": node_id,
+        "name": name,
+        "symbols": _join_list(symbols),
+        "problem": problem,
+        "description": description,
+        "mathProof": math_proof,
+        "api2": _join_list(api2),
+        "api1": _join_list(api1),
+        "children": [],
+    }
+
+
+def legacy_proof_to_tree(proof: Mapping) -> Dict:
+    """Mirror of ``transformLegacyProofToTree`` in ``frontend/tree/io/index.js``."""
+    if not isinstance(proof, Mapping):
+        raise LegacyConversionError("Legacy proof must be an object")
+
+    root = _plain_node(
+        str(proof.get("id") or "node-root"),
+        name=proof.get("theorem_id") or "定理",
+        symbols=proof.get("symbols"),
+        problem=proof.get("statement") or "",
+    )
+
+    steps = proof.get("steps")
+    if isinstance(steps, list):
+        for index, step in enumerate(steps, start=1):
+            if not isinstance(step, Mapping):
+                continue
+            substeps = step.get("substeps") if isinstance(step.get("substeps"), list) else []
+            child = _plain_node(
+                f"legacy-step-{index}",
+                name=step.get("title") or f"步骤 {index}",
+                symbols=step.get("symbols"),
+                description=step.get("description") or step.get("step") or "",
+                math_proof=step.get("mathProof") or "",
+                api2="" if substeps else (step.get("apis") or step.get("api")),
+            )
+            for sub_index, substep in enumerate(substeps, start=1):
+                if not isinstance(substep, Mapping):
+                    continue
+                child["children"].append(_plain_node(
+                    f"legacy-substep-{index}-{sub_index}",
+                    name=substep.get("title") or f"子步骤 {sub_index}",
+                    symbols=substep.get("symbols"),
+                    description=substep.get("description") or "",
+                    math_proof=substep.get("mathProof") or "",
+                    api2=substep.get("api2"),
+                    api1=substep.get("api1"),
+                ))
+            root["children"].append(child)
+
+    return {"root": root}
+
+
+def convert_file(path: Path) -> Dict:
+    """Read one legacy ``.json`` or ``.md`` file and return its tree document."""
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".md":
+        from markdown_to_json import MarkdownParseError, markdown_to_json
+
+        try:
+            proof = markdown_to_json(text)
+        except MarkdownParseError as exc:
+            raise LegacyConversionError(str(exc)) from None
+    else:
+        try:
+            proof = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise LegacyConversionError(f"Invalid JSON - {exc}") from None
+        if isinstance(proof, Mapping) and "root" in proof:
+            raise LegacyConversionError("Already a tree document")
+        if not isinstance(proof, Mapping) or "theorem_id" not in proof:
+            raise LegacyConversionError("Not a legacy proof (missing 'theorem_id')")
+    return legacy_proof_to_tree(proof)
+
+
+def _write_json_atomic(path: Path, data: Mapping) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def _migrate_one(source: str, target: str, overwrite: bool) -> Tuple[str, Optional[str]]:
+    """Worker: convert ``source`` and write ``target``; return ``(source, error)``."""
+    target_path = Path(target)
+    if target_path.exists() and not overwrite:
+        return source, "skipped: target exists"
+    try:
+        _write_json_atomic(target_path, convert_file(Path(source)))
+    except (LegacyConversionError, OSError, UnicodeDecodeError) as exc:
+        return source, str(exc)
+    except Exception as exc:
+        # A malformed file must not abort the rest of the batch.
+        return source, f"{type(exc).__name__}: {exc}"
+    return source, None
+
+
+def plan_migration(source_dir: Path, target_dir: Path, recursive: bool) -> List[Tuple[Path, Path]]:
+    """Map every legacy file under ``source_dir`` to its output path."""
+    pattern = "**/*" if recursive else "*"
+    sources = sorted(
+        p for p in source_dir.glob(pattern)
+        if p.is_file() and p.suffix.lower() in LEGACY_SUFFIXES
+    )
+    plan: List[Tuple[Path, Path]] = []
+    taken = set()
+    for source in sources:
+        relative = source.relative_to(source_dir)
+        target = target_dir / relative.with_suffix(".json")
+        if target in taken:
+            # "proof.json" and "proof.md" side by side: keep the original suffix.
+            target = target_dir / relative.parent / f"{relative.name}.json"
+        taken.add(target)
+        plan.append((source, target))
+    return plan
+
+
+def migrate_directory(
+    source_dir: Path,
+    target_dir: Path,
+    workers: Optional[int] = None,
+    recursive: bool = False,
+    overwrite: bool = False,
+) -> Dict[str, object]:
+    """
+    Convert a directory of legacy files in parallel.
+
+    Each worker process converts and writes its file directly, so results are
+    streamed to disk as they complete and memory use does not grow with the
+    size of the catalogue. Returns counts and the list of failures.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    plan = plan_migration(source_dir, target_dir, recursive)
+    converted = 0
+    skipped = 0
+    failures: List[Dict[str, str]] = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_migrate_one, str(source), str(target), overwrite)
+            for source, target in plan
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            source, error = future.result()
+            if error is None:
+                converted += 1
+            elif error.startswith("skipped:"):
+                skipped += 1
+            else:
+                failures.append({"source": source, "error": error})
+                print(f"  ❌ {source}: {error}", file=sys.stderr)
+            if done % 500 == 0:
+                print(f"  … {done}/{len(plan)}", file=sys.stderr)
+
+    return {"total": len(plan), "converted": converted, "skipped": skipped, "failures": failures}
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert legacy proof JSON/Markdown to tree documents")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="Convert a single file")
+    convert_parser.add_argument("input", help="Legacy proof .json or .md file")
+    convert_parser.add_argument("-o", "--output", help="Output tree JSON file (default: stdout)")
+
+    migrate_parser = subparsers.add_parser("migrate", help="Convert a whole directory in parallel")
+    migrate_parser.add_argument("source", help="Directory with legacy .json/.md files")
+    migrate_parser.add_argument("target", help="Directory to write tree JSON files to")
+    migrate_parser.add_argument("-w", "--workers", type=int, default=None,
+                                help="Worker processes (default: CPU count)")
+    migrate_parser.add_argument("-r", "--recursive", action="store_true", help="Descend into subdirectories")
+    migrate_parser.add_argument("--overwrite", action="store_true", help="Replace existing output files")
+    migrate_parser.add_argument("--report", help="Write failures as JSON to this file")
+
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        try:
+            tree = convert_file(Path(args.input))
+        except FileNotFoundError:
+            print(f"Error: File '{args.input}' not found", file=sys.stderr)
+            sys.exit(1)
+        except LegacyConversionError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        if args.output:
+            _write_json_atomic(Path(args.output), tree)
+            print(f"✅ Tree written to {args.output}")
+        else:
+            print(json.dumps(tree, ensure_ascii=False, indent=2))
+        return
+
+    source_dir = Path(args.source)
+    if not source_dir.is_dir():
+        print(f"Error: Directory '{args.source}' not found", file=sys.stderr)
+        sys.exit(1)
+
+    summary = migrate_directory(source_dir, Path(args.target), args.workers, args.recursive, args.overwrite)
+    failures = summary["failures"]
+    if args.report:
+        Path(args.report).write_text(json.dumps(failures, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(
+        f"✅ {summary['converted']} converted, {summary['skipped']} skipped, "
+        f"{len(failures)} failed (of {summary['total']})"
+    )
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    from cli_daemon import run_via_daemon
+
+    status = run_via_daemon("legacy_tree")
+    if status is not None:
+        sys.exit(status)
+    main()
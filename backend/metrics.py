@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Request instrumentation and Prometheus text exposition for the Flask server.
+
+``init_app`` installs request hooks that record per-endpoint latency
+histograms, request/response sizes and error counts. ``timer`` measures named
+sections of work (conversion helpers, file I/O) from inside handlers. Set
+``BRICKMOVE_PROFILE_SLOW_MS`` to profile every request with cProfile and dump
+the stats of those slower than the threshold to ``BRICKMOVE_PROFILE_DIR``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+__all__ = ["MetricsRegistry", "init_app", "timer", "REGISTRY"]
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters and histograms keyed by name and labels."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._buckets: Dict[str, Sequence[float]] = {}
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._help[name] = ("counter", help_text)
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float]) -> None:
+        self._help[name] = ("histogram", help_text)
+        self._histograms.setdefault(name, {})
+        self._buckets[name] = buckets
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self._buckets[name])
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text) in sorted(self._help.items()):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for key, value in sorted(self._counters[name].items()):
+                        lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+                    continue
+                for key, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        le = key + (("le", _format_value(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+                    inf = key + (("le", "+Inf"),)
+                    lines.append(f"{name}_bucket{_format_labels(inf)} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.total)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _label_key(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: Labels) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.histogram("brickmove_request_duration_seconds", "Request latency by endpoint.", LATENCY_BUCKETS)
+REGISTRY.histogram("brickmove_request_size_bytes", "Request body size by endpoint.", SIZE_BUCKETS)
+REGISTRY.histogram("brickmove_response_size_bytes", "Response body size by endpoint.", SIZE_BUCKETS)
+REGISTRY.counter("brickmove_requests_total", "Requests by endpoint, method and status.")
+REGISTRY.counter("brickmove_request_errors_total", "Requests that failed with a 5xx status or an exception.")
+REGISTRY.histogram("brickmove_section_duration_seconds", "Time spent in instrumented sections.", LATENCY_BUCKETS)
+REGISTRY.counter("brickmove_section_errors_total", "Exceptions raised inside instrumented sections.")
+REGISTRY.counter("brickmove_slow_request_profiles_total", "Slow requests whose profile was dumped.")
+
+
+@contextmanager
+def timer(section: str) -> Iterator[None]:
+    """Record the wall time of the enclosed block under ``section``."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REGISTRY.inc("brickmove_section_errors_total", section=section)
+        raise
+    finally:
+        REGISTRY.observe("brickmove_section_duration_seconds", time.perf_counter() - start, section=section)
+
+
+class _SlowRequestProfiler:
+    """Profiles one request at a time and keeps the dump only if it was slow."""
+
+    def __init__(self, threshold_ms: float, output_dir: Path):
+        self.threshold = threshold_ms / 1000.0
+        self.output_dir = output_dir
+        # cProfile hooks the interpreter globally; never run two at once.
+        self._busy = threading.Lock()
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            self._busy.release()
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, endpoint: str, elapsed: float) -> None:
+        try:
+            profile.disable()
+            if elapsed < self.threshold:
+                return
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", endpoint) or "request"
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = self.output_dir / f"{stamp}_{safe}_{int(elapsed * 1000)}ms.prof"
+            profile.dump_stats(str(path))
+            REGISTRY.inc("brickmove_slow_request_profiles_total", endpoint=endpoint)
+        finally:
+            self._busy.release()
+
+
+def init_app(app, data_dir: Path) -> None:
+    """Install metrics hooks on ``app`` and register the ``/metrics`` endpoint."""
+    from flask import Response, g, request
+
+    profiler: Optional[_SlowRequestProfiler] = None
+    threshold = os.environ.get("BRICKMOVE_PROFILE_SLOW_MS")
+    if threshold:
+        output_dir = Path(os.environ.get("BRICKMOVE_PROFILE_DIR") or data_dir / "profiles")
+        profiler = _SlowRequestProfiler(float(threshold), output_dir)
+
+    def endpoint_label() -> str:
+        if request.url_rule is not None:
+            return request.url_rule.rule
+        return "<unmatched>"
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_profile = profiler.start() if profiler else None
+
+    @app.after_request
+    def _record_response(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = endpoint_label()
+        REGISTRY.observe("brickmove_request_duration_seconds", elapsed, endpoint=endpoint)
+        REGISTRY.observe("brickmove_request_size_bytes", request.content_length or 0, endpoint=endpoint)
+        if not response.is_streamed:
+            REGISTRY.observe("brickmove_response_size_bytes", response.calculate_content_length() or 0,
+                             endpoint=endpoint)
+        REGISTRY.inc("brickmove_requests_total", endpoint=endpoint, method=request.method,
+                     status=str(response.status_code))
+        if response.status_code >= 500:
+            REGISTRY.inc("brickmove_request_errors_total", endpoint=endpoint)
+        profile = g.pop("metrics_profile", None)
+        if profile is not None:
+            profiler.finish(profile, endpoint, elapsed)
+        return response
+
+    @app.teardown_request
+    def _record_exception(exc):
+        # Only reached with a pending timer if after_request never ran.
+        if g.pop("metrics_start", None) is not None and exc is not None:
+            REGISTRY.inc("brickmove_request_errors_total", endpoint=endpoint_label())
+        profile = g.pop("metrics_profile", None)
+        if profile is not None:
+            profiler.finish(profile, endpoint_label(), 0.0)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
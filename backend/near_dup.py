@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for saved proofs with MinHash and LSH.
+
+Every proof (a saved JSON/Markdown proof, a tree document or a CSV row) and
+every step (proof step, substep or tree node) becomes a set of features:
+character shingles of its normalised text plus one ``api:<name>`` token per
+API. A MinHash signature estimates the Jaccard similarity of two such sets;
+signatures are split into bands and hashed into buckets so that only items
+sharing a bucket are compared. Querying one item and clustering the whole
+corpus therefore take time roughly linear in the number of items.
+
+Usage:
+    python3 near_dup.py cluster data_save/csv_save --level proof --threshold 0.8
+    python3 near_dup.py query data_save/csv_save "proof.json" --level proof
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+from pathlib import Path
+from stat import S_ISREG
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+__all__ = ["LEVELS", "MinHasher", "NearDuplicateIndex", "extract_items", "features"]
+
+LEVELS = ("proof", "step")
+SOURCE_SUFFIXES = (".csv", ".json", ".md")
+SHINGLE_SIZE = 5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# (key, level, text, apis)
+Item = Tuple[str, str, str, List[str]]
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def features(text: str, apis: Iterable[str] = ()) -> Set[int]:
+    """Hashed character shingles of ``text`` plus one token per API name."""
+    normalised = re.sub(r"\s+", " ", text.lower()).strip()
+    tokens = {normalised[i:i + SHINGLE_SIZE] for i in range(max(len(normalised) - SHINGLE_SIZE + 1, 1))}
+    tokens.discard("")
+    tokens.update(f"api:{name}" for name in apis)
+    return {_hash64(token) for token in tokens}
+
+
+class MinHasher:
+    """``num_perm`` universal hash functions ``(a*x + b) mod p`` truncated to 32 bits."""
+
+    def __init__(self, num_perm: int = 96, seed: int = 1):
+        seed_bytes = seed.to_bytes(8, "little")
+        self.params = []
+        for i in range(num_perm):
+            digest = hashlib.blake2b(i.to_bytes(4, "little"), digest_size=16, key=seed_bytes).digest()
+            a = int.from_bytes(digest[:8], "little") % (_MERSENNE_PRIME - 1) + 1
+            b = int.from_bytes(digest[8:], "little") % _MERSENNE_PRIME
+            self.params.append((a, b))
+
+    @property
+    def num_perm(self) -> int:
+        return len(self.params)
+
+    def signature(self, hashed: Set[int]) -> Tuple[int, ...]:
+        if not hashed:
+            return tuple([_MAX_HASH] * len(self.params))
+        return tuple(
+            min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in hashed)
+            for a, b in self.params
+        )
+
+
+def estimate_jaccard(a: Sequence[int], b: Sequence[int]) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def _names(value: object) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        names = [str(entry) for entry in value]
+    else:
+        text = str(value)
+        names = re.findall(r"`([^`]+)`", text) or re.split(r"[\n,]", text)
+    return [name.strip(" `") for name in names if name.strip(" `")]
+
+
+def _join(*parts: object) -> str:
+    return "\n".join(str(part) for part in parts if part)
+
+
+def _proof_items(key: str, proof: Mapping) -> Iterator[Item]:
+    texts = [_join(proof.get("theorem_id"), proof.get("statement"))]
+    all_apis: List[str] = []
+    steps = proof.get("steps") if isinstance(proof.get("steps"), list) else []
+    for i, step in enumerate(steps, start=1):
+        if not isinstance(step, Mapping):
+            continue
+        text = _join(step.get("title"), step.get("description") or step.get("step"), step.get("mathProof"))
+        apis = _names(step.get("apis") or step.get("api"))
+        texts.append(text)
+        all_apis.extend(apis)
+        yield f"{key}#step-{i}", "step", text, apis
+        substeps = step.get("substeps") if isinstance(step.get("substeps"), list) else []
+        for j, substep in enumerate(substeps, start=1):
+            if not isinstance(substep, Mapping):
+                continue
+            text = _join(substep.get("title"), substep.get("description"), substep.get("mathProof"))
+            apis = _names(substep.get("api2")) + _names(substep.get("api1"))
+            texts.append(text)
+            all_apis.extend(apis)
+            yield f"{key}#step-{i}.{j}", "step", text, apis
+    yield key, "proof", "\n".join(texts), all_apis
+
+
+def _tree_items(key: str, root: Mapping) -> Iterator[Item]:
+    texts: List[str] = []
+    all_apis: List[str] = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, Mapping):
+            continue
+        text = _join(node.get("name"), node.get("problem"), node.get("description"), node.get("mathProof"))
+        apis = _names(node.get("api2")) + _names(node.get("api1"))
+        texts.append(text)
+        all_apis.extend(apis)
+        yield f"{key}#{node.get('id')}", "step", text, apis
+        children = node.get("children")
+        if isinstance(children, list):
+            stack.extend(reversed(children))
+    yield key, "proof", "\n".join(texts), all_apis
+
+
+def extract_items(path: Path, key: str) -> List[Item]:
+    """Proof- and step-level items of one saved file, keyed below ``key``."""
+    text = path.read_text(encoding="utf-8")
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        from columnar import parse_dataset_csv
+
+        items: List[Item] = []
+        for row, (statement, api2, api1) in enumerate(parse_dataset_csv(text), start=1):
+            # A CSV row is a single statement: the same item at both levels.
+            for level in LEVELS:
+                items.append((f"{key}#row-{row}", level, statement, api2 + api1))
+        return items
+    if suffix == ".md":
+        from markdown_to_json import MarkdownParseError, markdown_to_json
+
+        try:
+            return list(_proof_items(key, markdown_to_json(text)))
+        except MarkdownParseError:
+            return []
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return []
+    if isinstance(data, Mapping) and isinstance(data.get("root"), Mapping):
+        return list(_tree_items(key, data["root"]))
+    if isinstance(data, Mapping):
+        return list(_proof_items(key, data))
+    return []
+
+
+class _UnionFind:
+    def __init__(self) -> None:
+        self.parent: Dict[str, str] = {}
+
+    def find(self, x: str) -> str:
+        parent = self.parent
+        root = parent.setdefault(x, x)
+        while root != parent[root]:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a: str, b: str) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures and LSH buckets for the files of ``directory``.
+
+    Signatures are cached per file and recomputed only when the file's
+    ``(mtime_ns, size)`` changes; the band buckets are rebuilt from the
+    cached signatures whenever a file was added, changed or removed.
+
+    With 16 bands of 6 rows, pairs with a similarity of 0.8 share a bucket
+    with probability ~0.99 while pairs below ~0.5 rarely do.
+    """
+
+    def __init__(self, directory: Path, num_perm: int = 96, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.directory = Path(directory).resolve()
+        self._lock = threading.Lock()
+        self._files: Dict[Path, Tuple[Tuple[int, int], List[Tuple[str, str, Tuple[int, ...]]]]] = {}
+        # (signatures, buckets) per level, replaced as one value by ``_rebuild``;
+        # readers take it once so they never pair new buckets with old signatures.
+        self._index: Tuple[Dict[str, Dict[str, Tuple[int, ...]]],
+                           Dict[str, Dict[Tuple[int, Tuple[int, ...]], List[str]]]] = (
+            {level: {} for level in LEVELS}, {level: {} for level in LEVELS})
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def refresh(self) -> "NearDuplicateIndex":
+        """Bring the index up to date with the files currently in the directory."""
+        directory = self.directory
+        with self._lock:
+            current = {}
+            if directory.is_dir():
+                for p in directory.iterdir():
+                    if p.suffix.lower() not in SOURCE_SUFFIXES:
+                        continue
+                    try:
+                        stat = p.stat()
+                    except FileNotFoundError:
+                        continue  # deleted while listing
+                    if S_ISREG(stat.st_mode):
+                        current[p] = (stat.st_mtime_ns, stat.st_size)
+
+            changed = set(self._files) - set(current)
+            for p in changed:
+                del self._files[p]
+            for p, stamp in current.items():
+                cached = self._files.get(p)
+                if cached is not None and cached[0] == stamp:
+                    continue
+                try:
+                    items = extract_items(p, p.name)
+                except (OSError, UnicodeDecodeError):
+                    items = []
+                signatures: Dict[str, Optional[Tuple[int, ...]]] = {}
+                for key, _, text, apis in items:
+                    if key not in signatures:
+                        hashed = features(text, apis)
+                        # Empty items would all share one signature; leave them out.
+                        signatures[key] = self.hasher.signature(hashed) if hashed else None
+                self._files[p] = (stamp, [
+                    (key, level, signatures[key]) for key, level, _, _ in items if signatures[key] is not None
+                ])
+                changed.add(p)
+
+            if changed:
+                self._rebuild()
+        return self
+
+    def _rebuild(self) -> None:
+        signatures: Dict[str, Dict[str, Tuple[int, ...]]] = {level: {} for level in LEVELS}
+        buckets: Dict[str, Dict] = {level: {} for level in LEVELS}
+        for _, entries in self._files.values():
+            for key, level, signature in entries:
+                signatures[level][key] = signature
+                level_buckets = buckets[level]
+                for band_key in self._band_keys(signature):
+                    level_buckets.setdefault(band_key, []).append(key)
+        self._index = (signatures, buckets)
+
+    def keys(self, level: str = "proof") -> List[str]:
+        return sorted(self._index[0][level])
+
+    def _candidates(self, buckets: Dict, signature: Tuple[int, ...]) -> Set[str]:
+        found: Set[str] = set()
+        for band_key in self._band_keys(signature):
+            found.update(buckets.get(band_key, ()))
+        return found
+
+    def query(self, key: str, level: str = "proof", threshold: float = 0.8) -> Optional[List[Dict[str, object]]]:
+        """Items similar to the indexed item ``key``; ``None`` if ``key`` is unknown."""
+        index = self._index
+        signature = index[0][level].get(key)
+        if signature is None:
+            return None
+        return self._matches(index, level, signature, threshold, exclude=key)
+
+    def query_text(self, text: str, apis: Iterable[str] = (), level: str = "proof",
+                   threshold: float = 0.8) -> List[Dict[str, object]]:
+        """Items similar to an arbitrary text and API list."""
+        return self._matches(self._index, level, self.hasher.signature(features(text, apis)), threshold)
+
+    def _matches(self, index: Tuple[Dict, Dict], level: str, signature: Tuple[int, ...], threshold: float,
+                 exclude: Optional[str] = None) -> List[Dict[str, object]]:
+        signatures = index[0][level]
+        matches = []
+        for other in self._candidates(index[1][level], signature):
+            if other == exclude:
+                continue
+            similarity = estimate_jaccard(signature, signatures[other])
+            if similarity >= threshold:
+                matches.append({"key": other, "similarity": similarity})
+        matches.sort(key=lambda m: (-m["similarity"], m["key"]))
+        return matches
+
+    def clusters(self, level: str = "proof", threshold: float = 0.8) -> List[List[str]]:
+        """Groups of two or more items linked by an estimated similarity >= ``threshold``."""
+        all_signatures, all_buckets = self._index
+        signatures = all_signatures[level]
+        groups = _UnionFind()
+        for members in all_buckets[level].values():
+            # Compare each member against the groups already present in this
+            # bucket (via their root) rather than against every other member,
+            # so a large bucket of mutual near-duplicates stays linear.
+            roots: List[str] = []
+            for key in members:
+                for root in roots:
+                    if groups.find(root) == groups.find(key):
+                        break
+                    if estimate_jaccard(signatures[root], signatures[key]) >= threshold:
+                        groups.union(root, key)
+                        break
+                else:
+                    roots.append(key)
+
+        clustered: Dict[str, List[str]] = {}
+        for key in groups.parent:
+            clustered.setdefault(groups.find(key), []).append(key)
+        result = [sorted(members) for members in clustered.values() if len(members) > 1]
+        result.sort(key=lambda members: (-len(members), members[0]))
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Find near-duplicate proofs and steps")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    cluster_parser = subparsers.add_parser("cluster", help="Group near-duplicates across a directory")
+    cluster_parser.add_argument("directory", help="Directory with saved CSV/JSON/Markdown proofs")
+
+    query_parser = subparsers.add_parser("query", help="Find near-duplicates of one item")
+    query_parser.add_argument("directory", help="Directory with saved CSV/JSON/Markdown proofs")
+    query_parser.add_argument("key", help="Item key, e.g. 'proof.json' or 'proof.json#step-2'")
+
+    for sub in (cluster_parser, query_parser):
+        sub.add_argument("--level", choices=LEVELS, default="proof", help="Compare whole proofs or steps")
+        sub.add_argument("--threshold", type=float, default=0.8, help="Minimum estimated Jaccard similarity")
+
+    args = parser.parse_args()
+    directory = Path(args.directory)
+    if not directory.is_dir():
+        print(f"Error: Directory '{args.directory}' not found", file=sys.stderr)
+        sys.exit(1)
+
+    index = NearDuplicateIndex(directory).refresh()
+    if args.command == "cluster":
+        result = index.clusters(args.level, args.threshold)
+    else:
+        result = index.query(args.key, args.level, args.threshold)
+        if result is None:
+            print(f"Error: Item '{args.key}' not found (level: {args.level})", file=sys.stderr)
+            sys.exit(1)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    from cli_daemon import run_via_daemon
+
+    status = run_via_daemon("near_dup")
+    if status is not None:
+        sys.exit(status)
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Per-path reader/writer locks for files the server reads and writes.
+
+With a threaded server, an overwrite through ``/api/save-*-content`` and a
+``/api/read-file`` of the same path can interleave. ``PathLockManager`` hands
+out shared (read) and exclusive (write) locks keyed by path:
+
+- Lock striping: paths are hashed onto a fixed number of stripes, so memory
+  stays bounded no matter how many files are touched. Two paths on the same
+  stripe merely serialize writes more than strictly necessary.
+- Writers are preferred: once a writer waits, new readers queue behind it.
+- Optional cross-process mode (``lock_dir``): each stripe also holds an
+  ``fcntl.flock`` on ``<lock_dir>/stripe-NN.lock`` (shared for readers,
+  exclusive for writers), so several server processes or CLI workers on the
+  same workspace coordinate too. Stripes are chosen with a stable hash, so
+  all processes agree on them.
+
+Locks are not reentrant: do not take a second lock while holding one.
+``atomic_write_text`` writes through a temporary file and ``os.replace`` so
+even readers that do not lock never see a partial file.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+__all__ = [
+    "PathLockManager",
+    "RWLock",
+    "atomic_write_bytes",
+    "atomic_write_text",
+    "configure_default_locks",
+    "default_locks",
+]
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+class RWLock:
+    """
+    A writer-preferring readers/writer lock.
+
+    If ``lock_file`` is given (an open file descriptor), the lock is mirrored
+    with ``flock`` on it: shared while any thread of this process reads,
+    exclusive while one writes.
+    """
+
+    def __init__(self, lock_file: Optional[int] = None):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._sharing = False       # the first reader is waiting for the shared flock
+        self._fd = lock_file
+
+    def acquire_read(self) -> None:
+        with self._cond:
+            while self._writer or self._waiting_writers or self._sharing:
+                self._cond.wait()
+            self._readers += 1
+            take_flock = self._readers == 1 and self._fd is not None
+            self._sharing = take_flock
+        if not take_flock:
+            return
+        # Block on other processes without holding the condition lock, so the
+        # other threads on this stripe (including releases) are not stalled.
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_SH)
+        except BaseException:
+            with self._cond:
+                self._sharing = False
+                self._readers -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._sharing = False
+            self._cond.notify_all()
+
+    def release_read(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        if self._fd is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self.release_write()
+                raise
+
+    def release_write(self) -> None:
+        with self._cond:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class PathLockManager:
+    """
+    Striped reader/writer locks keyed by file path.
+
+    ``stripes`` bounds the number of locks. With ``lock_dir`` the locks also
+    exclude other processes that use the same ``lock_dir`` and stripe count.
+    """
+
+    def __init__(self, stripes: int = 64, lock_dir: Optional[PathLike] = None):
+        if stripes < 1:
+            raise ValueError("stripes must be at least 1")
+        self.stripes = stripes
+        self.lock_dir = Path(lock_dir) if lock_dir else None
+        fds = [None] * stripes
+        if self.lock_dir is not None:
+            if fcntl is None:
+                raise RuntimeError("Cross-process path locks need fcntl (not available on this platform)")
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+            fds = [
+                os.open(self.lock_dir / f"stripe-{i:02d}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+                for i in range(stripes)
+            ]
+        self._locks = [RWLock(fd) for fd in fds]
+
+    def stripe_of(self, path: PathLike) -> int:
+        key = os.path.abspath(os.fspath(path)).encode("utf-8", "surrogateescape")
+        return zlib.crc32(key) % self.stripes
+
+    def lock_for(self, path: PathLike) -> RWLock:
+        return self._locks[self.stripe_of(path)]
+
+    def read(self, path: PathLike):
+        """Context manager: shared access to ``path``."""
+        return self.lock_for(path).read()
+
+    def write(self, path: PathLike):
+        """Context manager: exclusive access to ``path``."""
+        return self.lock_for(path).write()
+
+    def close(self) -> None:
+        for lock in self._locks:
+            if lock._fd is not None:
+                os.close(lock._fd)
+                lock._fd = None
+
+
+def _atomic_write(path: Path, data, mode: str) -> None:
+    try:
+        permissions = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        permissions = 0o644
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as handle:
+            handle.write(data)
+        os.chmod(tmp_name, permissions)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write ``text`` to ``path`` via a temporary file in the same directory and ``os.replace``."""
+    _atomic_write(path, text, "w")
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Binary counterpart of ``atomic_write_text``."""
+    _atomic_write(path, data, "wb")
+
+
+_DEFAULT: Optional[PathLockManager] = None
+_DEFAULT_GUARD = threading.Lock()
+
+
+def default_locks() -> PathLockManager:
+    """The process-wide lock manager (in-process only unless configured otherwise)."""
+    global _DEFAULT
+    with _DEFAULT_GUARD:
+        if _DEFAULT is None:
+            _DEFAULT = PathLockManager()
+        return _DEFAULT
+
+
+def configure_default_locks(stripes: int = 64, lock_dir: Optional[PathLike] = None) -> PathLockManager:
+    """
+    Replace the process-wide lock manager, e.g. to enable cross-process
+    locking. Call this at startup, before any lock is taken.
+    """
+    global _DEFAULT
+    manager = PathLockManager(stripes, lock_dir)
+    with _DEFAULT_GUARD:
+        _DEFAULT = manager
+    return manager
@@ -9,7 +9,7 @@ Markdown format.
 
 from __future__ import annotations
 
-from typing import Iterable, List, Mapping, Sequence
+from typing import Iterable, Iterator, List, Mapping, Sequence, Tuple
 
 
 def validate_proof_json(data: Mapping) -> List[str]:
@@ -135,28 +135,67 @@ def build_markdown(data: Mapping) -> str:
     return "\n".join(lines)
 
 
+def build_csv_rows(data: Mapping) -> Iterator[Tuple[str, List[str], List[str]]]:
+    """
+    Yield the ``(informal statement, api2, api1)`` rows of the three-column
+    CSV export, following the editor's "导出 CSV": one row per substep
+    (``<step title> - <substep description>``), or one row per legacy step
+    with its ``apis`` as score-2 APIs.
+    """
+    steps = data.get("steps")
+    if not isinstance(steps, Sequence) or isinstance(steps, (str, bytes)):
+        return
+
+    for idx, step in enumerate(steps, start=1):
+        if not isinstance(step, Mapping):
+            continue
+        title = (step.get("title") or "").strip()
+        substeps = step.get("substeps") if isinstance(step.get("substeps"), Sequence) else []
+        if substeps:
+            for substep in substeps:
+                if not isinstance(substep, Mapping):
+                    continue
+                description = (substep.get("description") or "").strip()
+                parts = [part for part in (title, description) if part]
+                if not parts and (step.get("step") or "").strip():
+                    parts = [step["step"].strip()]
+                if parts:
+                    yield " - ".join(parts), _api_names(substep.get("api2")), _api_names(substep.get("api1"))
+            continue
+        description = (step.get("description") or step.get("step") or "").strip()
+        if title and description and title != description:
+            statement = f"{title} - {description}"
+        else:
+            statement = description or title or f"Step {idx}"
+        yield statement, _api_names(step.get("apis") or step.get("api")), []
+
+
 def _format_api_list(raw: object) -> str:
-    if raw is None:
+    names = _api_names(raw)
+    if not names:
         return ""
 
+    return ", ".join(f"`{entry}`" for entry in names)
+
+
+def _api_names(raw: object) -> List[str]:
+    """Normalise a raw ``apis``/``api2``/``api1`` value into a list of names."""
+    if raw is None:
+        return []
+
     if isinstance(raw, str):
         entries = raw.split(",")
     elif isinstance(raw, Iterable):
         entries = list(raw)
     else:
-        return ""
+        return []
 
     cleaned = [
         str(entry).strip()
         for entry in entries
         if isinstance(entry, (str, bytes)) or isinstance(entry, (int, float))
     ]
-    cleaned = [entry for entry in cleaned if entry]
-
-    if not cleaned:
-        return ""
-
-    return ", ".join(f"`{entry}`" for entry in cleaned)
+    return [entry for entry in cleaned if entry]
 
 
-__all__ = ["build_markdown", "validate_proof_json"]
+__all__ = ["build_csv_rows", "build_markdown", "validate_proof_json"]
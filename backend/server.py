@@ -8,12 +8,19 @@ Usage:
     Then open: http://localhost:5000
 """
 
-import re
+import csv
+import io
+import os
 from pathlib import Path
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 
+from admission import AdmissionController
+from api_stats import ApiStatsIndex
+from api_vocab import default_vocabulary
+from lean_file import LeanFileIndex
+from lean_filter import LeanFilterError, load_default_filter, refresh_default_filter
 from proof_markdown import build_markdown, validate_proof_json
 from markdown_to_json import markdown_to_json, MarkdownParseError
 from csv_storage import (
@@ -24,213 +31,129 @@ from csv_storage import (
     save_md_content,
     save_json_content,
 )
+from tree_store import TreeStore, TreeStoreError, default_tree
+from tree_sync import TreeSyncConflict, TreeSyncError, TreeSyncStore
+from collab import CollabHub, sse_event
+from jobs import TERMINAL_STATES, JobError, JobManager
+from near_dup import LEVELS as NEAR_DUP_LEVELS, NearDuplicateIndex
+from path_locks import configure_default_locks, default_locks
+from snapshot_store import SnapshotError, SnapshotStore
+from static_bundle import BundleError, StaticBundle
+import metrics
+from metrics import timer
 
 app = Flask(__name__, static_folder='../frontend')
 CORS(app)
 
 BASE_DIR = Path(__file__).parent.parent
+# Server state: version history, job records, filter config, profiles.
+DATA_DIR = Path(os.environ.get('BRICKMOVE_DATA_DIR') or BASE_DIR / 'data_save')
 DEFAULT_CSV_DIR = get_default_directory(BASE_DIR)
+if os.environ.get('BRICKMOVE_LOCK_DIR'):
+    # Coordinate file access with other server processes / workers as well.
+    configure_default_locks(lock_dir=os.environ['BRICKMOVE_LOCK_DIR'])
+PATH_LOCKS = default_locks()
+TREE_SYNC = TreeSyncStore(PATH_LOCKS)
+SNAPSHOTS = SnapshotStore(DATA_DIR / 'snapshots', PATH_LOCKS)
+# Files of the brickmove-next tree editor (/api/tree, /api/list-trees).
+# Same directory as the Next.js routes (``process.cwd()/data``, run from brickmove-next/).
+TREE_FILES = TreeStore(Path(os.environ.get('BRICKMOVE_TREE_DIR') or BASE_DIR / 'brickmove-next' / 'data'), PATH_LOCKS)
+COLLAB = CollabHub()
+JOBS = JobManager(DATA_DIR / 'jobs')
+API_STATS = ApiStatsIndex()
+LEAN_FILES = LeanFileIndex()
+NEAR_DUP_INDEXES = {}
+ADMISSION = AdmissionController.from_env()
+# Hard cap for every endpoint; the heavy ones get tighter limits below.
+app.config['MAX_CONTENT_LENGTH'] = int(float(os.environ.get('BRICKMOVE_MAX_CONTENT_MB', 64)) * 1024 * 1024)
+metrics.init_app(app, DATA_DIR)
+STATIC_BUNDLE = None
+if os.environ.get('BRICKMOVE_STATIC_BUNDLE'):
+    # Serve bundled, fingerprinted, pre-gzipped frontend assets from memory.
+    try:
+        STATIC_BUNDLE = StaticBundle(BASE_DIR / 'frontend').build()
+    except BundleError as e:
+        app.logger.warning('Static bundle disabled, serving raw frontend files: %s', e)
 
 
-def is_likely_api(name):
-    """Filter to identify likely API names."""
-    excluded = {
-        'intro', 'apply', 'exact', 'rw', 'simp', 'ring', 'field_simp',
-        'have', 'let', 'by', 'sorry', 'theorem', 'lemma', 'def', 'Mathlib'
-    }
-
-    lower = name.lower()
-    if any(ex in lower for ex in excluded):
-        return False
-
-    # Must have namespace (dot) OR be custom lemma (lowercase with underscore)
-    if '.' in name:
-        return name[0].isupper()
-
-    # Unqualified: only allow lowercase_with_underscore (custom lemmas)
-    if name[0].islower():
-        return '_' in name and len(name) >= 5
-
-    # Reject standalone uppercase words
-    return False
-
-
-def extract_local_vars(code):
-    """Extract local variable names to filter out."""
-    local_vars = set()
-    
-    var_patterns = [
-        r'\b(?:let|have|intro|rcases|obtain|use)\s+([a-zA-Z_][a-zA-Z0-9_\']*)',
-        r'\bfun\s+([a-zA-Z_][a-zA-Z0-9_\']*)\s*(?::|=>)',
-    ]
-    
-    for pattern in var_patterns:
-        for match in re.finditer(pattern, code):
-            local_vars.add(match.group(1))
-    
-    sig_pattern = r'(?:theorem|lemma|def)\s+\w+[^:]*\(([^)]*)\)'
-    for match in re.finditer(sig_pattern, code):
-        params = match.group(1)
-        for param in params.split(','):
-            param_name = param.split(':')[0].strip()
-            if param_name and re.match(r'^[a-zA-Z_]', param_name):
-                local_vars.add(param_name)
-    
-    forall_pattern = r'∀\s*\(?([a-zA-Z_][a-zA-Z0-9_\']*)'
-    for match in re.finditer(forall_pattern, code):
-        local_vars.add(match.group(1))
-    
-    return local_vars
-
-
-def extract_apis_from_code(code):
-    """Extract API names from Lean code."""
-    local_vars = extract_local_vars(code)
-    apis = set()
-    
-    # Common documentation words that should not be treated as APIs
-    doc_words = {
-        'any', 'all', 'some', 'hence', 'thus', 'then', 'also',
-        'helper', 'note', 'from', 'this', 'that', 'will', 'must',
-        'can', 'may', 'should', 'would', 'could', 'the', 'and',
-        'but', 'for', 'not', 'are', 'was', 'were', 'been', 'being',
-        'there', 'exists'
-    }
-    
-    # Lean tactics and commands to exclude
-    tactics = {
-        'set_option', 'push_neg', 'rcases', 'obtain', 'refine',
-        'show', 'change', 'use', 'constructor', 'left', 'right'
-    }
-    
-    def is_local_variable(name):
-        """Check if name matches local variable patterns."""
-        import re
-        # h_, hx_, hn_, etc. are local hypotheses
-        if re.match(r'^h[a-z]?_', name):
-            return True
-        # Single letter followed by underscore
-        if re.match(r'^[a-z]_', name):
-            return True
-        return False
-    
-    # Track opened namespaces
-    opened_namespaces = set()
-    open_pattern = r'\bopen\s+([A-Z][a-zA-Z0-9_]*(?:\s+[A-Z][a-zA-Z0-9_]*)*)'
-    for match in re.finditer(open_pattern, code):
-        namespaces = match.group(1).split()
-        opened_namespaces.update(namespaces)
-    
-    api_pattern = r'\b([A-Za-z][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*)\b'
-    
-    for line in code.split('\n'):
-        line = line.strip()
-        if line.startswith('--') or line.startswith('import'):
-            continue
-        
-        for match in re.finditer(api_pattern, line):
-            api = match.group(1)
-
-            first_part = api.split('.')[0]
-            if first_part in local_vars:
-                continue
+def _refresh_lean_filter(initial: bool = False) -> None:
+    """Pick up edits to the identifier filter config (``lean_filter.py``); a broken file keeps the current rules."""
+    try:
+        if initial:
+            load_default_filter(Path(os.environ.get('BRICKMOVE_LEAN_FILTER') or DATA_DIR / 'lean_filter.json'))
+        else:
+            refresh_default_filter()
+    except (OSError, LeanFilterError) as e:
+        app.logger.warning('Invalid Lean filter config, keeping the current rules: %s', e)
 
-            is_qualified = '.' in api
-            starts_upper = api[0].isupper()
-            starts_lower = api[0].islower()
-            
-            # Try to restore namespace from open statements
-            if not is_qualified and opened_namespaces:
-                for ns in opened_namespaces:
-                    if starts_lower and '_' in api:
-                        api = f"{ns}.{api}"
-                        is_qualified = True
-                        break
-
-            # For unqualified names (no dot):
-            # - Uppercase: skip (standalone types like Field, Finite)
-            # - Lowercase: must have underscore AND be >= 5 chars
-            if not is_qualified:
-                if starts_lower:
-                    if '_' not in api or len(api) < 5:
-                        continue
-                else:
-                    # Skip standalone uppercase words
-                    continue
 
-            parts = api.split('.')
-            if len(parts) == 2:
-                common_fields = {
-                    'FG', 'IsPrime', 'isPrime', 'asIdeal', 'toFun',
-                    'toRingHom', 'toAlgHom', 'val', 'property'
-                }
-                if parts[1] in common_fields and parts[0][0].islower():
-                    continue
-            
-            # Filter out common documentation words
-            if api.lower() in doc_words:
-                continue
-            
-            # Filter out tactics and commands
-            if api.lower() in tactics:
-                continue
-            
-            # Filter out local variable patterns
-            if is_local_variable(api):
-                continue
+_refresh_lean_filter(initial=True)
 
-            if not any(part[0].isupper() for part in parts if part) and '_' not in api:
-                continue
 
-            if is_likely_api(api):
-                # Remove Lean projection suffixes (.mp, .mpr, .1, .2, etc.)
-                api = re.sub(r'\.(mp|mpr|\d+)$', '', api)
-                apis.add(api)
-    
-    return sorted(apis)
+def _internal_error(exc: Exception):
+    """Log an unexpected failure and turn it into the usual JSON 500 response."""
+    app.logger.exception('Unhandled error in %s', request.path)
+    return jsonify({'error': str(exc)}), 500
 
 
 @app.route('/')
 def index():
     """Serve the main HTML page."""
+    if STATIC_BUNDLE is not None:
+        return STATIC_BUNDLE.response('index.html', request)
     return send_from_directory('../frontend', 'index.html')
 
 
 @app.route('/<path:path>')
 def serve_static(path):
     """Serve static files."""
+    if STATIC_BUNDLE is not None:
+        response = STATIC_BUNDLE.response(path, request)
+        if response is not None:
+            return response
     return send_from_directory('../frontend', path)
 
 
 @app.route('/api/extract-apis', methods=['POST'])
+@ADMISSION.limit('extract-apis')
 def extract_apis():
-    """Extract APIs from uploaded Lean code."""
+    """Extract APIs from uploaded Lean code.
+
+    Extraction runs per declaration and is cached by block content, so
+    re-posting an edited file only re-scans the declarations that changed.
+    Pass ``"per_declaration": true`` to also get the API list of each
+    declaration. Admission-controlled: see ``admission.py``.
+    """
     try:
         data = request.get_json()
+        _refresh_lean_filter()
         
         if 'code' in data:
             # Direct code input
-            code = data['code']
+            with timer('extract_apis_from_code'):
+                result = LEAN_FILES.extract_code(data['code'])
         elif 'file' in data:
-            # File path
-            filepath = BASE_DIR / data['file']
-            with open(filepath, 'r', encoding='utf-8') as f:
-                code = f.read()
+            # File path (memory-mapped)
+            with timer('extract_apis_from_code'):
+                result = LEAN_FILES.extract_file(BASE_DIR / data['file'])
         else:
             return jsonify({'error': 'No code or file provided'}), 400
         
-        apis = extract_apis_from_code(code)
-        
-        return jsonify({
+        response = {
             'success': True,
-            'count': len(apis),
-            'apis': apis
-        })
+            'count': len(result['apis']),
+            'apis': result['apis'],
+            'blocks': result['blocks'],
+            'scanned': result['scanned'],
+        }
+        if data.get('per_declaration'):
+            response['declarations'] = result['declarations']
+        return jsonify(response)
     
     except FileNotFoundError:
         return jsonify({'error': 'File not found'}), 404
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _internal_error(e)
 
 
 @app.route('/api/upload-csv', methods=['POST'])
@@ -243,11 +166,12 @@ def upload_csv():
     requested_dir = request.form.get('target_dir') or request.args.get('target_dir')
 
     try:
-        saved_path = save_csv_file(uploaded, BASE_DIR, requested_dir)
+        with timer('file_write'):
+            saved_path, version = _save_with_history(save_csv_file, uploaded, BASE_DIR, requested_dir)
     except CsvStorageError as exc:
         return jsonify({'error': str(exc)}), 400
     except Exception as exc:  # Unexpected errors
-        return jsonify({'error': str(exc)}), 500
+        return _internal_error(exc)
 
     try:
         relative_path = saved_path.relative_to(BASE_DIR)
@@ -259,7 +183,8 @@ def upload_csv():
         'path': str(relative_path),
         'absolute_path': str(saved_path),
         'default_directory': str(DEFAULT_CSV_DIR),
-        'requested_directory': requested_dir
+        'requested_directory': requested_dir,
+        'version': version
     })
 
 
@@ -277,15 +202,18 @@ def save_csv_content_api():
 
         filename = payload.get('filename')
         requested_dir = payload.get('target_dir') or payload.get('directory')
-        overwrite = bool(payload.get('overwrite', False))
-
-        saved_path = save_csv_content(
-            content,
-            BASE_DIR,
-            filename=filename,
-            requested_directory=requested_dir,
-            overwrite=overwrite,
-        )
+        # Versioned saves replace the file in place; earlier contents stay in the version store.
+        overwrite = bool(payload.get('overwrite', False) or payload.get('versioned', False))
+
+        with timer('file_write'):
+            saved_path, version = _save_with_history(
+                save_csv_content,
+                content,
+                BASE_DIR,
+                filename=filename,
+                requested_directory=requested_dir,
+                overwrite=overwrite,
+            )
 
         try:
             relative_path = saved_path.relative_to(BASE_DIR)
@@ -297,12 +225,13 @@ def save_csv_content_api():
             'path': str(relative_path),
             'absolute_path': str(saved_path),
             'default_directory': str(DEFAULT_CSV_DIR),
-            'requested_directory': requested_dir
+            'requested_directory': requested_dir,
+            'version': version
         })
     except CsvStorageError as exc:
         return jsonify({'error': str(exc)}), 400
     except Exception as exc:
-        return jsonify({'error': str(exc)}), 500
+        return _internal_error(exc)
 
 
 @app.route('/api/save-md-content', methods=['POST'])
@@ -316,17 +245,19 @@ def save_md_content_api():
             return jsonify({'error': 'Field "content" (string) is required'}), 400
         filename = payload.get('filename')
         requested_dir = payload.get('target_dir') or payload.get('directory')
-        overwrite = bool(payload.get('overwrite', False))
-        saved_path = save_md_content(content, BASE_DIR, filename, requested_dir, overwrite)
+        overwrite = bool(payload.get('overwrite', False) or payload.get('versioned', False))
+        with timer('file_write'):
+            saved_path, version = _save_with_history(save_md_content, content, BASE_DIR, filename, requested_dir,
+                                                     overwrite=overwrite)
         try:
             relative_path = saved_path.relative_to(BASE_DIR)
         except ValueError:
             relative_path = saved_path
-        return jsonify({'success': True, 'path': str(relative_path), 'absolute_path': str(saved_path)})
+        return jsonify({'success': True, 'path': str(relative_path), 'absolute_path': str(saved_path), 'version': version})
     except CsvStorageError as exc:
         return jsonify({'error': str(exc)}), 400
     except Exception as exc:
-        return jsonify({'error': str(exc)}), 500
+        return _internal_error(exc)
 
 
 @app.route('/api/save-json-content', methods=['POST'])
@@ -341,20 +272,25 @@ def save_json_content_api():
             return jsonify({'error': 'Field "json" or "content" is required'}), 400
         filename = payload.get('filename')
         requested_dir = payload.get('target_dir') or payload.get('directory')
-        overwrite = bool(payload.get('overwrite', False))
-        saved_path = save_json_content(content, BASE_DIR, filename, requested_dir, overwrite)
+        overwrite = bool(payload.get('overwrite', False) or payload.get('versioned', False))
+        with timer('file_write'):
+            saved_path, version = _save_with_history(save_json_content, content, BASE_DIR, filename, requested_dir,
+                                                     overwrite=overwrite)
+        if overwrite:
+            COLLAB.publish_reload(_relative_str(saved_path), payload.get('client_id'))
         try:
             relative_path = saved_path.relative_to(BASE_DIR)
         except ValueError:
             relative_path = saved_path
-        return jsonify({'success': True, 'path': str(relative_path), 'absolute_path': str(saved_path)})
+        return jsonify({'success': True, 'path': str(relative_path), 'absolute_path': str(saved_path), 'version': version})
     except CsvStorageError as exc:
         return jsonify({'error': str(exc)}), 400
     except Exception as exc:
-        return jsonify({'error': str(exc)}), 500
+        return _internal_error(exc)
 
 
 @app.route('/api/convert-json-to-md', methods=['POST'])
+@ADMISSION.limit('convert-json-to-md')
 def convert_json_to_md():
     """Convert proof JSON to Markdown."""
     try:
@@ -367,7 +303,8 @@ def convert_json_to_md():
         if errors:
             return jsonify({'error': 'Invalid JSON structure', 'details': errors}), 400
 
-        markdown = build_markdown(data)
+        with timer('build_markdown'):
+            markdown = build_markdown(data)
         
         return jsonify({
             'success': True,
@@ -375,10 +312,11 @@ def convert_json_to_md():
         })
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _internal_error(e)
 
 
 @app.route('/api/convert-md-to-json', methods=['POST'])
+@ADMISSION.limit('convert-md-to-json')
 def convert_md_to_json():
     """Convert proof Markdown (generated by this tool) back to JSON."""
     try:
@@ -388,7 +326,8 @@ def convert_md_to_json():
 
         markdown_text = payload['markdown']
         try:
-            proof_json = markdown_to_json(markdown_text)
+            with timer('markdown_to_json'):
+                proof_json = markdown_to_json(markdown_text)
         except MarkdownParseError as exc:
             return jsonify({'error': 'Markdown 解析失败', 'details': str(exc)}), 400
 
@@ -398,7 +337,7 @@ def convert_md_to_json():
 
         return jsonify({'success': True, 'proof': proof_json})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _internal_error(e)
 
 
 def _resolve_dir(requested_dir: str | None) -> Path:
@@ -412,6 +351,77 @@ def _resolve_dir(requested_dir: str | None) -> Path:
     return d
 
 
+def _resolve_file(path_param: str) -> Path:
+    p = Path(path_param).expanduser()
+    if not p.is_absolute():
+        p = (BASE_DIR / p).resolve()
+    return p
+
+
+def _relative_str(p: Path) -> str:
+    try:
+        return str(p.relative_to(BASE_DIR))
+    except ValueError:
+        return str(p)
+
+
+def _read_text(p: Path) -> str:
+    """Read a workspace file under its shared lock, so concurrent saves are never seen half-written."""
+    with PATH_LOCKS.read(p), timer('file_read'):
+        return p.read_text(encoding='utf-8')
+
+
+def _record_version(p: Path, data: bytes) -> int | None:
+    """Add the saved content of ``p`` to its version history; returns the version number (None if recording failed)."""
+    try:
+        with timer('snapshot_record'):
+            return SNAPSHOTS.record(_relative_str(p), data)['version']
+    except Exception:
+        # The save itself succeeded, and the next overwrite preserves this
+        # content first (``_preserve_current``); do not turn it into an error.
+        app.logger.exception('Could not record a version of %s', p)
+        return None
+
+
+def _preserve_current(p: Path) -> None:
+    """
+    Record the current content of ``p`` before it is overwritten in place,
+    unless it already is the latest version (files saved before the version
+    store existed, or last written by tree-sync, the watch daemon or a plain
+    ``overwrite``). Raises ``SnapshotError`` to refuse the overwrite.
+    """
+    try:
+        with PATH_LOCKS.read(p):
+            data = p.read_bytes()
+    except FileNotFoundError:
+        return
+    try:
+        with timer('snapshot_record'):
+            SNAPSHOTS.record(_relative_str(p), data, source='before-overwrite')
+    except Exception as exc:
+        raise SnapshotError(f'Could not keep the current content of {p.name} in its history; '
+                            f'the file was not overwritten') from exc
+
+
+def _save_with_history(save, *args, **kwargs) -> tuple[Path, int | None]:
+    """
+    Call a ``csv_storage`` save function with the version-history hooks
+    (``_preserve_current`` before an overwrite, ``_record_version`` of the
+    bytes written after it) and mark the file stale for the API statistics.
+    Returns the saved path and its version.
+    """
+    recorded = {}
+
+    def record(p: Path, data: bytes) -> None:
+        recorded['version'] = _record_version(p, data)
+
+    if kwargs.get('overwrite'):
+        kwargs['before_overwrite'] = _preserve_current
+    saved_path = save(*args, after_write=record, **kwargs)
+    API_STATS.invalidate(saved_path)
+    return saved_path, recorded.get('version')
+
+
 @app.route('/api/list-files', methods=['GET'])
 def list_files_generic():
     try:
@@ -423,12 +433,17 @@ def list_files_generic():
         allowed = {e.strip().lower() for e in exts.split(',') if e.strip()}
 
         items = []
-        for p in target_dir.iterdir():
+        with timer('file_list'):
+            entries = list(target_dir.iterdir())
+        for p in entries:
             if not p.is_file():
                 continue
             if allowed and p.suffix.lower() not in allowed:
                 continue
-            stat = p.stat()
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue  # removed by a concurrent request
             try:
                 rel = p.relative_to(BASE_DIR)
                 rel_str = str(rel)
@@ -446,7 +461,7 @@ def list_files_generic():
             items = items[:limit]
         return jsonify({'success': True, 'dir': str(target_dir), 'items': items})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _internal_error(e)
 
 
 @app.route('/api/read-file', methods=['GET'])
@@ -455,12 +470,13 @@ def read_file_generic():
         path_param = request.args.get('path')
         if not path_param:
             return jsonify({'error': 'path is required'}), 400
-        p = Path(path_param).expanduser()
-        if not p.is_absolute():
-            p = (BASE_DIR / p).resolve()
+        p = _resolve_file(path_param)
         if not p.exists() or not p.is_file():
             return jsonify({'error': 'file not found'}), 404
-        text = p.read_text(encoding='utf-8')
+        try:
+            text = _read_text(p)
+        except FileNotFoundError:
+            return jsonify({'error': 'file not found'}), 404
         try:
             rel = p.relative_to(BASE_DIR)
             rel_str = str(rel)
@@ -468,7 +484,505 @@ def read_file_generic():
             rel_str = str(p)
         return jsonify({'success': True, 'path': rel_str, 'absolute_path': str(p), 'content': text, 'ext': p.suffix.lower()})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _internal_error(e)
+
+
+def _version_arg(name: str) -> int | None:
+    value = request.args.get(name)
+    return int(value) if value not in (None, '') else None
+
+
+@app.route('/api/versions', methods=['GET'])
+def list_versions():
+    """Saved versions of a document, oldest first."""
+    try:
+        path_param = request.args.get('path')
+        if not path_param:
+            return jsonify({'error': 'path is required'}), 400
+        doc = _relative_str(_resolve_file(path_param))
+        return jsonify({'success': True, 'path': doc, 'versions': SNAPSHOTS.versions(doc)})
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/versions/read', methods=['GET'])
+def read_version():
+    """Content of one saved version (default: the latest)."""
+    try:
+        path_param = request.args.get('path')
+        if not path_param:
+            return jsonify({'error': 'path is required'}), 400
+        p = _resolve_file(path_param)
+        doc = _relative_str(p)
+        try:
+            version = _version_arg('version')
+            data = SNAPSHOTS.read(doc, version)
+        except ValueError:
+            return jsonify({'error': 'version must be an integer'}), 400
+        except SnapshotError as exc:
+            return jsonify({'error': str(exc)}), 404
+        return jsonify({'success': True, 'path': doc, 'version': version, 'ext': p.suffix.lower(),
+                        'content': data.decode('utf-8', 'replace')})
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/versions/diff', methods=['GET'])
+def diff_versions():
+    """Changed chunks and a unified diff between versions ``from`` and ``to``."""
+    try:
+        path_param = request.args.get('path')
+        if not path_param:
+            return jsonify({'error': 'path is required'}), 400
+        doc = _relative_str(_resolve_file(path_param))
+        try:
+            old, new = _version_arg('from'), _version_arg('to')
+            if old is None or new is None:
+                return jsonify({'error': 'from and to are required'}), 400
+            result = SNAPSHOTS.diff(doc, old, new)
+        except ValueError:
+            return jsonify({'error': 'from and to must be integers'}), 400
+        except SnapshotError as exc:
+            return jsonify({'error': str(exc)}), 404
+        return jsonify(dict(result, success=True))
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/versions/restore', methods=['POST'])
+def restore_version():
+    """Write a saved version back to the file; the restore is recorded as a new version."""
+    try:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict) or not payload.get('path'):
+            return jsonify({'error': 'Field "path" is required'}), 400
+        version = payload.get('version')
+        if not isinstance(version, int):
+            return jsonify({'error': 'Field "version" (integer) is required'}), 400
+        p = _resolve_file(payload['path'])
+        doc = _relative_str(p)
+        try:
+            _preserve_current(p)
+        except SnapshotError as exc:
+            return _internal_error(exc)
+        try:
+            with timer('file_write'):
+                entry = SNAPSHOTS.restore(doc, version, p)
+        except SnapshotError as exc:
+            return jsonify({'error': str(exc)}), 404
+        API_STATS.invalidate(p)
+        COLLAB.publish_reload(doc, payload.get('client_id'))
+        return jsonify({'success': True, 'path': doc, 'restored': version, 'version': entry['version']})
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/api-stats', methods=['GET'])
+def api_stats():
+    """API frequencies, api2/api1 ratios and co-occurrence (PMI) over a save directory."""
+    try:
+        try:
+            top = int(request.args.get('top', '50'))
+            min_count = int(request.args.get('min_count', '2'))
+        except ValueError:
+            return jsonify({'error': 'top and min_count must be integers'}), 400
+        target_dir = _resolve_dir(request.args.get('dir'))
+        with timer('api_stats'):
+            stats = API_STATS.stats(target_dir)
+            api = request.args.get('api')
+            if api:
+                neighbours = stats.neighbours(api, top, max(min_count, 1))
+                if neighbours is None:
+                    return jsonify({'error': f'API not found: {api}'}), 404
+                result = {'api': stats.api_summary(default_vocabulary().lookup(api)), 'pairs': neighbours}
+            else:
+                result = stats.to_dict(top, min_count)
+        return jsonify(dict(result, success=True, dir=_relative_str(target_dir)))
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/near-duplicates', methods=['GET'])
+def near_duplicates():
+    """Near-duplicate proofs or steps (MinHash/LSH): clusters, or matches of ``key``."""
+    try:
+        level = request.args.get('level', 'proof')
+        if level not in NEAR_DUP_LEVELS:
+            return jsonify({'error': f'level must be one of {", ".join(NEAR_DUP_LEVELS)}'}), 400
+        try:
+            threshold = float(request.args.get('threshold', '0.8'))
+        except ValueError:
+            return jsonify({'error': 'threshold must be a number'}), 400
+        target_dir = _resolve_dir(request.args.get('dir'))
+        index = NEAR_DUP_INDEXES.get(target_dir)
+        if index is None:
+            index = NEAR_DUP_INDEXES.setdefault(target_dir, NearDuplicateIndex(target_dir))
+        with timer('near_duplicates'):
+            index.refresh()
+            key = request.args.get('key')
+            if key:
+                matches = index.query(key, level, threshold)
+                if matches is None:
+                    return jsonify({'error': f'Item not found: {key}'}), 404
+                result = {'key': key, 'matches': matches}
+            else:
+                result = {'clusters': index.clusters(level, threshold)}
+        return jsonify(dict(result, success=True, level=level, threshold=threshold,
+                            dir=_relative_str(target_dir)))
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/tree', methods=['GET'])
+def get_tree():
+    """Load a tree editor file; missing or unreadable files yield a fresh empty tree."""
+    try:
+        with timer('file_read'):
+            body = TREE_FILES.load_body(request.args.get('filename'))
+        if body is None:
+            return jsonify(default_tree())
+        return Response(body, mimetype='application/json')
+    except TreeStoreError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/tree', methods=['POST'])
+def save_tree():
+    """Save a tree editor file (``{"tree": ..., "filename": ...}``)."""
+    try:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict) or payload.get('tree') is None:
+            return jsonify({'error': 'Field "tree" is required'}), 400
+        with timer('file_write'):
+            written = TREE_FILES.save(payload.get('filename'), payload['tree'])
+        return jsonify({'success': True, 'written': written})
+    except TreeStoreError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/tree', methods=['DELETE'])
+def delete_tree():
+    try:
+        filename = request.args.get('filename')
+        if not filename:
+            return jsonify({'error': 'No filename'}), 400
+        if not TREE_FILES.delete(filename):
+            return jsonify({'error': 'Tree not found'}), 404
+        return jsonify({'success': True})
+    except TreeStoreError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/list-trees', methods=['GET'])
+def list_trees():
+    """Names of the tree editor files (a plain JSON array, as the Next.js route returns)."""
+    try:
+        with timer('file_list'):
+            return jsonify(TREE_FILES.list())
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/tree-sync', methods=['GET'])
+def tree_sync_read():
+    """Return a stored tree document together with its sync version."""
+    try:
+        path_param = request.args.get('path')
+        if not path_param:
+            return jsonify({'error': 'path is required'}), 400
+        p = _resolve_file(path_param)
+        if not p.is_file():
+            return jsonify({'error': 'file not found'}), 404
+        version, tree = TREE_SYNC.read(p)
+        return jsonify({'success': True, 'path': _relative_str(p), 'version': version, 'tree': tree})
+    except TreeSyncError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/tree-sync', methods=['POST'])
+def tree_sync_apply():
+    """Apply a node-level change set on top of a known document version."""
+    try:
+        payload = request.get_json()
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'Invalid JSON payload'}), 400
+        path_param = payload.get('path')
+        if not isinstance(path_param, str) or not path_param:
+            return jsonify({'error': 'Field "path" (string) is required'}), 400
+        p = _resolve_file(path_param)
+        if not p.is_file():
+            return jsonify({'error': 'file not found'}), 404
+        base_version = payload.get('base_version')
+        changes = payload.get('changes')
+        doc = _relative_str(p)
+
+        def publish(version):
+            # Runs under the document lock, so subscribers get deltas in version order.
+            COLLAB.publish(doc, base_version, version, changes, payload.get('client_id'))
+
+        version = TREE_SYNC.apply(p, base_version, changes, on_applied=publish)
+        return jsonify({'success': True, 'path': doc, 'version': version})
+    except TreeSyncConflict as exc:
+        return jsonify({'error': str(exc), 'conflict': True, 'version': exc.current_version}), 409
+    except TreeSyncError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/collab/stream', methods=['GET'])
+def collab_stream():
+    """Server-Sent Events stream of node-level changes for one tree document."""
+    path_param = request.args.get('path')
+    if not path_param:
+        return jsonify({'error': 'path is required'}), 400
+    p = _resolve_file(path_param)
+    if not p.is_file():
+        return jsonify({'error': 'file not found'}), 404
+
+    subscription = COLLAB.subscribe(_relative_str(p), request.args.get('client_id'))
+    return Response(
+        COLLAB.stream(subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+def _job_input_paths(params, default_pattern):
+    """Collect input files for a job from ``files`` and/or ``dir`` + ``pattern``."""
+    files = params.get('files') or []
+    if not isinstance(files, list):
+        raise JobError('"files" must be a list of paths')
+    paths = [_resolve_file(str(f)) for f in files]
+    directory = params.get('dir')
+    if directory:
+        paths.extend(sorted(
+            p for p in _resolve_file(str(directory)).glob(params.get('pattern') or default_pattern)
+            if p.is_file()
+        ))
+    return paths
+
+
+def _job_extract_apis(job, params):
+    """Bulk ``extract_apis_from_code`` over Lean files and/or inline code snippets."""
+    paths = _job_input_paths(params, '*.lean')
+    codes = params.get('codes') or []
+    total = len(paths) + len(codes)
+    _refresh_lean_filter()
+    per_source = {}
+    union = set()
+    for i, p in enumerate(paths):
+        job.check_cancelled()
+        with timer('extract_apis_from_code'):
+            apis = LEAN_FILES.extract_file(p)['apis']
+        per_source[_relative_str(p)] = apis
+        union.update(apis)
+        job.set_progress(i + 1, total, p.name)
+    for i, code in enumerate(codes):
+        job.check_cancelled()
+        with timer('extract_apis_from_code'):
+            apis = LEAN_FILES.extract_code(str(code))['apis']
+        per_source[f'code[{i}]'] = apis
+        union.update(apis)
+        job.set_progress(len(paths) + i + 1, total)
+    return {'sources': per_source, 'apis': sorted(union), 'count': len(union)}
+
+
+def _job_md_to_json(job, params):
+    """Convert Markdown proofs to JSON, optionally saving each next to the others."""
+    paths = _job_input_paths(params, '*.md')
+    save = bool(params.get('save', False))
+    converted = []
+    failures = []
+    for i, p in enumerate(paths):
+        job.check_cancelled()
+        source = _relative_str(p)
+        try:
+            with timer('markdown_to_json'):
+                proof = markdown_to_json(_read_text(p))
+            errors = validate_proof_json(proof)
+            if errors:
+                raise MarkdownParseError('; '.join(errors))
+            entry = {'source': source}
+            if save:
+                saved, version = _save_with_history(
+                    save_json_content, proof, BASE_DIR, f'{p.stem}.json',
+                    params.get('target_dir'), overwrite=bool(params.get('overwrite', False)),
+                )
+                entry['path'] = _relative_str(saved)
+                entry['version'] = version
+            else:
+                entry['proof'] = proof
+            converted.append(entry)
+        except (MarkdownParseError, OSError, UnicodeDecodeError, CsvStorageError, SnapshotError) as exc:
+            failures.append({'source': source, 'error': str(exc)})
+        job.set_progress(i + 1, len(paths), p.name)
+    return {'converted': converted, 'failures': failures}
+
+
+def _job_merge_csv(job, params):
+    """Concatenate exported CSVs with identical headers into one file."""
+    paths = _job_input_paths(params, '*.csv')
+    if not paths:
+        raise JobError('No CSV files to merge')
+    dedupe = bool(params.get('dedupe', True))
+    header = None
+    rows = []
+    seen = set()
+    duplicates = 0
+    for i, p in enumerate(paths):
+        job.check_cancelled()
+        with PATH_LOCKS.read(p), open(p, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            file_header = next(reader, None)
+            if file_header is None:
+                continue
+            if header is None:
+                header = file_header
+            elif file_header != header:
+                raise JobError(f'Header of {p.name} does not match {paths[0].name}')
+            for row in reader:
+                key = tuple(row)
+                if dedupe and key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                rows.append(row)
+        job.set_progress(i + 1, len(paths), p.name)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(header or [])
+    writer.writerows(rows)
+    saved, version = _save_with_history(
+        save_csv_content, buffer.getvalue(), BASE_DIR,
+        filename=params.get('filename') or 'merged.csv',
+        requested_directory=params.get('target_dir'),
+        overwrite=bool(params.get('overwrite', False)),
+    )
+    return {
+        'path': _relative_str(saved),
+        'version': version,
+        'rows': len(rows),
+        'sources': [_relative_str(p) for p in paths],
+        'duplicates_removed': duplicates,
+    }
+
+
+def _job_export_columnar(job, params):
+    """Write the rows of several CSV exports to one memory-mappable ``.bmcol`` file."""
+    from columnar import parse_dataset_csv, write_columnar
+
+    paths = _job_input_paths(params, '*.csv')
+    if not paths:
+        raise JobError('No CSV files to export')
+
+    def rows():
+        for i, p in enumerate(paths):
+            job.check_cancelled()
+            yield from parse_dataset_csv(_read_text(p))
+            job.set_progress(i + 1, len(paths), p.name)
+
+    target_dir = _resolve_dir(params.get('target_dir'))
+    name = Path(params.get('filename') or 'dataset.bmcol').name
+    if not name.endswith('.bmcol'):
+        name += '.bmcol'
+    target = target_dir / name
+    stats = write_columnar(rows(), target)
+    return dict(stats, path=_relative_str(target))
+
+
+JOBS.register('extract_apis', _job_extract_apis)
+JOBS.register('md_to_json', _job_md_to_json)
+JOBS.register('merge_csv', _job_merge_csv)
+JOBS.register('export_columnar', _job_export_columnar)
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a background job: ``{"kind": ..., "params": {...}}``."""
+    try:
+        payload = request.get_json()
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'Invalid JSON payload'}), 400
+        kind = payload.get('kind')
+        if kind not in JOBS.kinds:
+            return jsonify({'error': f'Unknown job kind: {kind}', 'kinds': JOBS.kinds}), 400
+        try:
+            job = JOBS.submit(kind, payload.get('params'))
+        except JobError as exc:
+            return jsonify({'error': str(exc)}), 503
+        return jsonify({'success': True, 'job': job.to_dict()}), 202
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify({'success': True, 'kinds': JOBS.kinds, 'jobs': [job.to_dict() for job in JOBS.list()]})
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    try:
+        return jsonify({'success': True, 'job': JOBS.get(job_id).to_dict()})
+    except JobError as exc:
+        return jsonify({'error': str(exc)}), 404
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    try:
+        job = JOBS.get(job_id)
+    except JobError as exc:
+        return jsonify({'error': str(exc)}), 404
+    try:
+        return jsonify({'success': True, 'job': job.to_dict(), 'result': JOBS.result(job_id)})
+    except JobError as exc:
+        return jsonify({'error': str(exc), 'job': job.to_dict()}), 409
+    except Exception as e:
+        return _internal_error(e)
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    try:
+        return jsonify({'success': True, 'job': JOBS.cancel(job_id).to_dict()})
+    except JobError as exc:
+        return jsonify({'error': str(exc)}), 404
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Stream job progress as Server-Sent Events until the job finishes."""
+    try:
+        JOBS.get(job_id)
+    except JobError as exc:
+        return jsonify({'error': str(exc)}), 404
+
+    def generate():
+        revision = -1
+        while True:
+            job = JOBS.wait_for_change(job_id, revision, timeout=15.0)
+            if job.revision == revision:
+                yield ': keep-alive\n\n'
+                continue
+            revision = job.revision
+            snapshot = job.to_dict()
+            yield sse_event('progress', snapshot)
+            if snapshot['status'] in TERMINAL_STATES:
+                return
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 @app.route('/api/list-lean-files', methods=['GET'])
@@ -483,7 +997,7 @@ def list_lean_files():
         return jsonify({'files': sorted(files)})
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _internal_error(e)
 
 
 if __name__ == '__main__':
@@ -492,13 +1006,23 @@ if __name__ == '__main__':
     print("=" * 60)
     print(f"📂 Working directory: {BASE_DIR}")
     print(f"🌐 Open browser to: http://localhost:5000")
+    if STATIC_BUNDLE is not None:
+        print(f"📦 Serving bundled frontend ({len(STATIC_BUNDLE.assets)} assets in memory)")
     print("=" * 60)
     print("\nAvailable endpoints:")
     print("  GET  /                      - Main HTML editor")
     print("  POST /api/extract-apis      - Extract APIs from Lean code")
     print("  POST /api/convert-json-to-md - Convert JSON to Markdown")
     print("  GET  /api/list-lean-files   - List available Lean files")
+    print("  GET  /api/versions          - Saved versions of a document (read, diff, restore)")
+    print("  GET  /api/api-stats         - API frequency and co-occurrence statistics")
+    print("  GET  /api/near-duplicates   - Near-duplicate proofs/steps (MinHash + LSH)")
+    print("  GET/POST/DELETE /api/tree   - Tree editor files (brickmove-next API); GET /api/list-trees lists them")
+    print("  GET/POST /api/tree-sync     - Versioned delta-sync for tree documents")
+    print("  GET  /api/collab/stream     - Live change stream (SSE) for a tree document")
+    print("  POST /api/jobs              - Run a background job (extract_apis, md_to_json, merge_csv, export_columnar)")
+    print("  GET  /metrics               - Prometheus metrics (set BRICKMOVE_PROFILE_SLOW_MS to profile slow requests)")
     print("\nPress Ctrl+C to stop the server")
     print("=" * 60)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
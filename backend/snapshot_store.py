@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Content-addressed, deduplicated version history for saved documents.
+
+Saving with ``overwrite=False`` used to be the only way to keep history, and
+it writes a full copy per save (``proof_tree_1.csv``, ``_2``, ...).
+``SnapshotStore`` keeps every saved version of a logical document instead,
+with storage proportional to what changed:
+
+- Content-defined chunking: a gear rolling hash places chunk boundaries
+  where the content (not the offset) says so, so an edit only changes the
+  chunks around it and the rest of the file maps onto existing chunks.
+- Each unique chunk is stored once, zlib-compressed, under
+  ``objects/<2 hex>/<sha256>``. Chunks are shared across versions and
+  across documents.
+- Each document has an append-only manifest
+  (``manifests/<sha256 of the key>.jsonl``): one line per version with its
+  size, digest and chunk list. Listing versions reads only the manifest;
+  comparing two versions compares chunk lists first and reassembles text
+  only for the line diff.
+
+Saving content identical to the latest version does not add a version.
+
+Usage:
+    python3 snapshot_store.py stats [--root data_save/snapshots]
+    python3 snapshot_store.py log data_save/csv_save/proof.json
+    python3 snapshot_store.py show data_save/csv_save/proof.json 3
+"""
+
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from path_locks import atomic_write_bytes, default_locks
+
+__all__ = ["SnapshotError", "SnapshotStore", "chunk_boundaries"]
+
+# Chunk sizes suit documents of a few KB to a few MB.
+MIN_CHUNK = 512
+AVG_CHUNK_BITS = 11          # ~2 KiB average
+MAX_CHUNK = 16 * 1024
+_MASK32 = 0xFFFFFFFF
+# Test the high bits: with a shift-left gear hash they depend on the last 32 bytes.
+_BOUNDARY_MASK = ((1 << AVG_CHUNK_BITS) - 1) << (32 - AVG_CHUNK_BITS)
+_GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "big") for i in range(256)]
+
+
+class SnapshotError(Exception):
+    """Raised for unknown documents or versions."""
+
+
+def chunk_boundaries(data: bytes) -> Iterator[Tuple[int, int]]:
+    """Yield ``(start, end)`` of each content-defined chunk of ``data``."""
+    gear, mask = _GEAR, _BOUNDARY_MASK
+    n = len(data)
+    start = 0
+    while start < n:
+        end = min(start + MAX_CHUNK, n)
+        if end - start <= MIN_CHUNK:
+            yield start, end
+            return
+        h = 0
+        cut = end
+        for i in range(start + MIN_CHUNK, end):
+            h = ((h << 1) + gear[data[i]]) & _MASK32
+            if not h & mask:
+                cut = i + 1
+                break
+        yield start, cut
+        start = cut
+
+
+class SnapshotStore:
+    """Version history for documents identified by a key (usually the workspace-relative path)."""
+
+    def __init__(self, root: Path, path_locks=None):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.manifests = self.root / "manifests"
+        self._locks = path_locks or default_locks()
+        self._cache: Dict[Path, Tuple[int, int, List[dict]]] = {}
+        self._cache_lock = threading.Lock()
+
+    # -- storage ---------------------------------------------------------
+
+    def _manifest_path(self, doc: str) -> Path:
+        return self.manifests / (hashlib.sha256(doc.encode("utf-8")).hexdigest()[:32] + ".jsonl")
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def _put_chunk(self, chunk: bytes) -> Tuple[str, int]:
+        """Store ``chunk`` unless present; returns ``(digest, compressed bytes written)``."""
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self._object_path(digest)
+        if path.exists():
+            return digest, 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = zlib.compress(chunk, 6)
+        # Concurrent writers of the same chunk write identical bytes; the last replace wins harmlessly.
+        atomic_write_bytes(path, data)
+        return digest, len(data)
+
+    def _get_chunk(self, digest: str) -> bytes:
+        try:
+            return zlib.decompress(self._object_path(digest).read_bytes())
+        except FileNotFoundError:
+            raise SnapshotError(f"Missing chunk {digest}") from None
+
+    def _load_manifest(self, path: Path) -> List[dict]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return []
+        with self._cache_lock:
+            cached = self._cache.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        with self._locks.read(path):
+            versions = self._load_manifest_unlocked(path)
+        with self._cache_lock:
+            self._cache[path] = (stat.st_mtime_ns, stat.st_size, versions)
+        return versions
+
+    @staticmethod
+    def _load_manifest_unlocked(path: Path) -> List[dict]:
+        try:
+            lines = path.read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            return []
+        return [json.loads(line) for line in lines if line.strip()]
+
+    # -- API -------------------------------------------------------------
+
+    def record(self, doc: str, data: bytes, source: str = "save") -> dict:
+        """
+        Add ``data`` as the newest version of ``doc`` and return its entry as
+        in ``versions`` plus ``stored_bytes`` (compressed bytes newly written). Content
+        equal to the latest version returns that version unchanged.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._manifest_path(doc)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locks.write(path):
+            with self._cache_lock:
+                self._cache.pop(path, None)
+            versions = self._load_manifest_unlocked(path)
+            if versions and versions[-1]["sha256"] == digest:
+                return dict(versions[-1], chunks=len(versions[-1]["chunks"]), stored_bytes=0)
+            chunks, stored = [], 0
+            for start, end in chunk_boundaries(data):
+                chunk_digest, written = self._put_chunk(data[start:end])
+                chunks.append([chunk_digest, end - start])
+                stored += written
+            entry = {
+                "doc": doc,
+                "version": versions[-1]["version"] + 1 if versions else 1,
+                "saved_at": time.time(),
+                "size": len(data),
+                "sha256": digest,
+                "source": source,
+                "chunks": chunks,
+            }
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        return dict(entry, chunks=len(chunks), stored_bytes=stored)
+
+    def versions(self, doc: str) -> List[dict]:
+        """Manifest entries of ``doc``, oldest first (without chunk lists)."""
+        return [
+            dict(entry, chunks=len(entry["chunks"]))
+            for entry in self._load_manifest(self._manifest_path(doc))
+        ]
+
+    def _entry(self, doc: str, version: Optional[int]) -> dict:
+        versions = self._load_manifest(self._manifest_path(doc))
+        if not versions:
+            raise SnapshotError(f"No versions recorded for {doc}")
+        if version is None:
+            return versions[-1]
+        for entry in versions:
+            if entry["version"] == version:
+                return entry
+        raise SnapshotError(f"{doc} has no version {version}")
+
+    def read(self, doc: str, version: Optional[int] = None) -> bytes:
+        """Content of ``version`` (default: latest) of ``doc``."""
+        entry = self._entry(doc, version)
+        data = b"".join(self._get_chunk(digest) for digest, _ in entry["chunks"])
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            raise SnapshotError(f"Version {entry['version']} of {doc} is corrupt")
+        return data
+
+    def diff(self, doc: str, old: int, new: int, context: int = 3) -> dict:
+        """Chunk-level change summary and a unified line diff between two versions."""
+        old_entry, new_entry = self._entry(doc, old), self._entry(doc, new)
+        old_chunks = {digest for digest, _ in old_entry["chunks"]}
+        changed = [size for digest, size in new_entry["chunks"] if digest not in old_chunks]
+        result = {
+            "doc": doc,
+            "from": old,
+            "to": new,
+            "identical": old_entry["sha256"] == new_entry["sha256"],
+            "chunks": len(new_entry["chunks"]),
+            "changed_chunks": len(changed),
+            "changed_bytes": sum(changed),
+            "diff": "",
+        }
+        if not result["identical"]:
+            old_text = self.read(doc, old).decode("utf-8", "replace").splitlines(keepends=True)
+            new_text = self.read(doc, new).decode("utf-8", "replace").splitlines(keepends=True)
+            result["diff"] = "".join(difflib.unified_diff(
+                old_text, new_text, f"{doc}@{old}", f"{doc}@{new}", n=context))
+        return result
+
+    def restore(self, doc: str, version: int, target: Path) -> dict:
+        """Write ``version`` of ``doc`` back to ``target`` and record it as a new version."""
+        data = self.read(doc, version)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with self._locks.write(target):
+            atomic_write_bytes(target, data)
+        return self.record(doc, data, source=f"restore:{version}")
+
+    def stats(self) -> dict:
+        """Documents, versions, logical bytes (sum of version sizes) and bytes stored on disk."""
+        documents = versions = logical = 0
+        for path in self.manifests.glob("*.jsonl") if self.manifests.is_dir() else ():
+            entries = self._load_manifest(path)
+            documents += 1
+            versions += len(entries)
+            logical += sum(entry["size"] for entry in entries)
+        chunks = stored = 0
+        for path in self.objects.glob("*/*") if self.objects.is_dir() else ():
+            chunks += 1
+            stored += path.stat().st_size
+        return {"documents": documents, "versions": versions, "logical_bytes": logical,
+                "chunks": chunks, "stored_bytes": stored}
+
+
+def main() -> int:
+    import argparse
+    import sys
+
+    default_root = Path(__file__).resolve().parent.parent / "data_save" / "snapshots"
+    parser = argparse.ArgumentParser(description="Inspect the document version store")
+    parser.add_argument("--root", default=str(default_root), help="Store directory (default: data_save/snapshots)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Storage totals")
+    log = sub.add_parser("log", help="List the versions of a document")
+    log.add_argument("doc")
+    show = sub.add_parser("show", help="Print one version of a document")
+    show.add_argument("doc")
+    show.add_argument("version", type=int, nargs="?")
+    args = parser.parse_args()
+
+    store = SnapshotStore(Path(args.root))
+    try:
+        if args.command == "stats":
+            print(json.dumps(store.stats(), indent=2))
+        elif args.command == "log":
+            for entry in store.versions(args.doc):
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["saved_at"]))
+                print(f"{entry['version']:>4}  {stamp}  {entry['size']:>9,d} B  {entry['chunks']:>4} chunks  {entry['source']}")
+        else:
+            sys.stdout.buffer.write(store.read(args.doc, args.version))
+    except SnapshotError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
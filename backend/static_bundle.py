@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Fingerprinted, in-memory static asset bundle for the frontend.
+
+Each HTML page under ``frontend/`` loads one ES module entry point
+(``main.js``, ``tree/main.js``) that imports dozens of further modules, so a
+cold page load costs one request per module. ``StaticBundle.build``:
+
+- follows the static ``import`` graph of every entry point and concatenates
+  the modules into one ES module, each wrapped in a factory that is run once
+  in dependency order (remote ``https://`` imports stay real imports at the
+  top of the bundle);
+- minifies JavaScript and CSS conservatively (comments and indentation are
+  removed; strings, template literals and regular expressions are kept
+  verbatim and line breaks are preserved, so semicolon insertion is
+  unaffected);
+- names every asset after its content hash (``/_bundle/main.3f9c2a1b0d.js``),
+  keeps it in memory together with a gzipped copy, and serves it with
+  ``Cache-Control: immutable``;
+- rewrites the HTML pages to reference the hashed names. Pages themselves are
+  served with an ``ETag`` and must be revalidated.
+
+The supported module syntax is what the frontend uses: named, default and
+namespace imports, ``export function/async function/class/const/let/var``
+and ``export { a, b as c }``. Anything else makes ``build`` raise
+``BundleError`` so the server can fall back to serving the raw files.
+
+Usage:
+    BRICKMOVE_STATIC_BUNDLE=1 python3 server.py
+    python3 static_bundle.py ../frontend            # build and print a summary
+    python3 static_bundle.py ../frontend -o dist/   # also write the assets to disk
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import posixpath
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ["Asset", "BundleError", "StaticBundle", "bundle_modules", "minify_css", "minify_js"]
+
+BUNDLE_PREFIX = "_bundle/"
+
+
+class BundleError(ValueError):
+    """Raised when the frontend cannot be bundled safely."""
+
+
+# -- minification ------------------------------------------------------------
+
+_JS_TOKEN = re.compile(r"""
+    (?P<nl>[ \t]*(?:\r?\n[ \t]*)+)
+  | (?P<ws>[ \t]+)
+  | (?P<line_comment>//[^\n]*)
+  | (?P<block_comment>/\*.*?\*/)
+  | (?P<string>'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*")
+  | (?P<word>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<punct>.)
+""", re.VERBOSE | re.DOTALL)
+# After these a ``/`` starts a regular expression rather than a division.
+_REGEX_AFTER_PUNCT = set("(,=:[!&|?{};+-*%~^<>")
+_REGEX_AFTER_WORD = {
+    "return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+    "yield", "await", "instanceof",
+}
+_NEWLINE_NOT_NEEDED_AFTER = set("{;,([")
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch in "_$"
+
+
+def _scan_regex(source: str, pos: int) -> int:
+    """End of the regular expression literal starting at ``source[pos] == '/'``."""
+    i, in_class = pos + 1, False
+    while i < len(source):
+        ch = source[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "\n":
+            break
+        if in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "/":
+            i += 1
+            while i < len(source) and _is_word_char(source[i]):
+                i += 1
+            return i
+        i += 1
+    raise BundleError(f"Unterminated regular expression at offset {pos}")
+
+
+def _scan_template(source: str, pos: int) -> Tuple[int, bool]:
+    """
+    Scan template text starting at ``pos`` (just after a backtick or ``}``).
+    Returns the end offset and whether it stopped at ``${`` (True) or at the
+    closing backtick (False).
+    """
+    i = pos
+    while i < len(source):
+        ch = source[i]
+        if ch == "\\":
+            i += 2
+        elif ch == "`":
+            return i + 1, False
+        elif ch == "$" and source.startswith("${", i):
+            return i + 2, True
+        else:
+            i += 1
+    raise BundleError(f"Unterminated template literal at offset {pos}")
+
+
+def minify_js(source: str) -> str:
+    """Drop comments and indentation; keep literals verbatim and line breaks where needed."""
+    out: List[str] = []
+    last = ""            # last character emitted
+    last_token = ""      # last significant token (for regex detection)
+    pending_space = pending_newline = False
+    templates: List[int] = []    # brace depth at each open ``${``
+    depth = 0
+    pos = 0
+
+    def emit(text: str, token: str) -> None:
+        nonlocal last, last_token, pending_space, pending_newline
+        if pending_newline and out and last not in _NEWLINE_NOT_NEEDED_AFTER:
+            out.append("\n")
+        elif pending_space and (
+            _is_word_char(last) and _is_word_char(text[0])
+            or last in "+-/" and text[0] in "+-/*"
+            or last_token == "number" and text[0] == "."
+        ):
+            out.append(" ")
+        pending_space = pending_newline = False
+        out.append(text)
+        last = text[-1]
+        last_token = token
+
+    while pos < len(source):
+        match = _JS_TOKEN.match(source, pos)
+        kind, text = match.lastgroup, match.group()
+        if kind == "nl":
+            pending_newline = True
+            pos = match.end()
+        elif kind == "ws":
+            pending_space = True
+            pos = match.end()
+        elif kind == "line_comment":
+            pos = match.end()
+        elif kind == "block_comment":
+            pending_space = True
+            pos = match.end()
+        elif kind == "punct" and text == "`":
+            end, opened = _scan_template(source, pos + 1)
+            emit(source[pos:end], "`")
+            if opened:
+                templates.append(depth)
+            pos = end
+        elif kind == "punct" and text == "}" and templates and templates[-1] == depth:
+            templates.pop()
+            end, opened = _scan_template(source, pos + 1)
+            emit(source[pos:end], "`")
+            if opened:
+                templates.append(depth)
+            pos = end
+        elif kind == "punct" and text == "/" and (
+            not last_token or last_token in _REGEX_AFTER_PUNCT or last_token in _REGEX_AFTER_WORD
+        ):
+            end = _scan_regex(source, pos)
+            emit(source[pos:end], "regex")
+            pos = end
+        else:
+            if kind == "punct":
+                if text == "{":
+                    depth += 1
+                elif text == "}":
+                    depth -= 1
+            emit(text, text if kind in ("punct", "word") else kind)
+            pos = match.end()
+    if templates:
+        raise BundleError("Unbalanced template literal")
+    return "".join(out) + "\n"
+
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+
+
+def minify_css(source: str) -> str:
+    """Drop comments, indentation and blank lines from a stylesheet."""
+    lines = (line.strip() for line in _CSS_COMMENT.sub("", source).splitlines())
+    out: List[str] = []
+    for line in lines:
+        if not line:
+            continue
+        if out and out[-1][-1] in "{;}":
+            out[-1] += line
+        else:
+            out.append(line)
+    return "\n".join(out) + "\n"
+
+
+# -- module bundling ---------------------------------------------------------
+
+_IMPORT = re.compile(
+    r"^import\s+(?:(?P<clause>[\w$*{][^;]*?)\s+from\s+)?(?P<quote>['\"])(?P<spec>[^'\"]+)(?P=quote)\s*;?",
+    re.MULTILINE | re.DOTALL,
+)
+_EXPORT_DECLARATION = re.compile(
+    r"^export\s+(?P<keyword>async\s+function\s*\*?|function\s*\*?|class|const|let|var)\s+(?P<name>[\w$]+)",
+    re.MULTILINE,
+)
+_EXPORT_LIST = re.compile(r"^export\s*\{(?P<names>[^}]*)\}\s*;?", re.MULTILINE)
+_LEFTOVER = re.compile(r"^(?:import\s*[\w$*{'\"]|export\b)", re.MULTILINE)
+
+
+def _parse_bindings(text: str) -> List[Tuple[str, str]]:
+    """``a, b as c`` → ``[("a", "a"), ("b", "c")]``."""
+    pairs = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, alias = part.partition(" as ")
+        pairs.append((name.strip(), (alias or name).strip()))
+    return pairs
+
+
+def _import_statement(clause: Optional[str], source: str, bound: List[str]) -> str:
+    """The ``const`` binding(s) replacing one ``import ... from`` clause; appends local names to ``bound``."""
+    if not clause:
+        return f"{source};"
+    clause = " ".join(clause.split())
+    statements = []
+    default, _, rest = clause.partition(",") if not clause.startswith(("{", "*")) else ("", "", clause)
+    if default:
+        bound.append(default.strip())
+        statements.append(f"const {default.strip()} = {source}.default;")
+    rest = rest.strip()
+    if rest.startswith("*"):
+        alias = rest.split(" as ", 1)[1].strip()
+        bound.append(alias)
+        statements.append(f"const {alias} = {source};")
+    elif rest.startswith("{"):
+        pairs = _parse_bindings(rest.strip("{} "))
+        bound.extend(alias for _, alias in pairs)
+        inner = ", ".join(name if name == alias else f"{name}: {alias}" for name, alias in pairs)
+        statements.append(f"const {{ {inner} }} = {source};")
+    elif rest:
+        raise BundleError(f"Unsupported import clause: {clause}")
+    return " ".join(statements)
+
+
+def bundle_modules(entry: Path, root: Path) -> str:
+    """Bundle ``entry`` and everything it imports (relative to ``root``) into one ES module."""
+    root = root.resolve()
+    modules: Dict[str, str] = {}
+    externals: Dict[str, str] = {}
+    visiting: List[str] = []
+
+    def module_id(path: Path) -> str:
+        try:
+            return path.resolve().relative_to(root).as_posix()
+        except ValueError:
+            raise BundleError(f"{path} is outside {root}") from None
+
+    def load(module: str) -> None:
+        if module in modules or module in visiting:
+            return
+        visiting.append(module)
+        path = root / module
+        try:
+            source = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            raise BundleError(f"Missing module {module}") from None
+
+        exports: List[Tuple[str, str]] = []
+        bound: List[str] = []
+
+        def replace_import(match: re.Match) -> str:
+            spec = match.group("spec")
+            if re.match(r"^(?:https?:)?//", spec):
+                name = externals.setdefault(spec, f"__external{len(externals)}")
+                return _import_statement(match.group("clause"), name, bound)
+            if not spec.startswith("."):
+                raise BundleError(f"Bare import {spec!r} in {module} cannot be bundled")
+            dependency = posixpath.normpath(posixpath.join(posixpath.dirname(module), spec))
+            load(dependency)
+            return _import_statement(match.group("clause"), f"__require({json.dumps(dependency)})", bound)
+
+        def replace_declaration(match: re.Match) -> str:
+            exports.append((match.group("name"), match.group("name")))
+            return match.group(0)[len("export"):].lstrip()
+
+        def replace_list(match: re.Match) -> str:
+            exports.extend(_parse_bindings(match.group("names")))
+            return ""
+
+        body = _IMPORT.sub(replace_import, source)
+        duplicates = sorted({name for name in bound if bound.count(name) > 1})
+        if duplicates:
+            raise BundleError(f"{module} imports {', '.join(duplicates)} more than once")
+        body = _EXPORT_DECLARATION.sub(replace_declaration, body)
+        body = _EXPORT_LIST.sub(replace_list, body)
+        leftover = _LEFTOVER.search(body)
+        if leftover:
+            line = body.count("\n", 0, leftover.start()) + 1
+            raise BundleError(f"Unsupported module syntax in {module}, line {line}")
+
+        # Getters give importers live bindings, as real ES module exports do.
+        getters = ", ".join(f"{json.dumps(alias)}: {{ get: () => {name}, enumerable: true }}"
+                            for name, alias in exports)
+        modules[module] = (
+            f"__define({json.dumps(module)}, function (__exports) {{\n"
+            f"Object.defineProperties(__exports, {{ {getters} }});\n"
+            f"{body}\n}});\n"
+        )
+        visiting.pop()
+
+    entry_id = module_id(entry)
+    load(entry_id)
+    header = [f"import * as {name} from {json.dumps(spec)};" for spec, name in externals.items()]
+    header.append(
+        "const __factories = new Map(), __modules = new Map();\n"
+        "function __define(id, factory) { __factories.set(id, factory); }\n"
+        "function __require(id) {\n"
+        "  let exports = __modules.get(id);\n"
+        "  if (!exports) {\n"
+        "    exports = {};\n"
+        "    __modules.set(id, exports);\n"
+        "    __factories.get(id)(exports);\n"
+        "  }\n"
+        "  return exports;\n"
+        "}"
+    )
+    return "\n".join(header) + "\n" + "".join(modules.values()) + f"__require({json.dumps(entry_id)});\n"
+
+
+# -- assets ------------------------------------------------------------------
+
+class Asset:
+    """One in-memory response body, with its gzipped form."""
+
+    __slots__ = ("body", "gzipped", "content_type", "etag", "immutable")
+
+    def __init__(self, body: bytes, content_type: str, immutable: bool):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        self.content_type = content_type
+        self.etag = hashlib.sha256(body).hexdigest()[:20]
+        self.immutable = immutable
+
+
+_MODULE_SCRIPT = re.compile(r'<script\s+type="module"\s+src="(?P<src>[^"]+)"\s*>\s*</script>')
+_STYLESHEET = re.compile(r'<link\s+rel="stylesheet"\s+href="(?P<src>[^"]+)"\s*/?>')
+_REMOTE = re.compile(r"^(?:[a-z]+:)?//")
+
+
+class StaticBundle:
+    """Builds and holds the fingerprinted assets for every HTML page under ``root``."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root).resolve()
+        self.assets: Dict[str, Asset] = {}
+
+    def _add_hashed(self, source_id: str, body: str, extension: str, content_type: str) -> str:
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()[:10]
+        stem = posixpath.splitext(source_id)[0].replace("/", "-")
+        name = f"{BUNDLE_PREFIX}{stem}.{digest}{extension}"
+        self.assets[name] = Asset(data, content_type, immutable=True)
+        return name
+
+    def build(self) -> "StaticBundle":
+        """(Re)build all assets; raises ``BundleError`` if a page cannot be bundled."""
+        self.assets = {}
+        built: Dict[str, str] = {}
+
+        for page in sorted(self.root.rglob("*.html")):
+            page_id = page.relative_to(self.root).as_posix()
+            page_dir = posixpath.dirname(page_id)
+            html = page.read_text(encoding="utf-8")
+
+            def local(src: str) -> Optional[str]:
+                if _REMOTE.match(src) or src.startswith("/"):
+                    return None
+                return posixpath.normpath(posixpath.join(page_dir, src))
+
+            def rewrite_script(match: re.Match) -> str:
+                source_id = local(match.group("src"))
+                if source_id is None:
+                    return match.group(0)
+                if source_id not in built:
+                    code = minify_js(bundle_modules(self.root / source_id, self.root))
+                    built[source_id] = self._add_hashed(source_id, code, ".js", "text/javascript; charset=utf-8")
+                return f'<script type="module" src="/{built[source_id]}"></script>'
+
+            def rewrite_stylesheet(match: re.Match) -> str:
+                source_id = local(match.group("src"))
+                if source_id is None or not (self.root / source_id).is_file():
+                    return match.group(0)
+                if source_id not in built:
+                    css = minify_css((self.root / source_id).read_text(encoding="utf-8"))
+                    built[source_id] = self._add_hashed(source_id, css, ".css", "text/css; charset=utf-8")
+                return f'<link rel="stylesheet" href="/{built[source_id]}" />'
+
+            html = _MODULE_SCRIPT.sub(rewrite_script, html)
+            html = _STYLESHEET.sub(rewrite_stylesheet, html)
+            self.assets[page_id] = Asset(html.encode("utf-8"), "text/html; charset=utf-8", immutable=False)
+        return self
+
+    def get(self, path: str) -> Optional[Asset]:
+        return self.assets.get(path)
+
+    def response(self, path: str, request):
+        """A Flask response for ``path`` if it is a bundled asset, else ``None``."""
+        from flask import Response
+
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        headers = {
+            "ETag": f'"{asset.etag}"',
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "public, max-age=31536000, immutable" if asset.immutable else "no-cache",
+        }
+        if asset.etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        body = asset.body
+        if "gzip" in request.accept_encodings:
+            body = asset.gzipped
+            headers["Content-Encoding"] = "gzip"
+        return Response(body, content_type=asset.content_type, headers=headers)
+
+
+def main() -> int:
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Build the fingerprinted frontend bundle")
+    parser.add_argument("root", nargs="?", default=str(Path(__file__).resolve().parent.parent / "frontend"),
+                        help="Frontend directory (default: ../frontend)")
+    parser.add_argument("-o", "--output", help="Also write the assets (and .gz copies) to this directory")
+    args = parser.parse_args()
+
+    try:
+        bundle = StaticBundle(Path(args.root)).build()
+    except BundleError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    for name, asset in sorted(bundle.assets.items()):
+        print(f"{name:<45} {len(asset.body):>9,d} B  gzip {len(asset.gzipped):>8,d} B")
+        if args.output:
+            target = Path(args.output) / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(asset.body)
+            target.with_name(target.name + ".gz").write_bytes(asset.gzipped)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
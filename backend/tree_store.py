@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Cached storage for the tree editor's JSON files (``/api/tree``, ``/api/list-trees``).
+
+The Next.js routes in ``brickmove-next/src/app/api`` read and re-parse the
+whole file on every load and call ``readdir`` on every listing.
+``TreeStore`` serves the same files from a directory with:
+
+- a bounded LRU cache of parsed trees and their serialized response bodies,
+  validated against the file's ``(mtime_ns, size)`` taken with ``fstat`` on
+  the descriptor that was read, so an unchanged file is never re-read or
+  re-parsed and an externally edited one is picked up on the next load;
+- a directory listing cached against the directory's mtime (creating,
+  deleting or renaming a file changes it) and dropped by this store's own
+  saves and deletes;
+- atomic writes (temporary file + ``os.replace``) under the per-path write
+  lock. Saving a tree identical to the cached file skips the write.
+
+File names are reduced to their base name and must end in ``.json``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from path_locks import atomic_write_text, default_locks
+
+__all__ = ["TreeStore", "TreeStoreError", "default_tree"]
+
+DEFAULT_FILENAME = "default.json"
+
+
+class TreeStoreError(ValueError):
+    """Raised for unusable tree file names."""
+
+
+def default_tree() -> dict:
+    """The empty tree returned for missing files (as in ``createDefaultTree``)."""
+    return {"id": str(uuid.uuid4()), "statement": "", "apis": [], "children": []}
+
+
+class _Entry:
+    __slots__ = ("stamp", "tree", "text", "body")
+
+    def __init__(self, stamp: Tuple[int, int], tree: Any, text: str):
+        self.stamp = stamp
+        self.tree = tree
+        self.text = text            # file content, to detect no-op saves
+        self.body = json.dumps(tree, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class TreeStore:
+    """Tree JSON files in ``directory`` with mtime-validated caches."""
+
+    def __init__(self, directory: Path, path_locks=None, max_entries: int = 256):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self._locks = path_locks or default_locks()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._listing: Optional[Tuple[int, List[str]]] = None
+        self._guard = threading.Lock()
+
+    def path_for(self, filename: Optional[str]) -> Path:
+        name = os.path.basename((filename or DEFAULT_FILENAME).strip())
+        if not name.endswith(".json") or name.startswith("."):
+            raise TreeStoreError(f"Invalid tree file name: {filename!r}")
+        return self.directory / name
+
+    @staticmethod
+    def _stamp(stat: os.stat_result) -> Tuple[int, int]:
+        return stat.st_mtime_ns, stat.st_size
+
+    def _remember(self, name: str, entry: Optional[_Entry]) -> None:
+        with self._guard:
+            if entry is None:
+                self._entries.pop(name, None)
+                return
+            self._entries[name] = entry
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, path: Path) -> Optional[_Entry]:
+        """The cache entry for ``path``, (re)reading it only if it changed; ``None`` if missing or invalid."""
+        try:
+            stamp = self._stamp(path.stat())
+        except FileNotFoundError:
+            self._remember(path.name, None)
+            return None
+        with self._guard:
+            entry = self._entries.get(path.name)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(path.name)
+                return entry
+        with self._locks.read(path):
+            try:
+                with open(path, "r", encoding="utf-8") as handle:
+                    stamp = self._stamp(os.fstat(handle.fileno()))
+                    text = handle.read()
+            except FileNotFoundError:
+                self._remember(path.name, None)
+                return None
+        try:
+            entry = _Entry(stamp, json.loads(text), text)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        self._remember(path.name, entry)
+        return entry
+
+    def load(self, filename: Optional[str]) -> Optional[Any]:
+        """The parsed tree, or ``None`` if the file is missing or not valid JSON."""
+        entry = self._load(self.path_for(filename))
+        return entry.tree if entry is not None else None
+
+    def load_body(self, filename: Optional[str]) -> Optional[bytes]:
+        """Like ``load`` but returns the cached compact JSON response body."""
+        entry = self._load(self.path_for(filename))
+        return entry.body if entry is not None else None
+
+    def save(self, filename: Optional[str], tree: Any) -> bool:
+        """Write ``tree`` (pretty-printed like ``JSON.stringify(tree, null, 2)``); False if unchanged."""
+        path = self.path_for(filename)
+        text = json.dumps(tree, ensure_ascii=False, indent=2)
+        current = self._load(path)
+        if current is not None and current.text == text:
+            return False
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._locks.write(path):
+            atomic_write_text(path, text)
+            stamp = self._stamp(path.stat())
+        self._remember(path.name, _Entry(stamp, tree, text))
+        self._invalidate_listing()
+        return True
+
+    def delete(self, filename: Optional[str]) -> bool:
+        """Remove the file; False if it did not exist."""
+        path = self.path_for(filename)
+        with self._locks.write(path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                return False
+            finally:
+                self._remember(path.name, None)
+        self._invalidate_listing()
+        return True
+
+    def _invalidate_listing(self) -> None:
+        with self._guard:
+            self._listing = None
+
+    def list(self) -> List[str]:
+        """Sorted names of the ``.json`` files in the directory."""
+        try:
+            mtime = self.directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        with self._guard:
+            if self._listing is not None and self._listing[0] == mtime:
+                return list(self._listing[1])
+        names = sorted(
+            entry.name for entry in os.scandir(self.directory)
+            if entry.name.endswith(".json") and not entry.name.startswith(".") and entry.is_file()
+        )
+        with self._guard:
+            self._listing = (mtime, names)
+        return list(names)
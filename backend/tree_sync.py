@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Versioned delta-sync for tree workspace documents.
+
+The tree editor (``frontend/tree``) keeps whole documents of the form
+``{"root": {...}}`` on the client. Instead of re-uploading the full JSON on
+every save, the client sends the version it started from plus a list of
+node-level changes; this module applies them to the stored copy and bumps the
+version, or reports a conflict when another writer got there first.
+
+Supported change operations (applied in order):
+
+``{"op": "update", "id": ..., "fields": {...}}``
+    Patch scalar fields (``name``, ``symbols``, ``problem``, ``description``,
+    ``mathProof``, ``api2``, ``api1``) of an existing node.
+``{"op": "insert", "parent": ..., "index": n, "node": {...}}``
+    Insert a new subtree under ``parent`` at position ``index``.
+``{"op": "remove", "id": ...}``
+    Remove a node (and its subtree).
+``{"op": "move", "id": ..., "parent": ..., "index": n}``
+    Re-parent an existing node.
+``{"op": "reorder", "id": ..., "children": [...]}``
+    Set the exact child order of ``id``; must be a permutation of its children.
+``{"op": "reset", "root": {...}}``
+    Replace the whole tree (used after imports).
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from path_locks import PathLockManager, atomic_write_text, default_locks
+
+__all__ = [
+    "TreeSyncConflict",
+    "TreeSyncError",
+    "TreeSyncStore",
+]
+
+NODE_FIELDS = ("name", "symbols", "problem", "description", "mathProof", "api2", "api1")
+
+
+class TreeSyncError(ValueError):
+    """Raised when a sync request is malformed or cannot be applied."""
+
+
+class TreeSyncConflict(Exception):
+    """Raised when the client's base version is not the stored version."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Version conflict: server is at version {current_version}")
+        self.current_version = current_version
+
+
+class _Document:
+    """A parsed tree document together with its node index."""
+
+    def __init__(self, data: Dict, version: int, mtime_ns: int):
+        self.data = data
+        self.version = version
+        self.mtime_ns = mtime_ns
+        self.index: Dict[str, Tuple[Dict, Optional[Dict]]] = {}
+        self.reindex()
+
+    def reindex(self) -> None:
+        self.index = {}
+        root = self.data.get("root")
+        if isinstance(root, dict):
+            self._index_subtree(root, None)
+
+    def _index_subtree(self, node: Dict, parent: Optional[Dict]) -> None:
+        node_id = node.get("id")
+        if not isinstance(node_id, str) or not node_id:
+            raise TreeSyncError("Every node needs a non-empty string 'id'")
+        if node_id in self.index:
+            raise TreeSyncError(f"Duplicate node id: '{node_id}'")
+        children = node.get("children")
+        if not isinstance(children, list):
+            children = []
+            node["children"] = children
+        self.index[node_id] = (node, parent)
+        for child in children:
+            if not isinstance(child, dict):
+                raise TreeSyncError(f"Children of '{node_id}' must be objects")
+            self._index_subtree(child, node)
+
+    def _unindex_subtree(self, node: Dict) -> None:
+        self.index.pop(node.get("id"), None)
+        for child in node.get("children") or []:
+            self._unindex_subtree(child)
+
+    def lookup(self, node_id: object) -> Tuple[Dict, Optional[Dict]]:
+        if not isinstance(node_id, str) or node_id not in self.index:
+            raise TreeSyncError(f"Unknown node id: '{node_id}'")
+        return self.index[node_id]
+
+    def apply(self, change: Mapping) -> None:
+        if not isinstance(change, Mapping):
+            raise TreeSyncError("Each change must be an object")
+        op = change.get("op")
+
+        if op == "update":
+            node, _ = self.lookup(change.get("id"))
+            fields = change.get("fields")
+            if not isinstance(fields, Mapping):
+                raise TreeSyncError("'update' requires a 'fields' object")
+            for key, value in fields.items():
+                if key not in NODE_FIELDS:
+                    raise TreeSyncError(f"Field '{key}' cannot be updated")
+                node[key] = "" if value is None else str(value)
+        elif op == "insert":
+            parent, _ = self.lookup(change.get("parent"))
+            node = change.get("node")
+            if not isinstance(node, dict):
+                raise TreeSyncError("'insert' requires a 'node' object")
+            node = _normalize_node(node)
+            self._index_subtree(node, parent)
+            _insert_child(parent, node, change.get("index"))
+        elif op == "remove":
+            node, parent = self.lookup(change.get("id"))
+            if parent is None:
+                raise TreeSyncError("The root node cannot be removed")
+            parent["children"] = [c for c in parent["children"] if c is not node]
+            self._unindex_subtree(node)
+        elif op == "move":
+            node, old_parent = self.lookup(change.get("id"))
+            new_parent, _ = self.lookup(change.get("parent"))
+            if old_parent is None:
+                raise TreeSyncError("The root node cannot be moved")
+            ancestor: Optional[Dict] = new_parent
+            while ancestor is not None:
+                if ancestor is node:
+                    raise TreeSyncError("A node cannot be moved into its own subtree")
+                ancestor = self.index[ancestor["id"]][1]
+            old_parent["children"] = [c for c in old_parent["children"] if c is not node]
+            _insert_child(new_parent, node, change.get("index"))
+            self.index[node["id"]] = (node, new_parent)
+        elif op == "reorder":
+            node, _ = self.lookup(change.get("id"))
+            order = change.get("children")
+            if not isinstance(order, list) or not all(isinstance(i, str) for i in order):
+                raise TreeSyncError("'reorder' requires a 'children' list of ids")
+            by_id = {child["id"]: child for child in node["children"]}
+            if set(order) != set(by_id) or len(order) != len(by_id):
+                raise TreeSyncError(f"'reorder' children do not match node '{node['id']}'")
+            node["children"] = [by_id[child_id] for child_id in order]
+        elif op == "reset":
+            root = change.get("root")
+            if not isinstance(root, dict):
+                raise TreeSyncError("'reset' requires a 'root' object")
+            self.data["root"] = _normalize_node(root)
+            self.reindex()
+        else:
+            raise TreeSyncError(f"Unsupported change op: '{op}'")
+
+
+def _normalize_node(node: Mapping) -> Dict:
+    """Copy a client node into the canonical stored shape."""
+    normalized: Dict = {"id": node.get("id")}
+    for key in NODE_FIELDS:
+        value = node.get(key)
+        normalized[key] = "" if value is None else str(value)
+    children = node.get("children")
+    normalized["children"] = [
+        _normalize_node(child) for child in children if isinstance(child, Mapping)
+    ] if isinstance(children, list) else []
+    return normalized
+
+
+def _insert_child(parent: Dict, node: Dict, index: object) -> None:
+    children = parent["children"]
+    if not isinstance(index, int) or isinstance(index, bool):
+        index = len(children)
+    index = max(0, min(index, len(children)))
+    children.insert(index, node)
+
+
+class TreeSyncStore:
+    """
+    Keeps parsed tree documents in memory and applies versioned change sets.
+
+    The version number is persisted in the document itself (top-level
+    ``"version"`` key). Files without it start at version 0. When a file is
+    modified behind the store's back (for example a full overwrite through
+    ``/api/save-json-content``), the cached copy is discarded and the version
+    is bumped so that stale clients receive a conflict.
+
+    File reads and writes also take the shared ``path_locks`` locks, so they
+    are coordinated with ``/api/read-file`` and the save endpoints.
+    """
+
+    def __init__(self, path_locks: Optional[PathLockManager] = None) -> None:
+        self.path_locks = path_locks if path_locks is not None else default_locks()
+        self._documents: Dict[Path, _Document] = {}
+        self._locks: Dict[Path, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, path: Path) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(path)
+            if lock is None:
+                lock = self._locks[path] = threading.Lock()
+            return lock
+
+    def _load(self, path: Path) -> _Document:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            raise TreeSyncError(f"File not found: {path}") from None
+
+        cached = self._documents.get(path)
+        if cached is not None and cached.mtime_ns == stat.st_mtime_ns:
+            return cached
+
+        try:
+            with self.path_locks.read(path):
+                text = path.read_text(encoding="utf-8")
+            data = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise TreeSyncError(f"Stored document is not valid JSON: {exc}") from None
+        if not isinstance(data, dict) or not isinstance(data.get("root"), dict):
+            raise TreeSyncError("Stored document is not a tree (missing 'root')")
+
+        stored_version = data.get("version")
+        version = stored_version if isinstance(stored_version, int) else 0
+        if cached is not None:
+            version = max(version, cached.version + 1)
+        document = _Document(data, version, stat.st_mtime_ns)
+        self._documents[path] = document
+        return document
+
+    def read(self, path: Path) -> Tuple[int, Dict]:
+        """Return ``(version, tree)`` for the document at ``path``."""
+        with self._lock_for(path):
+            document = self._load(path)
+            return document.version, {"root": document.data["root"]}
+
+    def apply(self, path: Path, base_version: int, changes: List[Mapping],
+              on_applied: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Apply ``changes`` on top of ``base_version`` and return the new version.
+
+        ``on_applied(version)`` is called after the write, while the
+        document's lock is still held, so notifications for consecutive
+        versions are issued in version order.
+
+        Raises ``TreeSyncConflict`` if ``base_version`` is stale and
+        ``TreeSyncError`` if a change cannot be applied; in the latter case the
+        stored file is left untouched.
+        """
+        if not isinstance(base_version, int) or isinstance(base_version, bool):
+            raise TreeSyncError("'base_version' must be an integer")
+        if not isinstance(changes, list):
+            raise TreeSyncError("'changes' must be a list")
+
+        with self._lock_for(path):
+            document = self._load(path)
+            if document.version != base_version:
+                raise TreeSyncConflict(document.version)
+            if not changes:
+                return document.version
+
+            try:
+                for change in changes:
+                    document.apply(change)
+            except Exception:
+                # The in-memory copy may be half-applied; force a reload.
+                self._documents.pop(path, None)
+                raise
+
+            document.version += 1
+            document.data["version"] = document.version
+            text = json.dumps(document.data, ensure_ascii=False, indent=2)
+            with self.path_locks.write(path):
+                atomic_write_text(path, text)
+                document.mtime_ns = path.stat().st_mtime_ns
+            if on_applied is not None:
+                on_applied(document.version)
+            return document.version
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Keep derived Markdown/CSV files next to proof JSON files up to date.
+
+The daemon watches proof directories and, whenever ``<name>.json`` changes,
+re-renders ``<name>.md`` (``build_markdown``) and ``<name>.csv`` (the
+three-column API export) next to it:
+
+- File events come from inotify (through ``ctypes``, no extra dependency).
+  Where inotify is unavailable, or with ``--poll``, directories are scanned
+  every ``--interval`` seconds and compared by ``(mtime, size)``.
+- Events are debounced per file: a document is rendered ``--debounce``
+  seconds after its last event (at most ``10 x debounce`` after the first),
+  so an editor's burst of writes, or a temp-file-and-rename save, renders once.
+- Rendering runs on a process pool. A document that changes while it is
+  being rendered is rendered again afterwards, never twice at once.
+- Derived files are written atomically and only when their content changes.
+  JSON files that are not legacy proofs (tree documents, job records, ...)
+  are ignored.
+
+On start-up only documents whose derived files are missing or older than the
+JSON are rendered; there is no full-corpus rebuild.
+
+Usage:
+    python3 watch_daemon.py data_save/csv_save
+    python3 watch_daemon.py proofs/ more_proofs/ -r --formats md --workers 4
+    python3 watch_daemon.py proofs/ --once      # bring stale files up to date and exit
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import select
+import signal
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+__all__ = ["InotifyWatcher", "PollingWatcher", "WatchDaemon", "open_watcher", "render_document"]
+
+FORMATS = ("md", "csv")
+SOURCE_SUFFIX = ".json"
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT = struct.Struct("iIII")
+
+# Watcher events: (kind, path) with kind "changed", "deleted" or "rescan".
+Event = Tuple[str, Optional[Path]]
+
+
+def is_source(path: Path) -> bool:
+    """Proof JSON candidates: ``*.json``, not hidden (temporary files of atomic writes are)."""
+    return path.suffix.lower() == SOURCE_SUFFIX and not path.name.startswith(".")
+
+
+def _directories(roots: Sequence[Path], recursive: bool) -> Iterable[Path]:
+    for root in roots:
+        yield root
+        if recursive:
+            for dirpath, dirnames, _ in os.walk(root):
+                dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+                for name in dirnames:
+                    yield Path(dirpath) / name
+
+
+class InotifyWatcher:
+    """inotify watches on ``roots`` (and new subdirectories when ``recursive``)."""
+
+    def __init__(self, roots: Sequence[Path], recursive: bool = False):
+        import ctypes
+
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.recursive = recursive
+        self._dirs: Dict[int, Path] = {}
+        for directory in _directories(roots, recursive):
+            self._add_watch(directory)
+
+    def _add_watch(self, directory: Path) -> None:
+        import ctypes
+
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Cannot watch {directory}: {os.strerror(errno)}")
+        self._dirs[wd] = directory
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def read(self, timeout: float) -> List[Event]:
+        """Wait up to ``timeout`` seconds and return the pending events."""
+        ready, _, _ = select.select([self._fd], [], [], max(timeout, 0))
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events: List[Event] = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                events.append(("rescan", None))
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._dirs[wd]
+                continue
+            path = directory / os.fsdecode(name) if name else directory
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self.recursive and not path.name.startswith("."):
+                    # Files may land in the new directory before the watch exists: rescan it.
+                    try:
+                        for sub in _directories([path], True):
+                            self._add_watch(sub)
+                    except OSError:
+                        pass  # already removed again
+                    events.append(("rescan", path))
+                continue
+            if not is_source(path):
+                continue
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                events.append(("changed", path))
+            elif mask & (IN_MOVED_FROM | IN_DELETE):
+                events.append(("deleted", path))
+        return events
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """Fallback watcher: rescans the directories every ``interval`` seconds."""
+
+    def __init__(self, roots: Sequence[Path], recursive: bool = False, interval: float = 1.0):
+        self.roots = list(roots)
+        self.recursive = recursive
+        self.interval = interval
+        self._next_scan = time.monotonic() + interval
+        self._state = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        state = {}
+        for directory in _directories(self.roots, self.recursive):
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                path = Path(entry.path)
+                if not is_source(path):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def fileno(self) -> int:
+        return -1
+
+    def read(self, timeout: float) -> List[Event]:
+        delay = self._next_scan - time.monotonic()
+        if delay > timeout:
+            time.sleep(max(timeout, 0))
+            return []
+        time.sleep(max(delay, 0))
+        self._next_scan = time.monotonic() + self.interval
+        previous, self._state = self._state, self._scan()
+        events: List[Event] = [("changed", path) for path, key in self._state.items() if previous.get(path) != key]
+        events.extend(("deleted", path) for path in previous.keys() - self._state.keys())
+        return events
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(roots: Sequence[Path], recursive: bool = False, poll: bool = False, interval: float = 1.0):
+    """An ``InotifyWatcher`` if possible (and not ``poll``), else a ``PollingWatcher``."""
+    if not poll:
+        try:
+            return InotifyWatcher(roots, recursive)
+        except (OSError, AttributeError) as exc:
+            print(f"watch_daemon: inotify unavailable ({exc}); polling every {interval}s", file=sys.stderr)
+    return PollingWatcher(roots, recursive, interval)
+
+
+def derived_paths(source: Path, formats: Sequence[str]) -> List[Path]:
+    return [source.with_suffix(f".{fmt}") for fmt in formats]
+
+
+def render_document(source: str, formats: Sequence[str] = FORMATS) -> Tuple[str, List[str], Optional[str]]:
+    """
+    Worker: render the derived files of ``source``. Returns
+    ``(source, written paths, error)``; ``error`` starting with ``skipped:``
+    means the JSON is not a legacy proof.
+    """
+    from columnar import rows_to_csv
+    from path_locks import atomic_write_text
+    from proof_markdown import build_csv_rows, build_markdown, validate_proof_json
+
+    path = Path(source)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return source, [], "skipped: removed"
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
+        return source, [], f"invalid JSON: {exc}"
+    if not isinstance(data, dict) or "root" in data or validate_proof_json(data):
+        return source, [], "skipped: not a proof JSON"
+
+    renderers = {"md": build_markdown, "csv": lambda proof: rows_to_csv(build_csv_rows(proof))}
+    written = []
+    try:
+        for fmt, target in zip(formats, derived_paths(path, formats)):
+            text = renderers[fmt](data)
+            try:
+                if target.read_text(encoding="utf-8") == text:
+                    continue
+            except (FileNotFoundError, UnicodeDecodeError):
+                pass
+            atomic_write_text(target, text)
+            written.append(str(target))
+    except OSError as exc:
+        return source, written, str(exc)
+    return source, written, None
+
+
+def _ignore_signals() -> None:
+    """
+    Pool initializer: workers ignore SIGINT/SIGTERM (inherited from the
+    daemon as ``KeyboardInterrupt``), so Ctrl-C or a stop request never kills a
+    worker mid-write or breaks the pool; the daemon shuts the pool down.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+class WatchDaemon:
+    """Debounces watcher events and renders changed documents on a process pool."""
+
+    def __init__(
+        self,
+        roots: Sequence[Path],
+        formats: Sequence[str] = FORMATS,
+        workers: Optional[int] = None,
+        debounce: float = 0.3,
+        recursive: bool = False,
+        poll: bool = False,
+        interval: float = 1.0,
+        verbose: bool = False,
+    ):
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown formats: {', '.join(sorted(unknown))}")
+        self.roots = [Path(root) for root in roots]
+        self.formats = tuple(formats)
+        self.workers = workers
+        self.debounce = debounce
+        self.max_delay = 10 * debounce
+        self.recursive = recursive
+        self.poll = poll
+        self.interval = interval
+        self.verbose = verbose
+        self._pending: Dict[Path, Tuple[float, float]] = {}   # path -> (first event, due)
+        self._running: Dict[Path, object] = {}                # path -> Future
+        self._rerun: Set[Path] = set()
+        self.rendered = 0
+        self.failed = 0
+
+    def stale_sources(self) -> List[Path]:
+        """JSON files whose derived files are missing or older than the JSON."""
+        stale = []
+        for directory in _directories(self.roots, self.recursive):
+            for path in sorted(directory.glob(f"*{SOURCE_SUFFIX}")):
+                if not is_source(path):
+                    continue
+                try:
+                    mtime = path.stat().st_mtime_ns
+                    if all(target.stat().st_mtime_ns >= mtime for target in derived_paths(path, self.formats)):
+                        continue
+                except FileNotFoundError:
+                    pass
+                stale.append(path)
+        return stale
+
+    def _schedule(self, path: Path, now: float, delay: Optional[float] = None) -> None:
+        first, _ = self._pending.get(path, (now, 0.0))
+        due = min(now + (self.debounce if delay is None else delay), first + self.max_delay)
+        self._pending[path] = (first, due)
+
+    def _submit_due(self, executor, now: float) -> None:
+        for path, (_, due) in list(self._pending.items()):
+            if due > now:
+                continue
+            if path in self._running:
+                self._rerun.add(path)
+            else:
+                self._running[path] = executor.submit(render_document, str(path), self.formats)
+            del self._pending[path]
+
+    def _collect(self, now: float) -> None:
+        for path, future in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[path]
+            self._report(future)
+            if path in self._rerun:
+                self._rerun.discard(path)
+                self._schedule(path, now, delay=0)
+
+    def _report(self, future) -> None:
+        try:
+            source, written, error = future.result()
+        except Exception as exc:  # worker crashed
+            self.failed += 1
+            print(f"  ❌ {exc!r}", file=sys.stderr, flush=True)
+            return
+        if error is None:
+            self.rendered += 1
+            if written:
+                names = ", ".join(Path(target).name for target in written)
+                print(f"  ✅ {source} → {names}", flush=True)
+            elif self.verbose:
+                print(f"  = {source} (unchanged)", flush=True)
+        elif error.startswith("skipped:"):
+            if self.verbose:
+                print(f"  - {source}: {error}", flush=True)
+        else:
+            self.failed += 1
+            print(f"  ❌ {source}: {error}", file=sys.stderr, flush=True)
+
+    def _next_timeout(self, now: float) -> float:
+        timeouts = [due - now for _, due in self._pending.values()]
+        if self._running:
+            timeouts.append(0.05)
+        return max(0.0, min(timeouts, default=1.0))
+
+    def run(self, once: bool = False, stop=None) -> None:
+        """
+        Render stale documents, then (unless ``once``) follow changes until
+        ``stop`` (a ``threading.Event``) is set or the process is interrupted.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        watcher = None if once else open_watcher(self.roots, self.recursive, self.poll, self.interval)
+        executor = None
+        try:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_ignore_signals)
+            now = time.monotonic()
+            for path in self.stale_sources():
+                self._schedule(path, now, delay=0)
+            while watcher is not None or self._pending or self._running:
+                if stop is not None and stop.is_set():
+                    break
+                now = time.monotonic()
+                self._submit_due(executor, now)
+                self._collect(now)
+                timeout = self._next_timeout(now)
+                if watcher is None:
+                    time.sleep(timeout)
+                    continue
+                for kind, path in watcher.read(timeout):
+                    now = time.monotonic()
+                    if kind == "changed":
+                        self._schedule(path, now)
+                    elif kind == "deleted":
+                        self._pending.pop(path, None)
+                    else:
+                        # Queue overflow or a new directory: fall back to comparing mtimes.
+                        for stale in self.stale_sources():
+                            self._schedule(stale, now)
+        finally:
+            if executor is not None:
+                # Renders already running finish (their writes are atomic); queued ones are dropped.
+                executor.shutdown(wait=True, cancel_futures=True)
+            if watcher is not None:
+                watcher.close()
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Regenerate Markdown/CSV files when proof JSON files change")
+    parser.add_argument("dirs", nargs="+", help="Directories with proof JSON files")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Also watch subdirectories")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Derived formats to write (default: md,csv)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--debounce", type=float, default=0.3, help="Seconds of quiet before rendering (default: 0.3)")
+    parser.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    parser.add_argument("--interval", type=float, default=1.0, help="Polling interval in seconds (default: 1)")
+    parser.add_argument("--once", action="store_true", help="Only update stale derived files, then exit")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Also report unchanged and skipped files")
+    args = parser.parse_args()
+
+    roots = [Path(d) for d in args.dirs]
+    for root in roots:
+        if not root.is_dir():
+            print(f"Error: Directory '{root}' not found", file=sys.stderr)
+            sys.exit(1)
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    try:
+        daemon = WatchDaemon(roots, formats, args.workers, args.debounce, args.recursive,
+                             args.poll, args.interval, args.verbose)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    if not args.once:
+        print(f"👀 Watching {', '.join(map(str, roots))} ({', '.join(formats)})", flush=True)
+    try:
+        daemon.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+    print(f"Rendered {daemon.rendered} document(s), {daemon.failed} failure(s)", file=sys.stderr)
+    sys.exit(1 if args.once and daemon.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic corpus for the benchmark suite.
+
+Every generator takes an explicit ``seed`` so that two runs on the same
+machine time exactly the same inputs.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+NAMESPACES = [
+    "Ideal", "Ideal.IsPrime", "Polynomial", "MvPolynomial", "PrimeSpectrum",
+    "IsLocalRing", "Submodule", "RingHom", "Finset", "Module.Flat",
+    "IsNoetherianRing", "Algebra", "LinearMap", "Localization",
+]
+LEMMA_STEMS = [
+    "comap", "map_mul", "mem_span", "eq_top_iff", "le_radical", "isPrime_iff",
+    "ext_iff", "mul_comm", "add_le_add", "sum_le_sum", "card_le_card",
+    "exists_maximal", "quotient_mk_eq", "injective_iff", "surjective_of",
+]
+TACTICS = ["intro", "apply", "exact", "rw", "simp", "refine", "obtain", "have", "use"]
+
+
+def _api_name(rng: random.Random) -> str:
+    return f"{rng.choice(NAMESPACES)}.{rng.choice(LEMMA_STEMS)}"
+
+
+def lean_source(declarations: int, seed: int = 0) -> str:
+    """Return Lean code with ``declarations`` theorems inside a namespace."""
+    rng = random.Random(seed)
+    lines: List[str] = ["import Mathlib", "", "open Ideal Polynomial", "", "namespace Bench", ""]
+    for d in range(declarations):
+        lines.append(f"/-- Helper lemma number {d}; note that this is synthetic. -/")
+        lines.append(f"theorem bench_lemma_{d} (R : Type*) [CommRing R] (I : Ideal R) (hx_{d} : I.IsPrime) :")
+        lines.append(f"    {_api_name(rng)} I = {_api_name(rng)} I := by")
+        for _ in range(rng.randint(3, 8)):
+            tactic = rng.choice(TACTICS)
+            if tactic in ("have", "obtain"):
+                lines.append(f"  {tactic} h_{rng.randint(0, 99)} := {_api_name(rng)} hx_{d}")
+            elif tactic == "intro":
+                lines.append(f"  intro x_{rng.randint(0, 9)}")
+            else:
+                lines.append(f"  {tactic} {_api_name(rng)}.mp")
+        lines.append(f"  -- uses custom_lemma_{rng.randint(0, 50)} and {_api_name(rng)}")
+        lines.append("")
+    lines.append("end Bench")
+    return "\n".join(lines) + "\n"
+
+
+def proof_json(steps: int, substeps: int, seed: int = 0) -> Dict:
+    """Return a legacy proof JSON with ``steps`` steps of ``substeps`` substeps each."""
+    rng = random.Random(seed)
+    payload: Dict = {
+        "theorem_id": f"bench-{steps}x{substeps}",
+        "statement": "设 $R$ 为诺特环，$I \\subseteq R$ 为理想。则 $\\sqrt{I}$ 是有限个素理想的交。",
+        "steps": [],
+    }
+    for s in range(steps):
+        step: Dict = {
+            "title": f"步骤 {s + 1}",
+            "description": f"考虑 $x_{{{s}}} \\in I$，由 {_api_name(rng)} 可得结论。\n第二行说明。",
+        }
+        if substeps:
+            step["substeps"] = [
+                {
+                    "description": f"子步骤 {s + 1}.{t + 1}: 应用引理 $f(x) = x^{t}$。",
+                    "api2": [_api_name(rng) for _ in range(rng.randint(1, 3))],
+                    "api1": [_api_name(rng) for _ in range(rng.randint(0, 2))],
+                }
+                for t in range(substeps)
+            ]
+        else:
+            step["apis"] = [_api_name(rng) for _ in range(rng.randint(1, 4))]
+        payload["steps"].append(step)
+    return payload
+
+
+def deep_tree(depth: int, fanout: int, seed: int = 0) -> Dict:
+    """Return a tree-workspace document (``{"root": ...}``) of the given shape."""
+    rng = random.Random(seed)
+    counter = 0
+
+    def build(level: int) -> Dict:
+        nonlocal counter
+        counter += 1
+        node = {
+            "id": f"node-{counter}",
+            "name": f"节点 {counter}",
+            "symbols": "R, I" if level == 0 else "",
+            "problem": "证明 $I$ 是素理想。" if level < 2 else "",
+            "description": f"第 {level} 层的步骤描述 {counter}。",
+            "mathProof": "",
+            "api2": ", ".join(_api_name(rng) for _ in range(rng.randint(0, 2))),
+            "api1": ", ".join(_api_name(rng) for _ in range(rng.randint(0, 2))),
+            "children": [],
+        }
+        if level < depth:
+            node["children"] = [build(level + 1) for _ in range(fanout)]
+        return node
+
+    return {"root": build(0)}
+
+
+def csv_export(rows: int, seed: int = 0) -> str:
+    """Return a three-column export as produced by the tree workspace."""
+    rng = random.Random(seed)
+    out = ["informal statement,score 2 api,score 1 api"]
+    for r in range(rows):
+        api2 = "\n".join(f"`{_api_name(rng)}`" for _ in range(rng.randint(1, 3)))
+        api1 = "\n".join(f"`{_api_name(rng)}`" for _ in range(rng.randint(0, 2)))
+        out.append(f'"符号设定: R, I | 步骤: 第 {r} 步, 使用引理",' f'"{api2}","{api1}"')
+    return "\n".join(out)
+
+
+def populate_export_dir(directory: Path, files: int, seed: int = 0) -> Path:
+    """Fill ``directory`` with a mix of exported JSON/Markdown/CSV files."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(files):
+        kind = i % 3
+        if kind == 0:
+            (directory / f"proof_{i}.json").write_text(
+                json.dumps(proof_json(3, 2, seed + i), ensure_ascii=False), encoding="utf-8")
+        elif kind == 1:
+            (directory / f"proof_{i}.md").write_text(f"### 定理 {i}\n\n...\n", encoding="utf-8")
+        else:
+            (directory / f"proof_tree_{i}.csv").write_text(csv_export(5, seed + i), encoding="utf-8")
+    return directory
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Differential fuzz test for the Markdown round trip.
+
+``markdown_to_json`` is meant to invert ``build_markdown``. This harness
+generates random legacy proofs (CJK and other unicode, LaTeX, blank lines,
+CRLF line breaks, trailing whitespace, legacy ``apis`` vs ``substeps``, steps
+that have nothing to render) and checks for each one that
+
+1. ``markdown_to_json(build_markdown(proof))`` equals ``canonical(proof)``,
+   an independent model of what the Markdown format can represent (stripped
+   text, normalised line breaks, empty parts dropped, ``api`` → ``apis``);
+2. a second round trip is a fixed point.
+
+Generated proofs stay inside the format's domain: step and substep
+descriptions never contain lines that the parser reads as structure
+(``- ``, ``API:``, ``### Step``), statements never contain a ``---`` line,
+and titles, substep descriptions and API names are single-line.
+
+Documents are checked in batches on a process pool; the run reports
+documents per second, so it doubles as a stress benchmark for both
+converters. Every document has its own seed: a failure is reported with
+that seed and a shrunk counterexample, and ``--replay SEED`` reruns it.
+
+Usage:
+    python3 benchmarks/fuzz_markdown_roundtrip.py --docs 100000
+    python3 benchmarks/fuzz_markdown_roundtrip.py --seconds 60 --workers 8 -o fuzz.json
+    python3 benchmarks/fuzz_markdown_roundtrip.py --replay 4711
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import corpus  # noqa: E402
+from markdown_to_json import MarkdownParseError, markdown_to_json  # noqa: E402
+from proof_markdown import build_markdown, validate_proof_json  # noqa: E402
+
+# -- generator ---------------------------------------------------------------
+
+WORDS = [
+    "设", "环", "理想", "素理想", "诺特", "由引理可得", "因此", "注意到", "令", "则",
+    "ring", "ideal", "prime", "hence", "Suppose", "by", "the", "lemma", "x", "f",
+    "α", "β", "ℕ", "ℤ", "→", "≤", "∀", "∃", "⊆", "∑", "√", "∞", "é", "ß", "🙂", "★",
+    "*emph*", "_sub_", "#", "##", "`code`", "[link](x)", "|", ">", "~", "%", "&", "-", "--",
+    "1.", "2)", ":", "API", "Step", "定理", "证明",
+]
+LATEX = [
+    r"$x$", r"$\sqrt{I}$", r"$I \subseteq R$", r"$\frac{a}{b}$", r"$x_{1}^{2}$",
+    r"$\mathrm{Spec}(R)$", r"$$\sum_{i=0}^{n} a_i$$", r"\(a+b\)", r"$\{0\}$", r"$\text{若 } p \mid n$",
+    r"$\lVert v \rVert$", r"$\mathbb{Z}[x_1, x_2, \ldots]$",
+]
+# A fixed pool of realistic names (dotted, unqualified, Unicode, ``_root_``).
+API_NAMES = (
+    [f"{ns}.{stem}" for ns in corpus.NAMESPACES for stem in corpus.LEMMA_STEMS]
+    + ["Nat.succ_le_iff", "Finset.sum_le_sum", "le_of_lt", "mul_comm", "Set.mem_setOf_eq",
+       "Real.sqrt_nonneg", "α.map", "Polynomial.eval₂", "Ideal.IsPrime.mem_or_mem", "_root_.trans"]
+)
+STRUCTURAL_PREFIXES = ("- ", "API:", "### Step")
+
+
+def _phrase(rng: random.Random, max_words: int = 8) -> str:
+    parts = []
+    for _ in range(rng.randint(1, max_words)):
+        parts.append(rng.choice(LATEX) if rng.random() < 0.2 else rng.choice(WORDS))
+    return (" " if rng.random() < 0.7 else "").join(parts)
+
+
+def _line(rng: random.Random) -> str:
+    """One text line that the parser will not read as structure."""
+    indent = rng.choice(["", "", "", "  ", "\t"])
+    trailing = rng.choice(["", "", " ", "  ", "\t"])
+    line = _phrase(rng)
+    if line.lstrip().startswith(STRUCTURAL_PREFIXES) or line.strip() == "---":
+        line = "·" + line
+    return indent + line + trailing
+
+
+def _paragraphs(rng: random.Random, max_lines: int) -> str:
+    lines = []
+    for _ in range(rng.randint(1, max_lines)):
+        if lines and rng.random() < 0.25:
+            lines.extend([""] * rng.randint(1, 3))  # blank lines inside the text
+        lines.append(_line(rng))
+    newline = "\r\n" if rng.random() < 0.1 else "\n"
+    text = newline.join(lines)
+    # Surrounding whitespace is not representable and must be stripped.
+    return rng.choice(["", " ", "\n", "\n\n  "]) + text + rng.choice(["", " ", "\n", "  \n"])
+
+
+def _single_line(rng: random.Random) -> str:
+    return rng.choice(["", " "]) + _phrase(rng, 5).replace("\n", " ") + rng.choice(["", " ", "\t"])
+
+
+def _api_list(rng: random.Random, low: int, high: int):
+    names = [rng.choice(API_NAMES) for _ in range(rng.randint(low, high))]
+    style = rng.random()
+    if style < 0.15:
+        return ", ".join(names)                      # comma-separated string
+    if style < 0.25:
+        return [f" {name} " for name in names]       # padded entries
+    return names
+
+
+def random_proof(seed: int) -> Dict:
+    rng = random.Random(seed)
+    proof: Dict = {
+        "theorem_id": rng.choice(["", str(rng.randint(1, 9999)), f" {rng.randint(1, 99)}-{rng.choice(WORDS)} "]),
+        "statement": _paragraphs(rng, 4),
+        "steps": [],
+    }
+    for _ in range(rng.randint(0, 8)):
+        step: Dict = {}
+        if rng.random() < 0.7:
+            step["title"] = _single_line(rng)
+        kind = rng.random()
+        if kind < 0.8 or not step:
+            step["description"] = _paragraphs(rng, 5) if rng.random() < 0.9 else rng.choice(["", "  "])
+        if kind < 0.45:
+            substeps = []
+            for _ in range(rng.randint(0, 5)):
+                substep: Dict = {"description": _single_line(rng) if rng.random() < 0.9 else " "}
+                if rng.random() < 0.8:
+                    substep["api2"] = _api_list(rng, 0, 3)
+                if rng.random() < 0.5:
+                    substep["api1"] = _api_list(rng, 0, 2)
+                substeps.append(substep)
+            step["substeps"] = substeps
+            if rng.random() < 0.2:
+                step["apis"] = _api_list(rng, 1, 2)  # ignored when substeps render
+        elif kind < 0.9:
+            step["apis" if rng.random() < 0.8 else "api"] = _api_list(rng, 0, 4)
+        if "description" not in step and not step.get("substeps"):
+            step["description"] = _paragraphs(rng, 2)
+        if rng.random() < 0.1:
+            step["symbols"] = "R, I"  # not part of the Markdown format
+        proof["steps"].append(step)
+    return proof
+
+
+# -- oracle ------------------------------------------------------------------
+
+def _text(value: object) -> str:
+    """What survives of a free-text field: normalised line breaks, lines right-stripped, whole stripped."""
+    text = str(value or "").replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+def _apis(raw: object) -> List[str]:
+    entries = raw.split(",") if isinstance(raw, str) else list(raw or [])
+    return [str(entry).strip() for entry in entries if str(entry).strip()]
+
+
+def canonical(proof: Dict) -> Dict:
+    """Independent model of ``markdown_to_json(build_markdown(proof))``."""
+    steps = []
+    for step in proof.get("steps", []):
+        description = _text(step.get("description"))
+        raw_substeps = step.get("substeps") or []
+        if not description and not raw_substeps:
+            continue  # not rendered at all
+        out: Dict = {}
+        title = _text(step.get("title"))
+        if title:
+            out["title"] = title
+        if description:
+            out["description"] = description
+        substeps = []
+        for substep in raw_substeps:
+            sub_description = _text(substep.get("description"))
+            if not sub_description:
+                continue
+            item: Dict = {"description": sub_description}
+            for key in ("api2", "api1"):
+                names = _apis(substep.get(key))
+                if names:
+                    item[key] = names
+            substeps.append(item)
+        if substeps:
+            out["substeps"] = substeps
+        elif not raw_substeps:
+            names = _apis(step.get("apis") or step.get("api"))
+            if names:
+                out["apis"] = names
+        if any(key in out for key in ("description", "substeps", "apis")):
+            steps.append(out)
+    return {"theorem_id": _text(proof.get("theorem_id")), "statement": _text(proof.get("statement")), "steps": steps}
+
+
+def check(proof: Dict, markdown: Optional[str] = None) -> Optional[str]:
+    """``None`` if ``proof`` round-trips as modelled, else a description of the failure."""
+    errors = validate_proof_json(proof)
+    if errors:
+        return f"generator produced an invalid proof: {errors}"
+    if markdown is None:
+        markdown = build_markdown(proof)
+    try:
+        parsed = markdown_to_json(markdown)
+    except MarkdownParseError as exc:
+        return f"markdown_to_json raised: {exc}"
+    expected = canonical(proof)
+    if parsed != expected:
+        return "round trip differs from the model"
+    try:
+        again = markdown_to_json(build_markdown(parsed))
+    except MarkdownParseError as exc:
+        return f"second round trip raised: {exc}"
+    if again != parsed:
+        return "second round trip is not a fixed point"
+    return None
+
+
+def shrink(proof: Dict) -> Dict:
+    """Greedily remove steps, substeps, fields and text while the failure persists."""
+    def candidates(current: Dict):
+        steps = current["steps"]
+        for i in range(len(steps)):
+            yield dict(current, steps=steps[:i] + steps[i + 1:])
+        for i, step in enumerate(steps):
+            for key in list(step):
+                smaller = {k: v for k, v in step.items() if k != key}
+                if smaller:
+                    yield dict(current, steps=steps[:i] + [smaller] + steps[i + 1:])
+            subs = step.get("substeps") or []
+            for j in range(len(subs)):
+                yield dict(current, steps=steps[:i] + [dict(step, substeps=subs[:j] + subs[j + 1:])] + steps[i + 1:])
+            for key, value in step.items():
+                if isinstance(value, str) and len(value) > 1:
+                    for part in (value[: len(value) // 2], value[len(value) // 2:]):
+                        yield dict(current, steps=steps[:i] + [dict(step, **{key: part})] + steps[i + 1:])
+        for key in ("statement", "theorem_id"):
+            value = current[key]
+            if len(value) > 1:
+                yield dict(current, **{key: value[: len(value) // 2]})
+                yield dict(current, **{key: value[len(value) // 2:]})
+
+    current = proof
+    improved = True
+    while improved:
+        improved = False
+        for candidate in candidates(current):
+            if validate_proof_json(candidate):
+                continue
+            if check(candidate) is not None:
+                current, improved = candidate, True
+                break
+    return current
+
+
+# -- runner ------------------------------------------------------------------
+
+def run_batch(first_seed: int, count: int, deadline: Optional[float]) -> Dict:
+    """Worker: check ``count`` documents starting at ``first_seed`` (stop early at ``deadline``)."""
+    checked = 0
+    markdown_bytes = 0
+    failures: List[Tuple[int, str]] = []
+    start = time.perf_counter()
+    for seed in range(first_seed, first_seed + count):
+        if deadline is not None and time.time() >= deadline:
+            break
+        proof = random_proof(seed)
+        markdown = build_markdown(proof)
+        error = check(proof, markdown)
+        markdown_bytes += len(markdown.encode("utf-8"))
+        checked += 1
+        if error is not None:
+            failures.append((seed, error))
+    return {"checked": checked, "bytes": markdown_bytes, "failures": failures,
+            "cpu_seconds": time.perf_counter() - start}
+
+
+def replay(seed: int) -> int:
+    proof = random_proof(seed)
+    error = check(proof)
+    if error is None:
+        print(f"seed {seed}: ok")
+        return 0
+    small = shrink(proof)
+    markdown = build_markdown(small)
+    print(f"seed {seed}: {check(small)}")
+    print("shrunk proof:", json.dumps(small, ensure_ascii=False, indent=2), sep="\n")
+    print("markdown:", markdown, sep="\n")
+    try:
+        print("parsed:", json.dumps(markdown_to_json(markdown), ensure_ascii=False, indent=2), sep="\n")
+    except MarkdownParseError:
+        pass
+    print("expected:", json.dumps(canonical(small), ensure_ascii=False, indent=2), sep="\n")
+    return 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fuzz build_markdown / markdown_to_json round-trip parity")
+    parser.add_argument("--docs", type=int, default=20000, help="Documents to check (default: 20000)")
+    parser.add_argument("--seconds", type=float, default=None, help="Stop after this many seconds instead")
+    parser.add_argument("--seed", type=int, default=0, help="First document seed (default: 0)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--batch", type=int, default=500, help="Documents per task (default: 500)")
+    parser.add_argument("--max-failures", type=int, default=5, help="Failures to shrink and print (default: 5)")
+    parser.add_argument("--replay", type=int, help="Re-check one seed and print the shrunk counterexample")
+    parser.add_argument("-o", "--output", help="Write the summary JSON to this file")
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        return replay(args.replay)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    deadline = time.time() + args.seconds if args.seconds else None
+    total = args.docs if deadline is None else sys.maxsize
+    checked = markdown_bytes = 0
+    cpu_seconds = 0.0
+    failures: List[Tuple[int, str]] = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        next_seed = args.seed
+        end_seed = args.seed + total if deadline is None else None
+        pending = set()
+
+        def submit() -> bool:
+            nonlocal next_seed
+            if end_seed is not None and next_seed >= end_seed:
+                return False
+            if deadline is not None and time.time() >= deadline:
+                return False
+            count = args.batch if end_seed is None else min(args.batch, end_seed - next_seed)
+            pending.add(executor.submit(run_batch, next_seed, count, deadline))
+            next_seed += count
+            return True
+
+        for _ in range(args.workers * 2):
+            if not submit():
+                break
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                result = future.result()
+                checked += result["checked"]
+                markdown_bytes += result["bytes"]
+                cpu_seconds += result["cpu_seconds"]
+                failures.extend(result["failures"])
+                submit()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "python": platform.python_version(),
+        "workers": args.workers,
+        "first_seed": args.seed,
+        "documents": checked,
+        "failures": len(failures),
+        "failing_seeds": sorted(seed for seed, _ in failures)[:100],
+        "seconds": round(elapsed, 3),
+        "docs_per_second": round(checked / elapsed, 1) if elapsed else None,
+        "docs_per_cpu_second": round(checked / cpu_seconds, 1) if cpu_seconds else None,
+        "markdown_mb_per_second": round(markdown_bytes / elapsed / 1e6, 2) if elapsed else None,
+    }
+    print(f"{checked:,d} documents in {elapsed:.2f}s on {args.workers} worker(s): "
+          f"{summary['docs_per_second']:,.0f} docs/s ({summary['docs_per_cpu_second']:,.0f} per worker), "
+          f"{summary['markdown_mb_per_second']} MB/s of Markdown")
+    for seed, error in sorted(failures)[: args.max_failures]:
+        small = shrink(random_proof(seed))
+        print(f"\n❌ seed {seed}: {error}")
+        print(json.dumps(small, ensure_ascii=False, indent=2))
+    if failures:
+        print(f"\n{len(failures)} failure(s); rerun one with --replay SEED", file=sys.stderr)
+    else:
+        print("✅ all documents round-trip")
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Import-time and CLI startup benchmark.
+
+For each backend module, runs ``python -X importtime -c "import <module>"``
+in a fresh interpreter and reports the module's cumulative import time and
+its most expensive dependencies. It then times complete
+``json_to_markdown.py`` runs, in-process and (with ``--daemon``) through a
+warm ``cli_daemon.py`` started for the duration of the benchmark.
+
+Usage:
+    python3 benchmarks/import_time.py
+    python3 benchmarks/import_time.py --daemon --runs 50 -o import_time.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKEND = ROOT / "backend"
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import corpus  # noqa: E402
+
+MODULES = [
+    "json_to_markdown", "proof_markdown", "markdown_to_json", "lean_apis",
+    "legacy_tree", "columnar", "cli_daemon", "server",
+]
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module: str, repeat: int, top: int) -> Dict[str, object]:
+    """Median cumulative import time of ``module`` and its slowest direct-or-nested imports."""
+    totals: List[float] = []
+    heaviest: Dict[str, int] = {}
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=BACKEND, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"}
+        for line in proc.stderr.splitlines():
+            match = _IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            cumulative, name = int(match.group(2)), match.group(4)
+            if name == module and len(match.group(3)) <= 1:
+                totals.append(cumulative / 1e6)
+            elif name != module:
+                heaviest[name] = max(heaviest.get(name, 0), cumulative)
+    slowest = sorted(heaviest.items(), key=lambda item: -item[1])[:top]
+    return {
+        "median": statistics.median(totals),
+        "min": min(totals),
+        "slowest_imports": {name: us / 1e6 for name, us in slowest},
+    }
+
+
+def time_cli(argv: List[str], runs: int, env: Optional[Dict[str, str]] = None) -> Dict[str, float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(argv, cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        samples.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv)} failed: {proc.stderr.decode(errors='replace')[:200]}")
+    return {"median": statistics.median(samples), "min": min(samples), "runs": runs}
+
+
+def _wait_for_socket(path: str, process: subprocess.Popen, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("CLI daemon did not start")
+        time.sleep(0.05)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure backend import time and CLI startup")
+    parser.add_argument("-o", "--output", help="Write results JSON to this file")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module (default: 5)")
+    parser.add_argument("--runs", type=int, default=20, help="CLI invocations per mode (default: 20)")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per module")
+    parser.add_argument("--daemon", action="store_true", help="Also time CLI runs through cli_daemon.py")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict] = {"imports": {}, "cli": {}}
+    baseline = time_cli([sys.executable, "-c", "pass"], args.runs)
+    results["cli"]["python -c pass"] = baseline
+    print(f"{'python -c pass':<40} {baseline['median'] * 1e3:>9.1f} ms")
+
+    for module in MODULES:
+        profile = import_profile(module, args.repeat, args.top)
+        results["imports"][module] = profile
+        if "error" in profile:
+            print(f"import {module:<33} {'failed':>12}  ({profile['error']})")
+            continue
+        deps = ", ".join(f"{name} {sec * 1e3:.1f}" for name, sec in profile["slowest_imports"].items())
+        print(f"import {module:<33} {profile['median'] * 1e3:>9.1f} ms  [{deps}]")
+
+    with tempfile.TemporaryDirectory(prefix="brickmove-import-") as tmp:
+        proof_path = Path(tmp) / "proof.json"
+        proof_path.write_text(json.dumps(corpus.proof_json(5, 2, seed=1), ensure_ascii=False), encoding="utf-8")
+        cli = [sys.executable, "json_to_markdown.py", str(proof_path), "-o", str(Path(tmp) / "proof.md")]
+
+        env = {k: v for k, v in os.environ.items() if k != "BRICKMOVE_DAEMON_SOCKET"}
+        results["cli"]["json_to_markdown"] = direct = time_cli(cli, args.runs, env)
+        print(f"{'json_to_markdown.py (in-process)':<40} {direct['median'] * 1e3:>9.1f} ms")
+
+        if args.daemon:
+            socket_path = str(Path(tmp) / "cli.sock")
+            daemon = subprocess.Popen(
+                [sys.executable, "cli_daemon.py", "serve", "--socket", socket_path],
+                cwd=BACKEND, stdout=subprocess.DEVNULL,
+            )
+            try:
+                _wait_for_socket(socket_path, daemon)
+                daemon_env = dict(env, BRICKMOVE_DAEMON_SOCKET=socket_path)
+                results["cli"]["json_to_markdown (daemon)"] = warm = time_cli(cli, args.runs, daemon_env)
+                print(f"{'json_to_markdown.py (daemon)':<40} {warm['median'] * 1e3:>9.1f} ms")
+            finally:
+                daemon.terminate()
+                daemon.wait(timeout=10)
+
+    if args.output:
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
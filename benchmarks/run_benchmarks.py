@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the backend hot paths.
+
+Times the extraction, conversion, validation and storage helpers on the
+synthetic corpus from ``corpus.py``, both in-process and through the Flask
+test client, and writes the results as JSON so runs can be compared.
+
+Usage:
+    python3 benchmarks/run_benchmarks.py -o bench.json
+    python3 benchmarks/run_benchmarks.py --quick --compare bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import corpus  # noqa: E402
+from api_stats import ApiStatsIndex  # noqa: E402
+from api_vocab import ApiVocabulary  # noqa: E402
+from csv_storage import save_csv_content, save_json_content, save_md_content  # noqa: E402
+from lean_apis import extract_apis_from_code  # noqa: E402
+from lean_file import LeanFileIndex  # noqa: E402
+from markdown_to_json import markdown_to_json  # noqa: E402
+from proof_markdown import build_markdown, validate_proof_json  # noqa: E402
+
+
+def measure(func: Callable[[], object], repeat: int, min_time: float = 0.05) -> Dict[str, float]:
+    """
+    Time ``func`` and return per-call statistics in seconds.
+
+    The number of calls per sample is calibrated so that a sample lasts at
+    least ``min_time``; ``repeat`` samples are taken.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "calls_per_sample": number,
+        "samples": len(samples),
+    }
+
+
+class Suite:
+    def __init__(self, repeat: int, filters: List[str]):
+        self.repeat = repeat
+        self.filters = filters
+        self.results: Dict[str, Dict] = {}
+
+    def bench(self, name: str, func: Callable[[], object], **params) -> None:
+        if self.filters and not any(f in name for f in self.filters):
+            return
+        stats = measure(func, self.repeat)
+        stats["params"] = params
+        self.results[name] = stats
+        print(f"{name:<58} {stats['median'] * 1e3:>10.3f} ms  (min {stats['min'] * 1e3:.3f})")
+
+
+def run_in_process(suite: Suite, sizes: Dict[str, List[int]], workdir: Path, flask_server) -> None:
+    for n in sizes["lean"]:
+        code = corpus.lean_source(n, seed=n)
+        suite.bench(f"extract_apis_from_code[decls={n}]",
+                    lambda c=code: extract_apis_from_code(c), bytes=len(code))
+        # One declaration edited per call: only that block misses the cache.
+        index = LeanFileIndex()
+        index.extract_code(code)
+        edits = iter(range(1 << 30))
+
+        def edit_and_extract(c=code, i=index, edits=edits):
+            return i.extract_code(c.replace("bench_lemma_0 ", f"bench_lemma_0_{next(edits)} ", 1))
+
+        suite.bench(f"LeanFileIndex.extract_code[decls={n},one_edit]", edit_and_extract, bytes=len(code))
+
+    for steps, substeps in sizes["proof"]:
+        proof = corpus.proof_json(steps, substeps, seed=steps)
+        markdown = build_markdown(proof)
+        tag = f"steps={steps},substeps={substeps}"
+        suite.bench(f"validate_proof_json[{tag}]", lambda p=proof: validate_proof_json(p))
+        suite.bench(f"build_markdown[{tag}]", lambda p=proof: build_markdown(p))
+        suite.bench(f"markdown_to_json[{tag}]", lambda m=markdown: markdown_to_json(m), bytes=len(markdown))
+
+    save_dir = workdir / "saves"
+    for depth, fanout in sizes["tree"]:
+        tree = corpus.deep_tree(depth, fanout, seed=depth)
+        tag = f"depth={depth},fanout={fanout}"
+        text = json.dumps(tree, ensure_ascii=False)
+        suite.bench(f"save_json_content[{tag}]",
+                    lambda t=tree: save_json_content(t, workdir, "tree.json", str(save_dir), True),
+                    bytes=len(text))
+    for rows in sizes["csv"]:
+        csv_text = corpus.csv_export(rows, seed=rows)
+        suite.bench(f"save_csv_content[rows={rows}]",
+                    lambda c=csv_text: save_csv_content(c, workdir, "export.csv", str(save_dir), True),
+                    bytes=len(csv_text))
+        suite.bench(f"save_md_content[bytes={len(csv_text)}]",
+                    lambda c=csv_text: save_md_content(c, workdir, "proof.md", str(save_dir), True))
+
+    for files, rows in sizes["stats"]:
+        directory = workdir / f"stats_{files}x{rows}"
+        directory.mkdir()
+        for i in range(files):
+            (directory / f"export_{i}.csv").write_text(corpus.csv_export(rows, seed=i), encoding="utf-8")
+        tag = f"files={files},rows={rows}"
+        suite.bench(f"ApiStatsIndex.stats[{tag},cold]",
+                    lambda d=directory: ApiStatsIndex(ApiVocabulary()).stats(d), units=files * rows)
+        # One file touched per call: only its contribution is recounted.
+        index = ApiStatsIndex(ApiVocabulary())
+        index.stats(directory)
+        touches = iter(range(1, 1 << 30))
+
+        def touch_and_stats(d=directory, i=index, touches=touches):
+            os.utime(d / "export_0.csv", ns=(next(touches),) * 2)
+            return i.stats(d)
+
+        suite.bench(f"ApiStatsIndex.stats[{tag},one_change]", touch_and_stats, units=files * rows)
+
+    if flask_server is not None:
+        app = flask_server.app
+        for files in sizes["dir"]:
+            directory = corpus.populate_export_dir(workdir / f"exports_{files}", files, seed=files)
+
+            def list_files(d=directory):
+                with app.test_request_context("/api/list-files", query_string={"dir": str(d)}):
+                    flask_server.list_files_generic()
+
+            suite.bench(f"list_files_generic[files={files}]", list_files)
+
+
+def run_http(suite: Suite, sizes: Dict[str, List[int]], workdir: Path, flask_server) -> None:
+    client = flask_server.app.test_client()
+
+    def post(url: str, payload: Dict) -> Callable[[], object]:
+        def call():
+            response = client.post(url, json=payload)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return call
+
+    for n in sizes["lean"]:
+        code = corpus.lean_source(n, seed=n)
+        suite.bench(f"http POST /api/extract-apis[decls={n}]", post("/api/extract-apis", {"code": code}))
+    for steps, substeps in sizes["proof"]:
+        proof = corpus.proof_json(steps, substeps, seed=steps)
+        tag = f"steps={steps},substeps={substeps}"
+        suite.bench(f"http POST /api/convert-json-to-md[{tag}]", post("/api/convert-json-to-md", proof))
+        suite.bench(f"http POST /api/convert-md-to-json[{tag}]",
+                    post("/api/convert-md-to-json", {"markdown": build_markdown(proof)}))
+    for depth, fanout in sizes["tree"]:
+        tree = corpus.deep_tree(depth, fanout, seed=depth)
+        suite.bench(f"http POST /api/save-json-content[depth={depth},fanout={fanout}]",
+                    post("/api/save-json-content", {
+                        "json": tree, "filename": "tree.json",
+                        "target_dir": str(workdir / "http_saves"), "overwrite": True,
+                    }))
+    for files in sizes["dir"]:
+        directory = corpus.populate_export_dir(workdir / f"http_exports_{files}", files, seed=files)
+        suite.bench(f"http GET /api/list-files[files={files}]",
+                    lambda d=directory: client.get("/api/list-files", query_string={"dir": str(d)}))
+
+
+def compare(current: Dict[str, Dict], previous_path: Path, threshold: float) -> List[str]:
+    """Print the relative change of each median and return regressed benchmark names."""
+    previous = json.loads(previous_path.read_text(encoding="utf-8")).get("results", {})
+    regressions = []
+    print(f"\nComparison with {previous_path} (threshold {threshold:.0%}):")
+    for name, stats in current.items():
+        before = previous.get(name)
+        if not before:
+            print(f"  {name:<58} (new)")
+            continue
+        change = stats["median"] / before["median"] - 1.0
+        marker = ""
+        if change > threshold:
+            marker = "  <-- regression"
+            regressions.append(name)
+        elif change < -threshold:
+            marker = "  (faster)"
+        print(f"  {name:<58} {change:+7.1%}{marker}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark backend hot paths")
+    parser.add_argument("-o", "--output", help="Write results JSON to this file")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown reported as a regression (default: 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 if any benchmark regressed")
+    parser.add_argument("--quick", action="store_true", help="Smaller inputs and fewer samples")
+    parser.add_argument("--repeat", type=int, default=None, help="Samples per benchmark")
+    parser.add_argument("--no-http", action="store_true", help="Skip the Flask test-client benchmarks")
+    parser.add_argument("-k", "--filter", action="append", default=[],
+                        help="Only run benchmarks whose name contains this text (repeatable)")
+    args = parser.parse_args()
+
+    if args.quick:
+        sizes = {"lean": [10, 100], "proof": [(5, 2), (50, 5)], "tree": [(3, 3)], "csv": [100], "dir": [50],
+                 "stats": [(20, 500)]}
+    else:
+        sizes = {
+            "lean": [10, 100, 1000],
+            "proof": [(5, 2), (50, 5), (500, 10)],
+            "tree": [(3, 3), (6, 4)],
+            "csv": [100, 10000],
+            "dir": [50, 2000],
+            "stats": [(20, 500), (200, 500)],
+        }
+    repeat = args.repeat or (3 if args.quick else 7)
+
+    suite = Suite(repeat, args.filter)
+    with tempfile.TemporaryDirectory(prefix="brickmove-bench-") as tmp:
+        workdir = Path(tmp)
+        # Keep the server's version history, jobs and trees out of the repository.
+        os.environ["BRICKMOVE_DATA_DIR"] = str(workdir / "server_data")
+        os.environ["BRICKMOVE_TREE_DIR"] = str(workdir / "server_trees")
+        flask_server = None
+        try:
+            import server as flask_server  # noqa: F401  (needs Flask)
+        except ImportError as exc:
+            print(f"Flask server unavailable ({exc}); skipping listing and HTTP benchmarks.")
+        run_in_process(suite, sizes, workdir, flask_server)
+        if flask_server is not None and not args.no_http:
+            run_http(suite, sizes, workdir, flask_server)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": args.quick,
+        "results": suite.results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        regressions = compare(suite.results, Path(args.compare), args.threshold)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,8 +10,7 @@ import { getEditorCsv } from './csv.js';
 import { getEditorMarkdown } from './markdownExport.js';
 import { buildEditorJson } from './save.js';
 import { getCsvTargetDir } from '../../shared/csvTargetDir.js';
-import { listSavedFiles, readSavedFile } from '../../shared/historyApi.js';
-import { getCsvTargetDir } from '../../shared/csvTargetDir.js';
+import { listSavedFiles, readSavedFile, listVersions, readVersion, restoreVersion } from '../../shared/historyApi.js';
 
 const JSON_PLACEHOLDER = `{
   "theorem_id": "...",
@@ -323,7 +322,8 @@ async function handleSaveCsvToServer() {
     const result = await saveCsvContent({
       content: csvContent,
       filename,
-      targetDir: getCsvTargetDir()
+      targetDir: getCsvTargetDir(),
+      versioned: true
     });
     alert(`CSV 已保存到: ${result.path || result.absolute_path}`);
   } catch (error) {
@@ -334,7 +334,7 @@ async function handleSaveCsvToServer() {
 async function handleSaveJsonToServer() {
   try {
     const { json, filename } = buildEditorJson();
-    const result = await saveJsonContent({ json, filename, targetDir: getCsvTargetDir() });
+    const result = await saveJsonContent({ json, filename, targetDir: getCsvTargetDir(), versioned: true });
     alert(`JSON 已保存到: ${result.path || result.absolute_path}`);
   } catch (error) {
     alert(`JSON 保存失败：${error.message}`);
@@ -344,7 +344,7 @@ async function handleSaveJsonToServer() {
 async function handleSaveMdToServer() {
   try {
     const { markdown, filename } = getEditorMarkdown();
-    const result = await saveMarkdownContent({ content: markdown, filename, targetDir: getCsvTargetDir() });
+    const result = await saveMarkdownContent({ content: markdown, filename, targetDir: getCsvTargetDir(), versioned: true });
     alert(`Markdown 已保存到: ${result.path || result.absolute_path}`);
   } catch (error) {
     alert(`Markdown 保存失败：${error.message}`);
@@ -408,33 +408,113 @@ function renderHistoryList(items) {
     const meta = document.createElement('span');
     const date = new Date(item.mtime * 1000).toLocaleString();
     meta.textContent = `${item.ext} • ${Math.round(item.size/1024)}KB • ${date}`;
+    const versionsBtn = document.createElement('button');
+    versionsBtn.type = 'button';
+    versionsBtn.textContent = '版本';
+    versionsBtn.style.marginLeft = '8px';
+    const versionsBox = document.createElement('div');
+    versionsBox.style.display = 'none';
+    versionsBox.style.padding = '4px 10px 6px 24px';
+    versionsBox.style.background = '#f9fafb';
+    versionsBtn.addEventListener('click', event => {
+      event.stopPropagation();
+      toggleVersions(item, versionsBox);
+    });
+    meta.appendChild(versionsBtn);
     row.appendChild(name);
     row.appendChild(meta);
     row.style.cursor = 'pointer';
     row.addEventListener('click', () => loadHistoryItem(item));
     container.appendChild(row);
+    container.appendChild(versionsBox);
   });
   historyList.appendChild(container);
 }
 
+async function toggleVersions(item, box) {
+  if (box.style.display !== 'none') {
+    box.style.display = 'none';
+    return;
+  }
+  try {
+    const versions = await listVersions(item.path);
+    renderVersionList(item, versions, box);
+    box.style.display = 'block';
+  } catch (error) {
+    alert(`读取历史版本失败：${error.message}`);
+  }
+}
+
+function renderVersionList(item, versions, box) {
+  box.innerHTML = '';
+  if (!versions.length) {
+    box.textContent = '暂无历史版本';
+    return;
+  }
+  versions.slice().reverse().forEach(entry => {
+    const row = document.createElement('div');
+    row.style.display = 'flex';
+    row.style.justifyContent = 'space-between';
+    row.style.padding = '2px 0';
+    const label = document.createElement('span');
+    const date = new Date(entry.saved_at * 1000).toLocaleString();
+    const source = entry.source?.startsWith('restore:') ? ` • 恢复自 v${entry.source.slice(8)}` : '';
+    label.textContent = `v${entry.version} • ${Math.round(entry.size/1024)}KB • ${date}${source}`;
+    const actions = document.createElement('span');
+    const loadBtn = document.createElement('button');
+    loadBtn.type = 'button';
+    loadBtn.textContent = '载入';
+    loadBtn.addEventListener('click', async () => {
+      try {
+        const file = await readVersion(item.path, entry.version);
+        await applyHistoryContent(file.ext, file.content, `${item.name}@v${entry.version}`);
+      } catch (error) {
+        alert(`加载失败：${error.message}`);
+      }
+    });
+    const restoreBtn = document.createElement('button');
+    restoreBtn.type = 'button';
+    restoreBtn.textContent = '恢复';
+    restoreBtn.style.marginLeft = '4px';
+    restoreBtn.addEventListener('click', async () => {
+      if (!confirm(`将 ${item.name} 恢复为 v${entry.version}？当前内容仍保留在历史版本中。`)) return;
+      try {
+        await restoreVersion(item.path, entry.version);
+        renderVersionList(item, await listVersions(item.path), box);
+      } catch (error) {
+        alert(`恢复失败：${error.message}`);
+      }
+    });
+    actions.appendChild(loadBtn);
+    actions.appendChild(restoreBtn);
+    row.appendChild(label);
+    row.appendChild(actions);
+    box.appendChild(row);
+  });
+}
+
 async function loadHistoryItem(item) {
   if (!item?.path) return;
   try {
     const file = await readSavedFile(item.path);
-    const ext = (file.ext || '').toLowerCase();
-    if (ext === '.json') {
-      const data = JSON.parse(file.content);
-      applyLoadedProof(data, item.name);
-    } else if (ext === '.md' || ext === '.markdown') {
-      const proof = await convertMarkdownToJson(file.content);
-      applyLoadedProof(proof, item.name);
-    } else if (ext === '.csv') {
-      alert('CSV 历史文件可查看，但不支持直接载入为编辑内容。');
-    } else {
-      alert('暂不支持的文件类型');
-    }
-    historyDialog?.close();
+    await applyHistoryContent(file.ext, file.content, item.name);
   } catch (error) {
     alert(`加载失败：${error.message}`);
   }
 }
+
+async function applyHistoryContent(extension, content, name) {
+  const ext = (extension || '').toLowerCase();
+  if (ext === '.json') {
+    const data = JSON.parse(content);
+    applyLoadedProof(data, name);
+  } else if (ext === '.md' || ext === '.markdown') {
+    const proof = await convertMarkdownToJson(content);
+    applyLoadedProof(proof, name);
+  } else if (ext === '.csv') {
+    alert('CSV 历史文件可查看，但不支持直接载入为编辑内容。');
+  } else {
+    alert('暂不支持的文件类型');
+  }
+  historyDialog?.close();
+}
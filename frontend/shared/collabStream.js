@@ -0,0 +1,44 @@
+export function createClientId() {
+  if (window.crypto?.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  return `client-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+}
+
+// Subscribe to live changes of a server document. Returns a function that closes the stream.
+export function subscribeToDocument(path, clientId, { onChanges, onReload, onError } = {}) {
+  if (typeof window.EventSource !== 'function') {
+    return () => {};
+  }
+  const params = new URLSearchParams({ path });
+  if (clientId) params.set('client_id', clientId);
+  const source = new EventSource(`/api/collab/stream?${params.toString()}`);
+
+  source.addEventListener('changes', event => {
+    let payload;
+    try {
+      payload = JSON.parse(event.data);
+    } catch (parseError) {
+      return;
+    }
+    if (payload.origin && payload.origin === clientId) return;
+    onChanges?.(payload);
+  });
+
+  source.addEventListener('reload', event => {
+    let payload = {};
+    try {
+      payload = JSON.parse(event.data);
+    } catch (parseError) {
+      // A reload without details still means "re-read the document".
+    }
+    if (payload.origin && payload.origin === clientId) return;
+    onReload?.(payload);
+  });
+
+  source.addEventListener('error', () => {
+    onError?.();
+  });
+
+  return () => source.close();
+}
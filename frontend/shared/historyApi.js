@@ -19,3 +19,42 @@ export async function readSavedFile(path) {
   }
   return data;
 }
+
+async function getJson(url, fallbackMessage) {
+  const res = await fetch(url);
+  const data = await res.json();
+  if (!res.ok || !data?.success) {
+    throw new Error(data?.error || fallbackMessage);
+  }
+  return data;
+}
+
+export async function listVersions(path) {
+  const params = new URLSearchParams({ path });
+  const data = await getJson(`/api/versions?${params.toString()}`, '无法列出历史版本');
+  return data.versions || [];
+}
+
+export async function readVersion(path, version) {
+  const params = new URLSearchParams({ path });
+  if (version != null) params.set('version', String(version));
+  return getJson(`/api/versions/read?${params.toString()}`, '读取历史版本失败');
+}
+
+export async function diffVersions(path, from, to) {
+  const params = new URLSearchParams({ path, from: String(from), to: String(to) });
+  return getJson(`/api/versions/diff?${params.toString()}`, '比较历史版本失败');
+}
+
+export async function restoreVersion(path, version) {
+  const res = await fetch('/api/versions/restore', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ path, version })
+  });
+  const data = await res.json();
+  if (!res.ok || !data?.success) {
+    throw new Error(data?.error || '恢复历史版本失败');
+  }
+  return data;
+}
@@ -0,0 +1,80 @@
+async function requestJson(url, options) {
+  let response;
+  try {
+    response = await fetch(url, options);
+  } catch (networkError) {
+    throw new Error('网络请求失败，请检查连接');
+  }
+
+  let data;
+  try {
+    data = await response.json();
+  } catch (parseError) {
+    throw new Error('服务器返回了无法解析的响应');
+  }
+
+  if (!response.ok || !data?.success) {
+    throw new Error(data?.error || '后台任务请求失败');
+  }
+  return data;
+}
+
+export async function submitJob(kind, params = {}) {
+  const data = await requestJson('/api/jobs', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ kind, params })
+  });
+  return data.job;
+}
+
+export async function getJob(jobId) {
+  const data = await requestJson(`/api/jobs/${encodeURIComponent(jobId)}`);
+  return data.job;
+}
+
+export async function getJobResult(jobId) {
+  const data = await requestJson(`/api/jobs/${encodeURIComponent(jobId)}/result`);
+  return data.result;
+}
+
+export async function cancelJob(jobId) {
+  const data = await requestJson(`/api/jobs/${encodeURIComponent(jobId)}/cancel`, { method: 'POST' });
+  return data.job;
+}
+
+// Follow a job's progress until it finishes. Uses the SSE stream when available
+// and falls back to polling. Resolves with the final job state.
+export function watchJob(jobId, onProgress = () => {}, pollIntervalMs = 1000) {
+  const finished = job => ['done', 'failed', 'cancelled'].includes(job.status);
+
+  if (typeof window.EventSource === 'function') {
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(`/api/jobs/${encodeURIComponent(jobId)}/events`);
+      source.addEventListener('progress', event => {
+        const job = JSON.parse(event.data);
+        onProgress(job);
+        if (finished(job)) {
+          source.close();
+          resolve(job);
+        }
+      });
+      source.addEventListener('error', () => {
+        source.close();
+        pollJob(jobId, onProgress, pollIntervalMs, finished).then(resolve, reject);
+      });
+    });
+  }
+  return pollJob(jobId, onProgress, pollIntervalMs, finished);
+}
+
+async function pollJob(jobId, onProgress, pollIntervalMs, finished) {
+  for (;;) {
+    const job = await getJob(jobId);
+    onProgress(job);
+    if (finished(job)) {
+      return job;
+    }
+    await new Promise(resolve => setTimeout(resolve, pollIntervalMs));
+  }
+}
@@ -1,5 +1,5 @@
-export async function saveJsonContent({ json, filename, targetDir, overwrite = false }) {
-  const payload = { json, filename, target_dir: targetDir, overwrite };
+export async function saveJsonContent({ json, filename, targetDir, overwrite = false, versioned = false }) {
+  const payload = { json, filename, target_dir: targetDir, overwrite, versioned };
 
   let response;
   try {
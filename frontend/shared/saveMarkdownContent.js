@@ -1,4 +1,4 @@
-export async function saveMarkdownContent({ content, filename, targetDir, overwrite = false }) {
+export async function saveMarkdownContent({ content, filename, targetDir, overwrite = false, versioned = false }) {
   if (typeof content !== 'string' || content.length === 0) {
     throw new Error('Markdown 内容为空');
   }
@@ -8,7 +8,7 @@ export async function saveMarkdownContent({ content, filename, targetDir, overwr
     response = await fetch('/api/save-md-content', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ content, filename, target_dir: targetDir, overwrite })
+      body: JSON.stringify({ content, filename, target_dir: targetDir, overwrite, versioned })
     });
   } catch (networkError) {
     throw new Error('网络请求失败，请检查连接');
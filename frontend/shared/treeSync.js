@@ -0,0 +1,221 @@
+const NODE_FIELDS = ['name', 'symbols', 'problem', 'description', 'mathProof', 'api2', 'api1'];
+
+export class TreeSyncConflictError extends Error {
+  constructor(message, version) {
+    super(message);
+    this.name = 'TreeSyncConflictError';
+    this.version = version;
+  }
+}
+
+function cloneSubtree(node) {
+  const copy = { id: node.id };
+  NODE_FIELDS.forEach(key => {
+    copy[key] = node[key] ?? '';
+  });
+  copy.children = (node.children || []).map(cloneSubtree);
+  return copy;
+}
+
+function indexTree(root) {
+  const index = new Map();
+  const walk = (node, parentId, position) => {
+    index.set(node.id, { node, parentId, position });
+    (node.children || []).forEach((child, i) => walk(child, node.id, i));
+  };
+  if (root) walk(root, null, 0);
+  return index;
+}
+
+// Compute the node-level change list that turns `base` into `next`.
+// Both arguments are tree roots ({ id, ...fields, children }).
+export function diffTrees(base, next) {
+  if (!base || !next || base.id !== next.id) {
+    return next ? [{ op: 'reset', root: cloneSubtree(next) }] : [];
+  }
+
+  const baseIndex = indexTree(base);
+  const nextIndex = indexTree(next);
+  const changes = [];
+
+  // Inserted subtrees only carry brand-new descendants; nodes that already
+  // existed elsewhere are moved under them instead of being duplicated.
+  const cloneNew = node => {
+    const copy = cloneSubtree({ ...node, children: [] });
+    copy.children = (node.children || []).filter(child => !baseIndex.has(child.id)).map(cloneNew);
+    return copy;
+  };
+
+  const walk = (node, insideInserted) => {
+    (node.children || []).forEach((child, position) => {
+      const before = baseIndex.get(child.id);
+      if (!before) {
+        if (!insideInserted) {
+          changes.push({ op: 'insert', parent: node.id, index: position, node: cloneNew(child) });
+        }
+        walk(child, true);
+        return;
+      }
+      if (before.parentId !== node.id) {
+        changes.push({ op: 'move', id: child.id, parent: node.id, index: position });
+      }
+      pushFieldUpdate(changes, before.node, child);
+      walk(child, false);
+    });
+  };
+  pushFieldUpdate(changes, base, next);
+  walk(next, false);
+
+  // Removals run after moves so relocated descendants survive; nodes whose
+  // ancestor is removed as well are covered by that removal.
+  baseIndex.forEach((entry, id) => {
+    if (nextIndex.has(id)) return;
+    if (entry.parentId !== null && !nextIndex.has(entry.parentId)) return;
+    changes.push({ op: 'remove', id });
+  });
+
+  // Inserts and moves land at their target index; an explicit reorder makes
+  // the final sibling order exact whenever it changed.
+  nextIndex.forEach(({ node }, id) => {
+    const before = baseIndex.get(id);
+    const nextOrder = (node.children || []).map(child => child.id);
+    if (!before) {
+      if (nextOrder.some(childId => baseIndex.has(childId))) {
+        changes.push({ op: 'reorder', id, children: nextOrder });
+      }
+      return;
+    }
+    const baseOrder = (before.node.children || []).map(child => child.id);
+    if (nextOrder.length !== baseOrder.length || nextOrder.some((childId, i) => childId !== baseOrder[i])) {
+      changes.push({ op: 'reorder', id, children: nextOrder });
+    }
+  });
+
+  return changes;
+}
+
+function pushFieldUpdate(changes, before, after) {
+  const fields = {};
+  let changed = false;
+  NODE_FIELDS.forEach(key => {
+    const prev = before[key] ?? '';
+    const value = after[key] ?? '';
+    if (prev !== value) {
+      fields[key] = value;
+      changed = true;
+    }
+  });
+  if (changed) {
+    changes.push({ op: 'update', id: after.id, fields });
+  }
+}
+
+// Apply a server change list to a tree root in place (mirror of backend/tree_sync.py).
+// `keepLocal(node, field)` may veto a field update, e.g. while the user is editing it.
+export function applyTreeChanges(root, changes, keepLocal = () => false) {
+  let current = root;
+  const locate = id => {
+    let found = null;
+    const walk = (node, parent) => {
+      if (found) return;
+      if (node.id === id) {
+        found = { node, parent };
+        return;
+      }
+      (node.children || []).forEach(child => walk(child, node));
+    };
+    walk(current, null);
+    if (!found) {
+      throw new Error(`未知节点: ${id}`);
+    }
+    return found;
+  };
+  const insertAt = (parent, node, index) => {
+    const position = Number.isInteger(index) ? Math.max(0, Math.min(index, parent.children.length)) : parent.children.length;
+    parent.children.splice(position, 0, node);
+  };
+
+  changes.forEach(change => {
+    switch (change.op) {
+      case 'update': {
+        const { node } = locate(change.id);
+        Object.entries(change.fields || {}).forEach(([key, value]) => {
+          if (NODE_FIELDS.includes(key) && !keepLocal(node, key)) {
+            node[key] = value ?? '';
+          }
+        });
+        break;
+      }
+      case 'insert':
+        insertAt(locate(change.parent).node, cloneSubtree(change.node), change.index);
+        break;
+      case 'remove': {
+        const { node, parent } = locate(change.id);
+        if (parent) parent.children = parent.children.filter(child => child !== node);
+        break;
+      }
+      case 'move': {
+        const { node, parent } = locate(change.id);
+        const target = locate(change.parent).node;
+        if (parent) parent.children = parent.children.filter(child => child !== node);
+        insertAt(target, node, change.index);
+        break;
+      }
+      case 'reorder': {
+        const { node } = locate(change.id);
+        const byId = new Map(node.children.map(child => [child.id, child]));
+        node.children = change.children.map(id => byId.get(id)).filter(Boolean);
+        break;
+      }
+      case 'reset':
+        current = cloneSubtree(change.root);
+        break;
+      default:
+        throw new Error(`不支持的变更类型: ${change.op}`);
+    }
+  });
+  return current;
+}
+
+export async function fetchSyncedTree(path) {
+  const params = new URLSearchParams({ path });
+  let response;
+  try {
+    response = await fetch(`/api/tree-sync?${params.toString()}`);
+  } catch (networkError) {
+    throw new Error('网络请求失败，请检查连接');
+  }
+  const data = await response.json();
+  if (!response.ok || !data?.success) {
+    throw new Error(data?.error || '读取树文档失败');
+  }
+  return data;
+}
+
+export async function syncTreeContent({ path, baseVersion, changes, clientId }) {
+  let response;
+  try {
+    response = await fetch('/api/tree-sync', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ path, base_version: baseVersion, changes, client_id: clientId })
+    });
+  } catch (networkError) {
+    throw new Error('网络请求失败，请检查连接');
+  }
+
+  let data;
+  try {
+    data = await response.json();
+  } catch (parseError) {
+    throw new Error('服务器返回了无法解析的响应');
+  }
+
+  if (response.status === 409 && data?.conflict) {
+    throw new TreeSyncConflictError(data.error || '文档已被他人修改', data.version);
+  }
+  if (!response.ok || !data?.success) {
+    throw new Error(data?.error || '同步失败');
+  }
+  return data;
+}
@@ -1,4 +1,6 @@
 let nodeCounter = 0;
+// Keeps ids created by different annotators of one shared document apart.
+const sessionTag = Math.random().toString(36).slice(2, 8);
 
 const state = {
   root: null,
@@ -39,7 +41,7 @@ export function createNode({
 } = {}) {
   nodeCounter += 1;
   const node = {
-    id: `node-${nodeCounter}`,
+    id: `node-${nodeCounter}-${sessionTag}`,
     name,
     symbols: normalizeSymbols(symbols),
     problem,
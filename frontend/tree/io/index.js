@@ -7,8 +7,11 @@ import {
   exportJsonBtn,
   exportMdBtn,
   exportCsvBtn,
+  saveTreeJsonBtn,
+  saveTreeMdBtn,
   pasteModal,
-  pasteTextarea
+  pasteTextarea,
+  nodeEditor
 } from '../ui/dom.js';
 import {
   getState,
@@ -27,6 +30,25 @@ import { saveCsvContent } from '../../shared/saveCsvContent.js';
 import { saveJsonContent } from '../../shared/saveJsonContent.js';
 import { saveMarkdownContent } from '../../shared/saveMarkdownContent.js';
 import { getCsvTargetDir } from '../../shared/csvTargetDir.js';
+import {
+  applyTreeChanges,
+  diffTrees,
+  fetchSyncedTree,
+  syncTreeContent,
+  TreeSyncConflictError
+} from '../../shared/treeSync.js';
+import { createClientId, subscribeToDocument } from '../../shared/collabStream.js';
+
+const AUTO_SYNC_DELAY_MS = 1000;
+const AUTO_SYNC_MAX_RETRIES = 3;
+const clientId = createClientId();
+
+// Server-side copy the current tree was last synced with: { path, version, snapshot }.
+// After the first full upload, later saves only send node-level changes.
+let syncSession = null;
+let closeCollabStream = null;
+let autoSyncTimer = null;
+let autoSyncRetries = 0;
 
 export function initIoHandlers() {
   importBtn.addEventListener('click', () => {
@@ -91,6 +113,10 @@ export function initIoHandlers() {
     saveTreeMdBtn.addEventListener('click', saveMarkdownToServerFromTree);
   }
 
+  if (nodeEditor) {
+    nodeEditor.addEventListener('input', scheduleAutoSync);
+  }
+
   pasteModal.addEventListener('close', async () => {
     if (pasteModal.returnValue === 'confirm') {
       const raw = pasteTextarea.value.trim();
@@ -123,6 +149,7 @@ export async function openPasteModal() {
 }
 
 async function importFromText(text, filename = '') {
+  setSyncSession(null);
   try {
     const json = JSON.parse(text);
     await loadFromJson(json);
@@ -236,7 +263,8 @@ async function saveTreeCsvToServer() {
     const result = await saveCsvContent({
       content: csv,
       filename: 'proof_tree.csv',
-      targetDir: getCsvTargetDir()
+      targetDir: getCsvTargetDir(),
+      versioned: true
     });
     alert(`CSV 已保存到: ${result.path || result.absolute_path}`);
   } catch (error) {
@@ -246,14 +274,147 @@ async function saveTreeCsvToServer() {
 
 async function saveJsonToServerFromTree() {
   const data = toSerializable();
+  if (syncSession) {
+    await syncJsonToServer(data);
+    return;
+  }
   try {
     const result = await saveJsonContent({ json: data, filename: 'proof_tree.json', targetDir: getCsvTargetDir() });
+    // A freshly written file has no version yet, which the server treats as 0.
+    setSyncSession({ path: result.path, version: 0, snapshot: JSON.parse(JSON.stringify(data)) });
     alert(`JSON 已保存到: ${result.path || result.absolute_path}`);
   } catch (error) {
     alert(`JSON 保存失败: ${error.message}`);
   }
 }
 
+function setSyncSession(next) {
+  const previousPath = syncSession?.path;
+  syncSession = next;
+  if (next && next.path === previousPath && closeCollabStream) {
+    return;
+  }
+  if (closeCollabStream) {
+    closeCollabStream();
+    closeCollabStream = null;
+  }
+  if (next) {
+    closeCollabStream = subscribeToDocument(next.path, clientId, {
+      onChanges: handleRemoteChanges,
+      onReload: handleRemoteReload
+    });
+  }
+}
+
+// While a document is shared, editor input is pushed as small deltas shortly after typing stops.
+function scheduleAutoSync() {
+  if (!syncSession) return;
+  clearTimeout(autoSyncTimer);
+  autoSyncTimer = setTimeout(() => {
+    syncJsonToServer(toSerializable(), { quiet: true });
+  }, AUTO_SYNC_DELAY_MS);
+}
+
+async function syncJsonToServer(data, { quiet = false } = {}) {
+  const changes = diffTrees(syncSession.snapshot.root, data.root);
+  if (changes.length === 0) {
+    if (!quiet) {
+      alert(`没有需要同步的修改: ${syncSession.path}`);
+    }
+    return;
+  }
+  try {
+    const result = await syncTreeContent({
+      path: syncSession.path,
+      baseVersion: syncSession.version,
+      changes,
+      clientId
+    });
+    setSyncSession({ path: syncSession.path, version: result.version, snapshot: JSON.parse(JSON.stringify(data)) });
+    autoSyncRetries = 0;
+    if (!quiet) {
+      alert(`JSON 已同步到: ${result.path}（版本 ${result.version}）`);
+    }
+  } catch (error) {
+    if (error instanceof TreeSyncConflictError) {
+      // Usually another annotator's edit is still on its way through the stream; retry shortly.
+      if (quiet && autoSyncRetries < AUTO_SYNC_MAX_RETRIES) {
+        autoSyncRetries += 1;
+        scheduleAutoSync();
+        return;
+      }
+      autoSyncRetries = 0;
+      const reload = window.confirm('服务器上的文档已被他人修改（版本冲突）。是否加载服务器上的最新版本？未同步的本地修改将被丢弃。');
+      if (reload) {
+        await reloadSyncedTree();
+      }
+      return;
+    }
+    alert(`JSON 同步失败: ${error.message}`);
+  }
+}
+
+function handleRemoteChanges(event) {
+  if (!syncSession || event.version <= syncSession.version) return;
+  if (event.base_version !== syncSession.version) {
+    handleRemoteReload();
+    return;
+  }
+
+  // Fields the local user changed but has not synced yet are left alone.
+  const synced = new Map();
+  const indexSnapshot = node => {
+    synced.set(node.id, node);
+    node.children.forEach(indexSnapshot);
+  };
+  indexSnapshot(syncSession.snapshot.root);
+  const keepLocal = (node, field) => {
+    const base = synced.get(node.id);
+    return Boolean(base) && (base[field] ?? '') !== (node[field] ?? '');
+  };
+
+  try {
+    const { root } = getState();
+    const nextRoot = applyTreeChanges(root, event.changes, keepLocal);
+    if (nextRoot !== root) {
+      loadFromSerialized({ root: nextRoot });
+    }
+    syncSession.snapshot.root = applyTreeChanges(syncSession.snapshot.root, event.changes);
+  } catch (error) {
+    handleRemoteReload();
+    return;
+  }
+  syncSession.version = event.version;
+  renderTreeNav();
+  renderPreview();
+  renderBreadcrumb();
+  syncTreePreviewWindow();
+}
+
+function handleRemoteReload() {
+  if (!syncSession) return;
+  const pending = diffTrees(syncSession.snapshot.root, toSerializable().root);
+  if (pending.length === 0) {
+    reloadSyncedTree();
+  }
+  // Otherwise the next save hits a version conflict and asks the user what to do.
+}
+
+async function reloadSyncedTree() {
+  try {
+    const result = await fetchSyncedTree(syncSession.path);
+    loadFromSerialized(result.tree);
+    setSyncSession({ path: result.path, version: result.version, snapshot: JSON.parse(JSON.stringify(toSerializable())) });
+    renderTreeNav();
+    renderEditor();
+    renderPreview();
+    renderBreadcrumb();
+    syncTreePreviewWindow();
+  } catch (error) {
+    alert(`加载最新版本失败: ${error.message}`);
+  }
+}
+
 async function saveMarkdownToServerFromTree() {
   const { root } = getState();
   if (!root) {
@@ -262,7 +423,7 @@ async function saveMarkdownToServerFromTree() {
   }
   const markdown = buildTreeMarkdown(root);
   try {
-    const result = await saveMarkdownContent({ content: markdown, filename: 'proof_tree.md', targetDir: getCsvTargetDir() });
+    const result = await saveMarkdownContent({ content: markdown, filename: 'proof_tree.md', targetDir: getCsvTargetDir(), versioned: true });
     alert(`Markdown 已保存到: ${result.path || result.absolute_path}`);
   } catch (error) {
     alert(`Markdown 保存失败: ${error.message}`);